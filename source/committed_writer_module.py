@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : committed_writer_module.py                                      =
+#description     : Sentence file writer with a commit log, for resumable outputs   =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+# The commit log FILENAME.commit-log holds one line "<number of sentences>\t<last sentence id>\t<length>":
+# the first <length> (uncompressed) characters of FILENAME are the header and the first <number of sentences>
+# sentence elements, flushed to the disk. A resumed writer cuts the file back to <length> and appends from there.
+
+import os
+import re
+
+import functions_compressed_io
+
+# Start tag of a written sentence element
+SENTENCE_START_PATTERN = re.compile(r'<sentence id="([^"]*)"')
+
+class Committed_XML_Writer:
+    # Output stream of the training graph explorers: every write is a sequence of complete sentence elements.
+    # Pending sentences are committed every commit_size sentences, the footer is written by close.
+    # Only plain and gzip files can be resumed, see functions_compressed_io.FLUSHABLE_EXTENSIONS
+    def __init__(self, filename, header, footer, compress_level=6, resume=False, commit_size=1000):
+        self.filename = filename
+        self.commit_log = filename+".commit-log"
+        self.footer = footer
+        self.commit_size = commit_size
+
+        # Committed and written state
+        self.committed_sentences = 0
+        self.committed_sentid = ""
+        self.committed_length = 0
+        self.sentences = 0
+        self.last_sentid = ""
+        self.length = 0
+
+        self.fileobj = None
+        if resume and functions_compressed_io.get_compression_extension(filename) not in functions_compressed_io.FLUSHABLE_EXTENSIONS:
+            raise ValueError(filename+" can not be resumed, bz2 and xz files are only readable block by block")
+        if resume:
+            self.fileobj = self.open_resumed_file(compress_level)
+        if self.fileobj == None:
+            if os.path.exists(self.commit_log):
+                os.remove(self.commit_log)
+            self.fileobj = functions_compressed_io.open_file(filename, "w", compress_level)
+            self.write(header)
+            self.commit()
+
+    def read_commit_log(self):
+        try:
+            finput = open(self.commit_log, "r")
+            sentences, sentid, length = finput.read().rstrip("\n").split("\t")
+            finput.close()
+            return int(sentences), sentid, int(length)
+        except (IOError, ValueError):
+            return None
+
+    def open_resumed_file(self, compress_level):
+        # The file cut back to its committed length, opened for appending. None if there is nothing to resume
+        commit_data = self.read_commit_log()
+        if commit_data == None or not os.path.exists(self.filename):
+            print "Nothing to resume in "+self.filename+", starting from the first sentence ..."
+            return None
+        sentences, sentid, length = commit_data
+
+        if functions_compressed_io.get_compression_extension(self.filename) == "":
+            fileobj = open(self.filename, "r+b", functions_compressed_io.BUFFER_SIZE)
+            fileobj.seek(0, 2)
+            if fileobj.tell() < length:
+                fileobj.close()
+                print self.filename+" is shorter than its commit log, starting from the first sentence ..."
+                return None
+            fileobj.truncate(length)
+            fileobj.seek(length)
+        else:
+            # A compressed stream can not be cut, the committed part is copied into a new file
+            extension = functions_compressed_io.get_compression_extension(self.filename)
+            resumed_filename = functions_compressed_io.strip_compression_extension(self.filename)+".resume"+extension
+            os.rename(self.filename, resumed_filename)
+            fileobj = functions_compressed_io.open_file(self.filename, "w", compress_level)
+            copied = 0
+            for data in functions_compressed_io.iterate_file_prefix(resumed_filename, length):
+                fileobj.write(data)
+                copied += len(data)
+            if copied < length:
+                fileobj.close()
+                print "The committed part of "+self.filename+" is not readable, starting from the first sentence (the old output is kept in "+resumed_filename+") ..."
+                return None
+            os.remove(resumed_filename)
+
+        print "Resuming "+self.filename+" after "+str(sentences)+" sentences (last sentence id: "+sentid+") ..."
+        self.committed_sentences = self.sentences = sentences
+        self.committed_sentid = self.last_sentid = sentid
+        self.committed_length = self.length = length
+        return fileobj
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.length += len(data)
+        sentids = SENTENCE_START_PATTERN.findall(data)
+        if len(sentids) != 0:
+            self.sentences += len(sentids)
+            self.last_sentid = sentids[-1]
+            if self.sentences - self.committed_sentences >= self.commit_size:
+                self.commit()
+
+    def commit(self):
+        functions_compressed_io.sync_file(self.fileobj)
+        temp_file = self.commit_log+".tmp"
+        foutput = open(temp_file, "w")
+        foutput.write(str(self.sentences)+"\t"+self.last_sentid+"\t"+str(self.length)+"\n")
+        foutput.close()
+        os.rename(temp_file, self.commit_log)
+        self.committed_sentences = self.sentences
+        self.committed_sentid = self.last_sentid
+        self.committed_length = self.length
+
+    def close(self):
+        # The commit log keeps the length without the footer, resuming a complete file only rewrites the footer
+        self.commit()
+        self.fileobj.write(self.footer)
+        self.fileobj.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : em_distributed_shared_directory.py                              =
+#description     : Distributed EM E-step over a shared directory                   =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+# Hosts only share a directory. Sentences are sharded by int(sentid) % num_shards, the coordinator
+# processes shard 0 itself and the workers the shards 1 ... num_shards-1. Files in the directory:
+#    job                                 : run id, training graph file (absolute path), feature method, number of shards, first iteration
+#    RUNID.iteration-K.params            : feature tables for the E-step of iteration K (published by the coordinator)
+#    RUNID.iteration-K.shard-S.counts    : partial counts of shard S for iteration K (written by worker S)
+#    RUNID.stop                          : no more iterations
+# Every file is written to a temporary file and renamed, its presence is the barrier.
+
+import os
+import time
+import datetime
+from xml.sax import make_parser
+
+import functions_model_files
+import functions_compressed_io
+from em_inside_outside_algorithm import EM_InsideOutside_Optimiser
+from saxparser_xml_stanfordtokenized_boxergraph_traininggraph import SAX_Handler
+
+def get_params_file(distributed_dir, run_id, iteration):
+    return distributed_dir+"/"+run_id+".iteration-"+str(iteration)+".params"
+
+def get_counts_file(distributed_dir, run_id, iteration, shard_id):
+    return distributed_dir+"/"+run_id+".iteration-"+str(iteration)+".shard-"+str(shard_id)+".counts"
+
+def get_stop_file(distributed_dir, run_id):
+    return distributed_dir+"/"+run_id+".stop"
+
+class EM_Distributed_Coordinator:
+    # shard_timeout: seconds without any shard reporting after which merge_partial_counts fails (0: no timeout)
+    def __init__(self, distributed_dir, num_shards, poll_interval, shard_timeout=0):
+        self.distributed_dir = distributed_dir
+        self.num_shards = num_shards
+        self.poll_interval = poll_interval
+        self.shard_timeout = shard_timeout
+        self.run_id = datetime.datetime.now().strftime("%Y%m%d%H%M%S")+"-"+str(os.getpid())
+        self.clear_directory()
+
+    def clear_directory(self):
+        # Files of earlier runs are removed before the (long) initialization: workers started meanwhile wait for
+        # the new job instead of picking up the old one
+        if not os.path.isdir(self.distributed_dir):
+            os.makedirs(self.distributed_dir)
+        for filename in os.listdir(self.distributed_dir):
+            if filename == "job" or filename.endswith(".params") or filename.endswith(".counts") or filename.endswith(".stop") or filename.endswith(".tmp"):
+                os.remove(self.distributed_dir+"/"+filename)
+
+    def start_job(self, training_xmlfile, METHOD_FEATURE_EXTRACT, first_iteration):
+        # Workers waiting for a job pick up the new one, the training graph file is read by them from their own directory
+        print "Publishing the distributed EM job "+self.run_id+" ("+str(self.num_shards)+" shards) in "+self.distributed_dir+" ..."
+        functions_model_files.write_pickle_file(self.distributed_dir+"/job", {"run_id":self.run_id, "training_xmlfile":os.path.abspath(training_xmlfile),
+                                                                              "METHOD_FEATURE_EXTRACT":METHOD_FEATURE_EXTRACT,
+                                                                              "num_shards":self.num_shards, "first_iteration":first_iteration})
+
+    def publish_parameters(self, iteration, feature_tables):
+        functions_model_files.write_pickle_file(get_params_file(self.distributed_dir, self.run_id, iteration), {"feature_tables":feature_tables})
+
+    def merge_partial_counts(self, iteration, em_io_handler):
+        # Waits for the partial counts of all worker shards and adds them to the counts of shard 0
+        waiting_shards = range(1, self.num_shards)
+        last_report = time.time()
+        last_progress = time.time()
+        while len(waiting_shards) != 0:
+            for shard_id in waiting_shards[:]:
+                counts_file = get_counts_file(self.distributed_dir, self.run_id, iteration, shard_id)
+                if os.path.exists(counts_file):
+                    partial_counts = functions_model_files.read_pickle_file(counts_file)
+                    em_io_handler.add_count_arrays(partial_counts["count_arrays"])
+                    em_io_handler.log_likelihood += partial_counts["log_likelihood"]
+                    print "Shard "+str(shard_id)+": "+str(partial_counts["sentences"])+" sentences merged ..."
+                    os.remove(counts_file)
+                    waiting_shards.remove(shard_id)
+                    last_progress = time.time()
+            if len(waiting_shards) != 0:
+                if self.shard_timeout > 0 and time.time() - last_progress > self.shard_timeout:
+                    raise RuntimeError("No partial counts of shards "+" ".join([str(shard_id) for shard_id in waiting_shards])+" for iteration "+str(iteration)+
+                                       " after "+str(self.shard_timeout)+" seconds, are their workers running on "+self.distributed_dir+"?")
+                if time.time() - last_report > 60:
+                    print "Waiting for shards: "+" ".join([str(shard_id) for shard_id in waiting_shards])+" ..."
+                    last_report = time.time()
+                time.sleep(self.poll_interval)
+        os.remove(get_params_file(self.distributed_dir, self.run_id, iteration))
+
+    def finish(self):
+        functions_model_files.write_pickle_file(get_stop_file(self.distributed_dir, self.run_id), {})
+
+class EM_Distributed_Worker:
+    def __init__(self, distributed_dir, shard_id, poll_interval):
+        self.distributed_dir = distributed_dir
+        self.shard_id = shard_id
+        self.poll_interval = poll_interval
+
+    def read_job(self):
+        job_file = self.distributed_dir+"/job"
+        if not os.path.exists(job_file):
+            return None
+        return functions_model_files.read_pickle_file(job_file)
+
+    def wait_for_job(self, finished_run_id):
+        # The next job with another run id than the finished one (None: no job finished yet)
+        while True:
+            job = self.read_job()
+            if job != None and job["run_id"] != finished_run_id:
+                if not os.path.exists(get_stop_file(self.distributed_dir, job["run_id"])):
+                    return job
+                finished_run_id = job["run_id"]
+            time.sleep(self.poll_interval)
+
+    def run(self, max_jobs=0):
+        # Runs jobs until max_jobs jobs are finished (0: until the process is stopped). A new job (the coordinator
+        # was restarted) replaces the current one, after a finished job the worker waits for the next one
+        finished_jobs = 0
+        job = self.wait_for_job(None)
+        while True:
+            next_job = self.run_job(job)
+            if next_job == None:
+                finished_jobs += 1
+                if max_jobs > 0 and finished_jobs >= max_jobs:
+                    return
+                print "Waiting for the next distributed EM job in "+self.distributed_dir+" ..."
+                next_job = self.wait_for_job(job["run_id"])
+            job = next_job
+
+    def run_job(self, job):
+        run_id = job["run_id"]
+        print "Starting distributed EM job "+run_id+" as shard "+str(self.shard_id)+" of "+str(job["num_shards"])+" ..."
+        smt_sentence_pairs = {}
+        probability_tables = {}
+        count_tables = {}
+        em_io_handler = EM_InsideOutside_Optimiser(smt_sentence_pairs, probability_tables, count_tables, job["METHOD_FEATURE_EXTRACT"])
+        handler = SAX_Handler("iter", em_io_handler, shard_id=self.shard_id, num_shards=job["num_shards"])
+        parser = make_parser()
+        parser.setContentHandler(handler)
+
+        iteration = job["first_iteration"]
+        while True:
+            params_file = get_params_file(self.distributed_dir, run_id, iteration)
+            while not os.path.exists(params_file):
+                if os.path.exists(get_stop_file(self.distributed_dir, run_id)):
+                    print "Distributed EM job "+run_id+" finished."
+                    return None
+                new_job = self.read_job()
+                if new_job != None and new_job["run_id"] != run_id:
+                    return new_job
+                time.sleep(self.poll_interval)
+
+            print "Starting iteration: "+str(iteration)+" ..."
+            em_io_handler.restore_feature_tables(functions_model_files.read_pickle_file(params_file)["feature_tables"])
+            em_io_handler.reset_log_likelihood()
+            handler.sentence_count = 0
+            print "Start parsing "+job["training_xmlfile"]+" ..."
+            xmlinput = functions_compressed_io.open_file(job["training_xmlfile"], "rb")
+            parser.parse(xmlinput)
+            xmlinput.close()
+            functions_model_files.write_pickle_file(get_counts_file(self.distributed_dir, run_id, iteration, self.shard_id),
+                                                    {"count_arrays":em_io_handler.get_count_arrays(),
+                                                     "log_likelihood":em_io_handler.log_likelihood, "sentences":handler.sentence_count})
+            print "Ending iteration: "+str(iteration)+" ..."
+            iteration += 1
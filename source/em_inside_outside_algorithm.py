@@ -7,8 +7,11 @@
 #version         : 0.1                                                             =
 #===================================================================================
 
-
+import math
+import numpy
 import function_select_methods
+from methods_feature_extract import Lazy_Value
+from feature_table_module import Feature_Table, VALUE_COLUMN
 
 class EM_InsideOutside_Optimiser:
     def __init__(self, smt_sentence_pairs, probability_tables, count_tables, METHOD_FEATURE_EXTRACT):
@@ -17,6 +20,34 @@ class EM_InsideOutside_Optimiser:
         self.count_tables = count_tables
         self.METHOD_FEATURE_EXTRACT = METHOD_FEATURE_EXTRACT
 
+        # Probabilities and counts of every operation type: oper_type -> Feature_Table, 
+        # probability_tables and count_tables are only filled by export_tables
+        self.feature_tables = {}
+
+        # Corpus log-likelihood accumulated during the current E-step
+        self.log_likelihood = 0.0
+
+        # (oper_type, row) pairs counted since the last reset
+        self.touched_features = set()
+
+        # Stepwise EM: running sufficient statistics kept as stepwise_scale * stepwise_tables[oper_type] (arrays 
+        # aligned with the feature tables), stepwise_seen[oper_type] marks the rows already in the statistics
+        self.stepwise_tables = {}
+        self.stepwise_seen = {}
+        self.stepwise_scale = 1.0
+        self.stepwise_updates = 0
+
+        # Distinct compiled training graphs with their multiplicity (None: no deduplication)
+        self.compiled_graphs = None
+
+        # Warm start: expected counts of an earlier model (oper_type -> feature -> val), added to the counts 
+        # in every batch update, prior_count_arrays keeps them aligned with the feature tables
+        self.prior_count_tables = {}
+        self.prior_count_arrays = {}
+        # Operation types seeded by the earlier model: without its counts, batch updates leave their features 
+        # not counted in the iteration at the seeded probabilities
+        self.warm_start_oper_types = set()
+
         self.method_feature_extract = function_select_methods.select_feature_extract_method(self.METHOD_FEATURE_EXTRACT)
 
     def initialize_probabilitytable_smt_input(self, sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph):
@@ -25,27 +56,16 @@ class EM_InsideOutside_Optimiser:
         # Process all oper nodes
         for oper_node in training_graph.oper_nodes:
             oper_type = training_graph.get_opernode_type(oper_node)
-            if oper_type not in self.probability_tables:
-                self.probability_tables[oper_type] = {}
-            if oper_type not in self.count_tables:
-                self.count_tables[oper_type] = {}
+            if oper_type not in self.feature_tables:
+                self.feature_tables[oper_type] = Feature_Table()
 
             parent_major_node = training_graph.find_parent_of_opernode(oper_node)
             children_major_nodes = training_graph.find_children_of_opernode(oper_node)
 
             if oper_type == "split":
-                # Parent main sentence
-                parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-                parent_filtered_mod_pos = training_graph.get_majornode_filtered_postions(parent_major_node)
-                parent_sentence = boxer_graph.extract_main_sentence(parent_nodeset, main_sent_dict, parent_filtered_mod_pos)
-
-                # Children sentences
-                children_sentences = []
-                for child_major_node in children_major_nodes:
-                    child_nodeset = training_graph.get_majornode_nodeset(child_major_node)
-                    child_filtered_mod_pos = training_graph.get_majornode_filtered_postions(child_major_node)
-                    child_sentence = boxer_graph.extract_main_sentence(child_nodeset, main_sent_dict, child_filtered_mod_pos)
-                    children_sentences.append(child_sentence)
+                # Parent and children sentences, realized only if the feature method uses them
+                parent_sentence = Lazy_Value(training_graph.get_majornode_sentence, parent_major_node, main_sent_dict, boxer_graph)
+                children_sentences = Lazy_Value(training_graph.get_majornode_sentences, children_major_nodes, main_sent_dict, boxer_graph)
 
                 split_candidate = training_graph.get_opernode_oper_candidate(oper_node)
                 
@@ -53,343 +73,374 @@ class EM_InsideOutside_Optimiser:
 
                 if split_candidate != None:
                     split_feature = self.method_feature_extract.get_split_feature(split_candidate, parent_sentence, children_sentences, boxer_graph)
-                    if split_feature not in self.probability_tables["split"]:
-                        self.probability_tables["split"][split_feature] = {"true":0.5, "false":0.5}
-                    if split_feature not in self.count_tables["split"]:
-                        self.count_tables["split"][split_feature] = {"true":0, "false":0}
+                    self.feature_tables["split"].add_feature(split_feature)
                 else:
                     not_applied_cands = training_graph.get_opernode_failed_oper_candidates(oper_node)
                     #print not_applied_cands
                     for split_candidate_left in not_applied_cands:
                         split_feature_left = self.method_feature_extract.get_split_feature(split_candidate_left, parent_sentence, children_sentences, boxer_graph)
                         #print split_feature_left
-                        if split_feature_left not in self.probability_tables["split"]:
-                            self.probability_tables["split"][split_feature_left] = {"true":0.5, "false":0.5}
-                        if split_feature_left not in self.count_tables["split"]:
-                            self.count_tables["split"][split_feature_left] = {"true":0, "false":0}
-                #print self.probability_tables["split"]
+                        self.feature_tables["split"].add_feature(split_feature_left)
 
             if oper_type == "drop-rel":
                 rel_node = training_graph.get_opernode_oper_candidate(oper_node)
                 parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
                 drop_rel_feature = self.method_feature_extract.get_drop_rel_feature(rel_node, parent_nodeset, main_sent_dict, boxer_graph)
-                if drop_rel_feature not in self.probability_tables["drop-rel"]:
-                    self.probability_tables["drop-rel"][drop_rel_feature] = {"true":0.5, "false":0.5}
-                if drop_rel_feature not in self.count_tables["drop-rel"]:
-                    self.count_tables["drop-rel"][drop_rel_feature] = {"true":0, "false":0}
+                self.feature_tables["drop-rel"].add_feature(drop_rel_feature)
                     
             if oper_type == "drop-mod":
                 mod_cand = training_graph.get_opernode_oper_candidate(oper_node)
                 drop_mod_feature = self.method_feature_extract.get_drop_mod_feature(mod_cand, main_sent_dict, boxer_graph)
-                if drop_mod_feature not in self.probability_tables["drop-mod"]:
-                    self.probability_tables["drop-mod"][drop_mod_feature] = {"true":0.5, "false":0.5}
-                if drop_mod_feature not in self.count_tables["drop-mod"]:
-                    self.count_tables["drop-mod"][drop_mod_feature] = {"true":0, "false":0}
+                self.feature_tables["drop-mod"].add_feature(drop_mod_feature)
 
             if oper_type == "drop-ood":
                 ood_node = training_graph.get_opernode_oper_candidate(oper_node)
                 parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
                 drop_ood_feature = self.method_feature_extract.get_drop_ood_feature(ood_node, parent_nodeset, main_sent_dict, boxer_graph)
-                if drop_ood_feature not in self.probability_tables["drop-ood"]:
-                    self.probability_tables["drop-ood"][drop_ood_feature] = {"true":0.5, "false":0.5}
-                if drop_ood_feature not in self.count_tables["drop-ood"]:
-                    self.count_tables["drop-ood"][drop_ood_feature] = {"true":0, "false":0}
+                self.feature_tables["drop-ood"].add_feature(drop_ood_feature)
 
-        #print self.probability_tables["split"]['as-as-patient_eq-eq_1']
         # if int(sentid) <= 3:
-        #     print self.probability_tables["split"]
+        #     print self.feature_tables["split"].to_probability_dict()
 
         # Extract all sentence pairs for SMT from all "fin" major nodes
         self.smt_sentence_pairs[sentid] = training_graph.get_final_sentences(main_sentence, main_sent_dict, boxer_graph)
 
+        if self.compiled_graphs != None:
+            self.collect_compiled_graph(main_sentence, main_sent_dict, boxer_graph, training_graph)
+
+    def restore_feature_tables(self, feature_tables):
+        # Tables of a checkpoint or of a distributed coordinator, with zero counts
+        self.feature_tables = feature_tables
+        self.reset_count_table()
+
+    def restore_smt_sentence_pairs(self, smt_sentence_pairs):
+        self.smt_sentence_pairs.clear()
+        self.smt_sentence_pairs.update(smt_sentence_pairs)
+
     def reset_count_table(self):
-        for oper_type in self.count_tables: # split, drop-rel, drop-mod, drop-ood
-            for oper_feature_key in self.count_tables[oper_type]: # feature patterns
-                for val in self.count_tables[oper_type][oper_feature_key]: # true, false
-                    self.count_tables[oper_type][oper_feature_key][val] = 0
+        for oper_type in self.feature_tables: # split, drop-rel, drop-mod, drop-ood
+            self.feature_tables[oper_type].reset_counts()
+        self.touched_features = set()
+
+    def get_touched_rows(self):
+        # oper_type -> sorted array of the rows counted since the last reset
+        touched_rows = {}
+        for (oper_type, row) in self.touched_features:
+            if oper_type not in touched_rows:
+                touched_rows[oper_type] = []
+            touched_rows[oper_type].append(row)
+        for oper_type in touched_rows:
+            touched_rows[oper_type] = numpy.array(sorted(touched_rows[oper_type]), dtype=numpy.intp)
+        return touched_rows
+
+    def export_tables(self):
+        # Fills probability_tables and count_tables (oper_type -> feature -> {"true":value, "false":value})
+        self.probability_tables.clear()
+        self.count_tables.clear()
+        for oper_type in self.feature_tables:
+            self.probability_tables[oper_type] = self.feature_tables[oper_type].to_probability_dict()
+            self.count_tables[oper_type] = self.feature_tables[oper_type].to_count_dict()
+
+    def reset_log_likelihood(self):
+        self.log_likelihood = 0.0
 
     def iterate_over_probabilitytable(self, sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph):
         #print sentid
-        # Calculating beta-probability, inside probability
-        #print "Calculating beta-probabilities (Inside probability) ..."
-        bottom_nodes = training_graph.find_all_fin_majornode()
-        beta_prob = self.calculate_inside_probability({}, bottom_nodes, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph)
-        #print beta_prob
-
-        # Calculating alpha-probability, outside probability
-        #print "Calculating alpha-probabilities (Outside probability) ..."
-        root_node = "MN-1"
-        alpha_prob = self.calculate_outside_probability({}, [root_node], main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph, beta_prob)
-        #print alpha_prob
-        
-        # Updating counts for each operation happened in this sentence
-        #print "Updating counts of each operation happened in this training sentence ..."
-        self.update_count_for_operations(sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph, alpha_prob, beta_prob)
-
-    def calculate_outside_probability(self, alpha_prob, tgnodes_to_process, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph, beta_prob):
-        if len(tgnodes_to_process) == 0:
-            return alpha_prob
-        
-        tgnode = tgnodes_to_process[0]
-        if tgnode.startswith("MN"):
-            # Major Nodes
-            if tgnode == "MN-1":
-                # Root major node
-                alpha_prob[tgnode] = 1
-            else:
-                parents_oper_nodes = training_graph.find_parents_of_majornode(tgnode)
-                alpha_prob_tgnode = 0
-                for parent_oper_node in parents_oper_nodes:
-                    alpha_prob_parent_oper_node = alpha_prob[parent_oper_node]
-                    children_major_nodes = training_graph.find_children_of_opernode(parent_oper_node)
-                    beta_prod_product = 1
-                    for child_major_node in children_major_nodes:
-                        if child_major_node != tgnode:
-                            beta_prod_product = beta_prod_product * beta_prob[child_major_node]
-                    alpha_prob_tgnode += alpha_prob_parent_oper_node * beta_prod_product
-                alpha_prob[tgnode] = alpha_prob_tgnode
-
-            # Adding children to tgnodes_to_process
-            children_oper_nodes = training_graph.find_children_of_majornode(tgnode)
-            for child_oper_node in children_oper_nodes:
-                # Check its not already inserted
-                if (child_oper_node not in alpha_prob) and (child_oper_node not in tgnodes_to_process):
-                    # Check its parent is already inserted
-                    parent_major_node = training_graph.find_parent_of_opernode(child_oper_node)
-                    if (parent_major_node in alpha_prob) or (parent_major_node in tgnodes_to_process):
-                        tgnodes_to_process.append(child_oper_node)
-        else:
-            # Oper nodes
-            parent_major_node = training_graph.find_parent_of_opernode(tgnode)
-            alpha_prob_tgnode = alpha_prob[parent_major_node] * self.fetch_probability(tgnode, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph)
-            alpha_prob[tgnode] = alpha_prob_tgnode 
-            
-            # Adding children to tgnodes_to_process
-            children_major_nodes = training_graph.find_children_of_opernode(tgnode)
-            for child_major_node in children_major_nodes:
-                # Check its not already inserted
-                if (child_major_node not in alpha_prob) and (child_major_node not in tgnodes_to_process):
-                    # Check all its parents are already inserted
-                    parents_oper_nodes = training_graph.find_parents_of_majornode(child_major_node)
-                    flag = True
-                    for parent_oper_node in parents_oper_nodes:
-                        if (parent_oper_node not in alpha_prob) and (parent_oper_node not in tgnodes_to_process):
-                            flag = False
-                            break
-                    if flag == True:
-                        tgnodes_to_process.append(child_major_node)
-        
-        alpha_prob = self.calculate_outside_probability(alpha_prob, tgnodes_to_process[1:], main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph, beta_prob)
-        return alpha_prob
-        
-    def calculate_inside_probability(self, beta_prob, tgnodes_to_process, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph):
-        if len(tgnodes_to_process) == 0:
-            return beta_prob
-
-        tgnode = tgnodes_to_process[0]
-        if tgnode.startswith("MN"):
-            # Major nodes
-            major_node_type = training_graph.get_majornode_type(tgnode)
-            if major_node_type == "fin":
-                # Leaf major nodes
-                beta_prob[tgnode] = 1
-            else:
-                children_oper_nodes = training_graph.find_children_of_majornode(tgnode)
-                beta_prob_tgnode = 0
-                for child_oper_node in children_oper_nodes:
-                    beta_prob_tgnode += self.fetch_probability(child_oper_node, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph) * beta_prob[child_oper_node]
-                beta_prob[tgnode] = beta_prob_tgnode
-
-            # Adding parents to tgnodes_to_process
-            parents_oper_nodes = training_graph.find_parents_of_majornode(tgnode)
-            for parent_oper_node in parents_oper_nodes:
-                # Check its not already inserted
-                if (parent_oper_node not in beta_prob) and (parent_oper_node not in tgnodes_to_process):
-                    # Check all its chilren are already inserted
-                    children_major_nodes = training_graph.find_children_of_opernode(parent_oper_node)
-                    flag = True
-                    for child_major_node in children_major_nodes:
-                        if (child_major_node not in beta_prob) and (child_major_node not in tgnodes_to_process):
-                            flag = False
-                            break
-                    if flag == True:
-                        tgnodes_to_process.append(parent_oper_node)
-        else:
-            # Oper nodes
-            children_major_nodes = training_graph.find_children_of_opernode(tgnode)
-            beta_prob_tgnode = 1
-            for child_major_node in children_major_nodes:
-                beta_prob_tgnode = beta_prob_tgnode * beta_prob[child_major_node]
-            beta_prob[tgnode] = beta_prob_tgnode
-
-            # Adding parent to tgnodes_to_process
-            parent_major_node = training_graph.find_parent_of_opernode(tgnode)
-            # Check its not already inserted
-            if (parent_major_node not in beta_prob) and (parent_major_node not in tgnodes_to_process):
-                # Check all its chilren are already inserted
-                children_oper_nodes = training_graph.find_children_of_majornode(parent_major_node)
-                flag = True
-                for child_oper_node in children_oper_nodes:
-                    if (child_oper_node not in beta_prob) and (child_oper_node not in tgnodes_to_process):
-                        flag = False
-                        break
-                if flag == True:
-                    tgnodes_to_process.append(parent_major_node)
-
-        beta_prob = self.calculate_inside_probability(beta_prob, tgnodes_to_process[1:], main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph)
-        return beta_prob
-
-    def fetch_probability(self, oper_node, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph):
-        oper_node_type = training_graph.get_opernode_type(oper_node)
-        if oper_node_type == "split":
-            # Parent main sentence
-            parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-            parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-            parent_filtered_mod_pos = training_graph.get_majornode_filtered_postions(parent_major_node)
-            parent_sentence = boxer_graph.extract_main_sentence(parent_nodeset, main_sent_dict, parent_filtered_mod_pos)
+        compiled_graph = self.compile_training_graph(main_sentence, main_sent_dict, boxer_graph, training_graph)
+        self.iterate_over_compiled_graph(compiled_graph, 1)
 
-            # Children sentences
-            children_major_nodes = training_graph.find_children_of_opernode(oper_node)
-            children_sentences = []
-            for child_major_node in children_major_nodes:
-                child_nodeset = training_graph.get_majornode_nodeset(child_major_node)
-                child_filtered_mod_pos = training_graph.get_majornode_filtered_postions(child_major_node)
-                child_sentence = boxer_graph.extract_main_sentence(child_nodeset, main_sent_dict, child_filtered_mod_pos)
-                children_sentences.append(child_sentence)
-
-            total_probability = 1
-            split_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-            if split_candidate != None:
-                split_feature = self.method_feature_extract.get_split_feature(split_candidate, parent_sentence, children_sentences, boxer_graph)
-                total_probability = self.probability_tables["split"][split_feature]["true"]
-                return total_probability
-            else:
-                not_applied_cands = training_graph.get_opernode_failed_oper_candidates(oper_node)
-                for split_candidate_left in not_applied_cands:
-                    split_feature_left = self.method_feature_extract.get_split_feature(split_candidate_left, parent_sentence, children_sentences, boxer_graph)
-                    total_probability = total_probability * self.probability_tables["split"][split_feature_left]["false"]
-                return total_probability
-                
-        elif oper_node_type == "drop-rel":
-            parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-            parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-            rel_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-            drop_rel_feature = self.method_feature_extract.get_drop_rel_feature(rel_candidate, parent_nodeset, main_sent_dict, boxer_graph)
-            isDropped = training_graph.get_opernode_drop_result(oper_node)
-            prob_value = 0
-            if isDropped == "True":
-                prob_value = self.probability_tables["drop-rel"][drop_rel_feature]["true"]
-            else:
-                prob_value = self.probability_tables["drop-rel"][drop_rel_feature]["false"]
-            return prob_value
-
-        elif oper_node_type == "drop-mod":
-            mod_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-            drop_mod_feature = self.method_feature_extract.get_drop_mod_feature(mod_candidate, main_sent_dict, boxer_graph)
-            isDropped = training_graph.get_opernode_drop_result(oper_node)
-            prob_value = 0
-            if isDropped == "True":
-                prob_value = self.probability_tables["drop-mod"][drop_mod_feature]["true"]
-            else:
-                prob_value = self.probability_tables["drop-mod"][drop_mod_feature]["false"]
-            return prob_value
+    def enable_graph_deduplication(self):
+        # Compiled graph -> number of training sentences sharing it, filled while initializing
+        self.compiled_graphs = {}
 
-        elif oper_node_type == "drop-ood":
-            parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-            parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-            ood_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-            drop_ood_feature = self.method_feature_extract.get_drop_ood_feature(ood_candidate, parent_nodeset, main_sent_dict, boxer_graph)
-            isDropped = training_graph.get_opernode_drop_result(oper_node)
-            prob_value = 0
-            if isDropped == "True":
-                prob_value = self.probability_tables["drop-ood"][drop_ood_feature]["true"]
+    def collect_compiled_graph(self, main_sentence, main_sent_dict, boxer_graph, training_graph):
+        compiled_graph = self.compile_training_graph(main_sentence, main_sent_dict, boxer_graph, training_graph)
+        if compiled_graph in self.compiled_graphs:
+            self.compiled_graphs[compiled_graph] += 1
+        else:
+            self.compiled_graphs[compiled_graph] = 1
+
+    def get_count_arrays(self):
+        # Counts of every operation type (partial counts of a distributed E-step)
+        count_arrays = {}
+        for oper_type in self.feature_tables:
+            count_arrays[oper_type] = self.feature_tables[oper_type].get_count_array().copy()
+        return count_arrays
+
+    def add_count_arrays(self, partial_count_arrays):
+        for oper_type in partial_count_arrays:
+            self.feature_tables[oper_type].get_count_array()[:] += partial_count_arrays[oper_type]
+            for row in numpy.flatnonzero(partial_count_arrays[oper_type].any(axis=1)):
+                self.touched_features.add((oper_type, int(row)))
+
+    def iterate_over_compiled_graphs(self):
+        # Inside-outside once per distinct graph, counts weighted by its multiplicity
+        for compiled_graph in self.compiled_graphs:
+            self.iterate_over_compiled_graph(compiled_graph, self.compiled_graphs[compiled_graph])
+
+    def compile_training_graph(self, main_sentence, main_sent_dict, boxer_graph, training_graph):
+        # Reduces a training graph to what inside-outside needs, independent of the sentence:
+        # (major_fin, major_children, oper_defs, order) where
+        #    major_fin[m]: True for "fin" major nodes (leaves)
+        #    major_children[m]: child oper nodes of the major node m
+        #    oper_defs[o]: (children major nodes, factors), the probability of o is the product of the
+        #                  feature_tables[oper_type].probabilities[position] over its (oper_type, position) factors
+        #    order: major nodes, children before parents
+        # Nodes are numbered by their name, index 0 is the root "MN-1". Structurally identical graphs
+        # with identical features compile to equal (hashable) tuples.
+        major_nodes = training_graph.major_nodes.keys()
+        major_nodes.sort(key=lambda item: int(item[3:]))
+        oper_nodes = training_graph.oper_nodes.keys()
+        oper_nodes.sort(key=lambda item: int(item[3:]))
+        major_index = {}
+        for index in range(len(major_nodes)):
+            major_index[major_nodes[index]] = index
+        oper_index = {}
+        for index in range(len(oper_nodes)):
+            oper_index[oper_nodes[index]] = index
+
+        # Adjacency in a single pass over edges, children keep the edge order
+        major_children = [[] for major_node in major_nodes]
+        oper_children = [[] for oper_node in oper_nodes]
+        oper_parent = [None for oper_node in oper_nodes]
+        for edge in training_graph.edges:
+            if edge[0] in major_index:
+                major_children[major_index[edge[0]]].append(oper_index[edge[1]])
+                if oper_parent[oper_index[edge[1]]] == None:
+                    oper_parent[oper_index[edge[1]]] = major_index[edge[0]]
             else:
-                prob_value = self.probability_tables["drop-ood"][drop_ood_feature]["false"]
-            return prob_value
+                oper_children[oper_index[edge[0]]].append(major_index[edge[1]])
 
-    def update_count_for_operations(self, sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph, training_graph, alpha_prob, beta_prob):
-        # Process all oper nodes
-        for oper_node in training_graph.oper_nodes:
-            # Calculating count
-            root_inside_prob = beta_prob["MN-1"]
-            oper_node_inside_prob = beta_prob[oper_node]
-            oper_node_outside_prob = alpha_prob[oper_node]
-            count_oper_node = (oper_node_inside_prob * oper_node_outside_prob) / root_inside_prob
-
-            oper_node_type = training_graph.get_opernode_type(oper_node)
-            if oper_node_type == "split":
-                # Parent main sentence
-                parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-                parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-                parent_filtered_mod_pos = training_graph.get_majornode_filtered_postions(parent_major_node)
-                parent_sentence = boxer_graph.extract_main_sentence(parent_nodeset, main_sent_dict, parent_filtered_mod_pos)
-                
-                # Children sentences
-                children_major_nodes = training_graph.find_children_of_opernode(oper_node)
-                children_sentences = []
-                for child_major_node in children_major_nodes:
-                    child_nodeset = training_graph.get_majornode_nodeset(child_major_node)
-                    child_filtered_mod_pos = training_graph.get_majornode_filtered_postions(child_major_node)
-                    child_sentence = boxer_graph.extract_main_sentence(child_nodeset, main_sent_dict, child_filtered_mod_pos)
-                    children_sentences.append(child_sentence)
+        oper_defs = []
+        for index in range(len(oper_nodes)):
+            oper_node = oper_nodes[index]
+            oper_type = training_graph.get_opernode_type(oper_node)
+            parent_major_node = major_nodes[oper_parent[index]]
+            factors = []
+            if oper_type == "split":
+                # Parent and children sentences, realized only if the feature method uses them
+                children_major_nodes = [major_nodes[child_index] for child_index in oper_children[index]]
+                parent_sentence = Lazy_Value(training_graph.get_majornode_sentence, parent_major_node, main_sent_dict, boxer_graph)
+                children_sentences = Lazy_Value(training_graph.get_majornode_sentences, children_major_nodes, main_sent_dict, boxer_graph)
 
                 split_candidate = training_graph.get_opernode_oper_candidate(oper_node)
                 if split_candidate != None:
                     split_feature = self.method_feature_extract.get_split_feature(split_candidate, parent_sentence, children_sentences, boxer_graph)
-                    self.count_tables["split"][split_feature]["true"] += count_oper_node
+                    factors.append(self.get_factor("split", split_feature, "true"))
                 else:
                     not_applied_cands = training_graph.get_opernode_failed_oper_candidates(oper_node)
                     for split_candidate_left in not_applied_cands:
                         split_feature_left = self.method_feature_extract.get_split_feature(split_candidate_left, parent_sentence, children_sentences, boxer_graph)
-                        self.count_tables["split"][split_feature_left]["false"] += count_oper_node
-                    
-            elif oper_node_type == "drop-rel":
-                parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-                parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-                rel_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-                drop_rel_feature = self.method_feature_extract.get_drop_rel_feature(rel_candidate, parent_nodeset, main_sent_dict, boxer_graph)
-                isDropped = training_graph.get_opernode_drop_result(oper_node)
-                if isDropped == "True":
-                    self.count_tables["drop-rel"][drop_rel_feature]["true"] += count_oper_node
-                else:
-                    self.count_tables["drop-rel"][drop_rel_feature]["false"] += count_oper_node
-                    
-            elif oper_node_type == "drop-mod":
-                mod_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-                drop_mod_feature = self.method_feature_extract.get_drop_mod_feature(mod_candidate, main_sent_dict, boxer_graph)
-                isDropped = training_graph.get_opernode_drop_result(oper_node)
-                if isDropped == "True":
-                    self.count_tables["drop-mod"][drop_mod_feature]["true"] += count_oper_node
+                        factors.append(self.get_factor("split", split_feature_left, "false"))
+            else:
+                oper_candidate = training_graph.get_opernode_oper_candidate(oper_node)
+                if oper_type == "drop-rel":
+                    parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
+                    oper_feature = self.method_feature_extract.get_drop_rel_feature(oper_candidate, parent_nodeset, main_sent_dict, boxer_graph)
+                elif oper_type == "drop-mod":
+                    oper_feature = self.method_feature_extract.get_drop_mod_feature(oper_candidate, main_sent_dict, boxer_graph)
                 else:
-                    self.count_tables["drop-mod"][drop_mod_feature]["false"] += count_oper_node
-                    
-            elif oper_node_type == "drop-ood":
-                parent_major_node = training_graph.find_parent_of_opernode(oper_node)
-                parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
-                ood_candidate = training_graph.get_opernode_oper_candidate(oper_node)
-                drop_ood_feature = self.method_feature_extract.get_drop_ood_feature(ood_candidate, parent_nodeset, main_sent_dict, boxer_graph)
+                    # drop-ood
+                    parent_nodeset = training_graph.get_majornode_nodeset(parent_major_node)
+                    oper_feature = self.method_feature_extract.get_drop_ood_feature(oper_candidate, parent_nodeset, main_sent_dict, boxer_graph)
                 isDropped = training_graph.get_opernode_drop_result(oper_node)
                 if isDropped == "True":
-                    self.count_tables["drop-ood"][drop_ood_feature]["true"] += count_oper_node
+                    factors.append(self.get_factor(oper_type, oper_feature, "true"))
                 else:
-                    self.count_tables["drop-ood"][drop_ood_feature]["false"] += count_oper_node
-
-    def update_probability_table(self):
-        for oper_type in self.probability_tables: # split, drop-ood, drop-rel, drop-mod
-            for oper_feature_key in self.probability_tables[oper_type]: # feature patterns
-                totalSum = 0
-                for val in self.probability_tables[oper_type][oper_feature_key]:
-                    totalSum += self.count_tables[oper_type][oper_feature_key][val] 
-                
-                # if totalSum == 0:
-                #     print oper_type
-                #     print oper_feature_key
-                #     print self.probability_tables[oper_type][oper_feature_key]
-                #     print self.count_tables[oper_type][oper_feature_key]
-
-                if totalSum == 0:
-                    for val in self.probability_tables[oper_type][oper_feature_key]:
-                        self.probability_tables[oper_type][oper_feature_key][val] = 0.5 # Uniform 1.0/len(self.probability_tables[oper_type][oper_feature_key]) 
-                else:
-                    for val in self.probability_tables[oper_type][oper_feature_key]:
-                        self.probability_tables[oper_type][oper_feature_key][val] = self.count_tables[oper_type][oper_feature_key][val] / totalSum
+                    factors.append(self.get_factor(oper_type, oper_feature, "false"))
+            oper_defs.append((tuple(oper_children[index]), tuple(factors)))
+
+        # Post order from the root: every major node comes after all its descendants
+        major_fin = tuple([training_graph.get_majornode_type(major_node) == "fin" for major_node in major_nodes])
+        order = []
+        visited = set([0])
+        stack = [(0, 0)]
+        while len(stack) != 0:
+            major, position = stack.pop()
+            children = [child for oper in major_children[major] for child in oper_children[oper]]
+            if position < len(children):
+                stack.append((major, position+1))
+                child = children[position]
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, 0))
+            else:
+                order.append(major)
+
+        return (major_fin, tuple([tuple(children) for children in major_children]), tuple(oper_defs), tuple(order))
+
+    def get_factor(self, oper_type, oper_feature_key, val):
+        # (oper_type, position of the value in the flat arrays of its feature table)
+        return (oper_type, 2*self.feature_tables[oper_type].feature_index[oper_feature_key]+VALUE_COLUMN[val])
+
+    def iterate_over_compiled_graph(self, compiled_graph, multiplicity):
+        major_fin, major_children, oper_defs, order = compiled_graph
+        feature_tables = self.feature_tables
+
+        # Probability of each oper node
+        oper_prob = []
+        for (children, factors) in oper_defs:
+            prob_value = 1
+            for (oper_type, position) in factors:
+                prob_value = prob_value * feature_tables[oper_type].probabilities[position]
+            oper_prob.append(prob_value)
+
+        # Calculating beta-probability, inside probability
+        beta_major = [0] * len(major_fin)
+        beta_oper = [0] * len(oper_defs)
+        for major in order:
+            if major_fin[major] == True:
+                # Leaf major nodes
+                beta_major[major] = 1
+            else:
+                beta_prob_major = 0
+                for oper in major_children[major]:
+                    beta_prob_oper = 1
+                    for child in oper_defs[oper][0]:
+                        beta_prob_oper = beta_prob_oper * beta_major[child]
+                    beta_oper[oper] = beta_prob_oper
+                    beta_prob_major += oper_prob[oper] * beta_prob_oper
+                beta_major[major] = beta_prob_major
+        root_inside_prob = beta_major[0]
+
+        # Sentence likelihood is the inside probability of the root major node
+        self.log_likelihood += multiplicity * math.log(root_inside_prob)
+
+        # Calculating alpha-probability, outside probability (parents before children)
+        alpha_major = [0] * len(major_fin)
+        alpha_oper = [0] * len(oper_defs)
+        alpha_major[0] = 1
+        for major in reversed(order):
+            for oper in major_children[major]:
+                alpha_prob_oper = alpha_major[major] * oper_prob[oper]
+                alpha_oper[oper] = alpha_prob_oper
+                children = oper_defs[oper][0]
+                for child in children:
+                    beta_prod_product = 1
+                    for sibling in children:
+                        if sibling != child:
+                            beta_prod_product = beta_prod_product * beta_major[sibling]
+                    alpha_major[child] += alpha_prob_oper * beta_prod_product
+
+        # Updating counts for each operation happened in this sentence
+        for oper in range(len(oper_defs)):
+            count_oper_node = multiplicity * (beta_oper[oper] * alpha_oper[oper]) / root_inside_prob
+            for (oper_type, position) in oper_defs[oper][1]:
+                feature_tables[oper_type].counts[position] += count_oper_node
+                self.touched_features.add((oper_type, position >> 1))
+
+    def update_probability_table(self, only_touched=False):
+        # Returns the maximum absolute change of any probability
+        # only_touched: update only the features counted in this iteration, the others keep their probabilities
+        touched_rows = None
+        if only_touched == True:
+            touched_rows = self.get_touched_rows()
+
+        max_param_delta = 0
+        for oper_type in self.feature_tables: # split, drop-ood, drop-rel, drop-mod
+            if only_touched == True or (oper_type in self.warm_start_oper_types and oper_type not in self.prior_count_tables):
+                if touched_rows == None:
+                    touched_rows = self.get_touched_rows()
+                if oper_type not in touched_rows:
+                    continue
+                rows = touched_rows[oper_type]
+            else:
+                rows = None
+            max_param_delta = max(max_param_delta, self.feature_tables[oper_type].normalize(rows, self.get_prior_count_array(oper_type)))
+        return max_param_delta
+
+    def get_prior_count_array(self, oper_type):
+        # Warm start counts aligned with the rows of the feature table (None without a warm start)
+        if oper_type not in self.prior_count_tables:
+            return None
+        feature_table = self.feature_tables[oper_type]
+        if oper_type not in self.prior_count_arrays or len(self.prior_count_arrays[oper_type]) != feature_table.get_size():
+            prior_count_array = numpy.zeros((feature_table.get_size(), 2))
+            for oper_feature_key in self.prior_count_tables[oper_type]:
+                if oper_feature_key in feature_table.feature_index:
+                    row = feature_table.feature_index[oper_feature_key]
+                    for val in self.prior_count_tables[oper_type][oper_feature_key]:
+                        prior_count_array[row, VALUE_COLUMN[val]] = self.prior_count_tables[oper_type][oper_feature_key][val]
+            self.prior_count_arrays[oper_type] = prior_count_array
+        return self.prior_count_arrays[oper_type]
+
+    def seed_probability_table(self, old_probability_tables):
+        # Warm start: features of an earlier model start from its probabilities
+        for oper_type in old_probability_tables:
+            if oper_type not in self.feature_tables:
+                self.feature_tables[oper_type] = Feature_Table()
+            for oper_feature_key in old_probability_tables[oper_type]:
+                old_probabilities = old_probability_tables[oper_type][oper_feature_key]
+                row = self.feature_tables[oper_type].add_feature(oper_feature_key)
+                self.feature_tables[oper_type].set_probabilities(row, old_probabilities["true"], old_probabilities["false"])
+
+    def get_accumulated_count_tables(self):
+        # Counts of the last iteration together with the warm start counts
+        accumulated_count_tables = {}
+        for oper_type in self.feature_tables:
+            accumulated_count_tables[oper_type] = self.feature_tables[oper_type].to_count_dict(self.get_prior_count_array(oper_type))
+        return accumulated_count_tables
+
+    def stepwise_update_probability_table(self, step_size):
+        # Stepwise EM (Liang and Klein, 2009): mu = (1 - step_size) * mu + step_size * (counts of the mini-batch)
+        # Decaying stepwise_scale instead of mu leaves untouched features as they are, only the features
+        # counted in this mini-batch are updated. Returns the maximum absolute change of any probability
+        touched_rows = self.get_touched_rows()
+        for oper_type in self.feature_tables:
+            size = self.feature_tables[oper_type].get_size()
+            if oper_type not in self.stepwise_tables or len(self.stepwise_tables[oper_type]) != size:
+                self.stepwise_tables[oper_type] = numpy.zeros((size, 2))
+                self.stepwise_seen[oper_type] = numpy.zeros(size, dtype=bool)
+
+        # Features seen for the first time start from their current probabilities (mu_0 = theta_0),
+        # so a feature seen with only one value in a mini-batch never gets a zero probability
+        for oper_type in touched_rows:
+            rows = touched_rows[oper_type]
+            new_rows = rows[~self.stepwise_seen[oper_type][rows]]
+            self.stepwise_tables[oper_type][new_rows] = self.feature_tables[oper_type].get_probability_array()[new_rows] / self.stepwise_scale
+            self.stepwise_seen[oper_type][new_rows] = True
+
+        if step_size >= 1:
+            for oper_type in self.stepwise_tables:
+                self.stepwise_tables[oper_type].fill(0)
+                self.stepwise_seen[oper_type].fill(False)
+                if oper_type in touched_rows:
+                    self.stepwise_seen[oper_type][touched_rows[oper_type]] = True
+            self.stepwise_scale = 1.0
+        else:
+            self.stepwise_scale = self.stepwise_scale * (1 - step_size)
+        
+        max_param_delta = 0
+        for oper_type in touched_rows:
+            rows = touched_rows[oper_type]
+            stepwise_stats = self.stepwise_tables[oper_type]
+            counts = self.feature_tables[oper_type].get_count_array()
+            probabilities = self.feature_tables[oper_type].get_probability_array()
+            stepwise_stats[rows] += step_size * counts[rows] / self.stepwise_scale
+            counts[rows] = 0
+
+            totals = stepwise_stats[rows].sum(axis=1)
+            nonzero_rows = rows[totals != 0]
+            new_probabilities = stepwise_stats[nonzero_rows] / totals[totals != 0][:, numpy.newaxis]
+            if len(nonzero_rows) != 0:
+                max_param_delta = max(max_param_delta, float(numpy.abs(new_probabilities - probabilities[nonzero_rows]).max()))
+            probabilities[nonzero_rows] = new_probabilities
+        self.touched_features = set()
+        self.stepwise_updates += 1
+
+        # Fold the scale back in before it underflows
+        if self.stepwise_scale < 1e-100:
+            for oper_type in self.stepwise_tables:
+                self.stepwise_tables[oper_type] *= self.stepwise_scale
+            self.stepwise_scale = 1.0
+        return max_param_delta
+
+    def get_stepwise_state(self):
+        return {"stepwise_tables":self.stepwise_tables, "stepwise_seen":self.stepwise_seen, "stepwise_scale":self.stepwise_scale, 
+                "stepwise_updates":self.stepwise_updates}
+
+    def restore_stepwise_state(self, stepwise_state):
+        self.stepwise_tables = stepwise_state["stepwise_tables"]
+        self.stepwise_seen = stepwise_state["stepwise_seen"]
+        self.stepwise_scale = stepwise_state["stepwise_scale"]
+        self.stepwise_updates = stepwise_state["stepwise_updates"]
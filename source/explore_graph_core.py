@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : explore_graph_core.py                                           =
+#description     : Exploration core of the training and decoder graphs             =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+from training_graph_module import Training_Graph
+from functions_graph_worklist import expand_graph_worklist
+import function_select_methods
+from methods_feature_extract import Lazy_Value
+
+class Explore_Graph_Core:
+    # Builds the training graph or the decoder graph of a sentence. The major nodes and their candidates are the same
+    # for all graphs, the operation nodes added to a major node are chosen by the decision policy:
+    #    Oracle_Decision_Policy (training graph), Greedy_Decision_Policy (greedy decoder),
+    #    Enumeration_Decision_Policy (explorative decoder)
+    # Candidates and sentences of the boxer graph are cached for the sentence being explored.
+    def __init__(self, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, decision_policy):
+        self.DISCOURSE_SENTENCE_MODEL = DISCOURSE_SENTENCE_MODEL
+        self.MAX_SPLIT_PAIR_SIZE = MAX_SPLIT_PAIR_SIZE
+        self.RESTRICTED_DROP_REL = RESTRICTED_DROP_REL
+        self.ALLOWED_DROP_MOD = ALLOWED_DROP_MOD
+
+        self.decision_policy = decision_policy
+        self.reset_caches()
+
+    def reset_caches(self):
+        # (opertype, nodeset, processed candidates) -> candidates
+        self.candidate_cache = {}
+        # (nodeset, filtered_mod_pos) -> main sentence
+        self.sentence_cache = {}
+        self.parent_subgraph_nodeset_dict = None
+
+    def build_graph(self, main_sent_dict, simple_sentences, boxer_graph):
+        # simple_sentences: [] for the decoder graphs
+        self.reset_caches()
+        graph = Training_Graph()
+
+        # Check if Discourse information is available
+        if boxer_graph.isEmpty():
+            # Adding finishing major node
+            nodeset = boxer_graph.get_nodeset()
+            filtered_mod_pos = []
+            majornode_data = ("fin", nodeset, simple_sentences, filtered_mod_pos)
+            majornode_name, isNew = graph.create_majornode(majornode_data)
+        else:
+            # DRS data is available for the main sentence, starting node and expansion
+            nodeset = boxer_graph.get_nodeset()
+            majornode_name, isNew = self.addition_major_node(main_sent_dict, simple_sentences, boxer_graph, graph, "split", nodeset, [], [])
+            expand_graph_worklist([majornode_name], self.expand_graph, main_sent_dict, boxer_graph, graph)
+
+        self.reset_caches()
+        return graph
+
+    # @@@@@@@@@@@@@@@@@@@@@@ Caches @@@@@@@@@@@@@@@@@@@@@@
+
+    def get_candidates(self, opertype, nodeset, processed_candidates, main_sent_dict, boxer_graph):
+        key = (opertype, tuple(nodeset), tuple(processed_candidates))
+        if key not in self.candidate_cache:
+            if opertype == "split":
+                candidates = boxer_graph.extract_split_candidate_tuples(nodeset, self.MAX_SPLIT_PAIR_SIZE)
+            elif opertype == "drop-rel":
+                candidates = boxer_graph.extract_drop_rel_candidates(nodeset, self.RESTRICTED_DROP_REL, processed_candidates)
+            elif opertype == "drop-mod":
+                candidates = boxer_graph.extract_drop_mod_candidates(nodeset, main_sent_dict, self.ALLOWED_DROP_MOD, processed_candidates)
+            else:
+                candidates = boxer_graph.extract_ood_candidates(nodeset, processed_candidates)
+            self.candidate_cache[key] = candidates
+        return self.candidate_cache[key][:]
+
+    def get_main_sentence(self, nodeset, filtered_mod_pos, main_sent_dict, boxer_graph):
+        key = (tuple(nodeset), tuple(filtered_mod_pos))
+        if key not in self.sentence_cache:
+            self.sentence_cache[key] = boxer_graph.extract_main_sentence(nodeset, main_sent_dict, filtered_mod_pos)
+        return self.sentence_cache[key]
+
+    def partition_split_candidate(self, split_candidate, boxer_graph):
+        # [(span, nodeset, node name)] of the parts of the split, sorted by span
+        if self.parent_subgraph_nodeset_dict == None:
+            self.parent_subgraph_nodeset_dict = boxer_graph.extract_parent_subgraph_nodeset_dict()
+        node_subgraph_nodeset_dict, node_span_dict = boxer_graph.partition_drs_for_successful_candidate(split_candidate, self.parent_subgraph_nodeset_dict)
+        split_results = []
+        for tnodename in split_candidate:
+            tspan = node_span_dict[tnodename]
+            tnodeset = node_subgraph_nodeset_dict[tnodename][:]
+            split_results.append((tspan, tnodeset, tnodename))
+        split_results.sort()
+        return split_results
+
+    # @@@@@@@@@@@@@@@@@@@@@@ Expansion @@@@@@@@@@@@@@@@@@@@@@
+
+    def expand_graph(self, node_name, nodes_2_process, main_sent_dict, boxer_graph, graph):
+        operreq = graph.get_majornode_type(node_name)
+        nodeset = graph.get_majornode_nodeset(node_name)[:]
+        simple_sentences = graph.get_majornode_simple_sentences(node_name)[:]
+        oper_candidates = graph.get_majornode_oper_candidates(node_name)[:]
+        processed_oper_candidates = graph.get_majornode_processed_oper_candidates(node_name)[:]
+        filtered_postions = graph.get_majornode_filtered_postions(node_name)[:]
+
+        if operreq == "split":
+            self.process_split_node(node_name, nodeset, simple_sentences, oper_candidates, nodes_2_process, main_sent_dict, boxer_graph, graph)
+
+        if operreq == "drop-rel" or operreq == "drop-mod" or operreq == "drop-ood":
+            self.process_drop_node(node_name, operreq, nodeset, simple_sentences, oper_candidates, processed_oper_candidates, filtered_postions,
+                                   nodes_2_process, main_sent_dict, boxer_graph, graph)
+
+    def process_split_node(self, node_name, nodeset, simple_sentences, split_candidate_tuples, nodes_2_process, main_sent_dict, boxer_graph, graph):
+        # Split operations of the policy: (split_candidate, [(child nodeset, parent child node, child simple sentences)]),
+        # split_candidate None for the no-split operation
+        split_operations = self.decision_policy.get_split_operations(self, nodeset, simple_sentences, split_candidate_tuples, main_sent_dict, boxer_graph)
+        for split_candidate, split_children in split_operations:
+            # Adding the operation node
+            not_applied_cands = [item for item in split_candidate_tuples if item is not split_candidate]
+            opernode_data = ("split", split_candidate, not_applied_cands)
+            opernode_name = graph.create_opernode(opernode_data)
+            graph.create_edge((node_name, opernode_name, split_candidate))
+
+            # Adding children major nodes, check for adding rel or subsequent nodes
+            for child_nodeset, parent_child_nodeset, child_simple_sentences in split_children:
+                child_nodeset = sorted(child_nodeset)
+                child_majornode_name, isNew = self.addition_major_node(main_sent_dict, child_simple_sentences, boxer_graph, graph, "drop-rel", child_nodeset, [], [])
+                if isNew:
+                    nodes_2_process.append(child_majornode_name)
+                graph.create_edge((opernode_name, child_majornode_name, parent_child_nodeset))
+
+    def process_drop_node(self, node_name, opertype, nodeset, simple_sentences, oper_candidates, processed_oper_candidates, filtered_mod_pos,
+                          nodes_2_process, main_sent_dict, boxer_graph, graph):
+        # The first candidate is processed, drop-mod candidates are (position, node) and the position is processed
+        candidate_to_process = oper_candidates[0]
+        if opertype == "drop-mod":
+            processed_oper_candidates.append(candidate_to_process[0])
+        else:
+            processed_oper_candidates.append(candidate_to_process)
+
+        drop_decisions = self.decision_policy.get_drop_decisions(self, opertype, candidate_to_process, nodeset, simple_sentences, filtered_mod_pos,
+                                                                 main_sent_dict, boxer_graph)
+        for isDrop in drop_decisions:
+            drop_result = "True" if isDrop else "False"
+            opernode_data = (opertype, candidate_to_process, drop_result)
+            opernode_name = graph.create_opernode(opernode_data)
+            graph.create_edge((node_name, opernode_name, candidate_to_process))
+
+            # Check for adding the same operation or subsequent nodes
+            child_nodeset, child_filtered_mod_pos = self.apply_drop(opertype, candidate_to_process, isDrop, nodeset, filtered_mod_pos, boxer_graph)
+            child_majornode_name, isNew = self.addition_major_node(main_sent_dict, simple_sentences, boxer_graph, graph, opertype, child_nodeset,
+                                                                   processed_oper_candidates, child_filtered_mod_pos)
+            if isNew:
+                nodes_2_process.append(child_majornode_name)
+            graph.create_edge((opernode_name, child_majornode_name, drop_result))
+
+    def apply_drop(self, opertype, candidate_to_process, isDrop, nodeset, filtered_mod_pos, boxer_graph):
+        # New (nodeset, filtered_mod_pos) after the drop decision, the given lists are not changed
+        if not isDrop:
+            return nodeset[:], filtered_mod_pos[:]
+        if opertype == "drop-rel":
+            return boxer_graph.drop_relation(nodeset, candidate_to_process, filtered_mod_pos)
+        if opertype == "drop-mod":
+            return nodeset[:], filtered_mod_pos+[candidate_to_process[0]]
+        child_nodeset = nodeset[:]
+        child_nodeset.remove(candidate_to_process)
+        return child_nodeset, filtered_mod_pos[:]
+
+    def addition_major_node(self, main_sent_dict, simple_sentences, boxer_graph, graph, opertype, nodeset, processed_candidates, extra_data):
+        # node type - value
+        type_val = {"split":1, "drop-rel":2, "drop-mod":3, "drop-ood":4}
+        operval = type_val[opertype]
+
+        # Checking for the addition of "split" major-node
+        if operval <= type_val["split"]:
+            if opertype in self.DISCOURSE_SENTENCE_MODEL:
+                # Calculating Split Candidates - DRS Graph node tuples
+                split_candidate_tuples = self.get_candidates("split", nodeset, [], main_sent_dict, boxer_graph)
+                if len(split_candidate_tuples) != 0:
+                    # Adding the major node for split
+                    majornode_data = ("split", nodeset[:], simple_sentences, split_candidate_tuples)
+                    majornode_name, isNew = graph.create_majornode(majornode_data)
+                    return majornode_name, isNew
+
+        if operval <= type_val["drop-rel"]:
+            if opertype in self.DISCOURSE_SENTENCE_MODEL:
+                # Calculate drop-rel candidates
+                processed_relnode = processed_candidates[:] if opertype == "drop-rel" else []
+                filtered_mod_pos = extra_data[:] if opertype == "drop-rel" else []
+                relnode_set = self.get_candidates("drop-rel", nodeset, processed_relnode, main_sent_dict, boxer_graph)
+                if len(relnode_set) != 0:
+                    # Adding the major nodes for drop-rel
+                    majornode_data = ("drop-rel", nodeset[:], simple_sentences, relnode_set, processed_relnode, filtered_mod_pos)
+                    majornode_name, isNew = graph.create_majornode(majornode_data)
+                    return majornode_name, isNew
+
+        if operval <= type_val["drop-mod"]:
+            if opertype in self.DISCOURSE_SENTENCE_MODEL:
+                # Calculate drop-mod candidates
+                processed_mod_pos = processed_candidates[:] if opertype == "drop-mod" else []
+                filtered_mod_pos = extra_data[:]
+                modcand_set = self.get_candidates("drop-mod", nodeset, processed_mod_pos, main_sent_dict, boxer_graph)
+                if len(modcand_set) != 0:
+                    # Adding the major nodes for drop-mod
+                    majornode_data = ("drop-mod", nodeset[:], simple_sentences, modcand_set, processed_mod_pos, filtered_mod_pos)
+                    majornode_name, isNew = graph.create_majornode(majornode_data)
+                    return majornode_name, isNew
+
+        if operval <= type_val["drop-ood"]:
+            if opertype in self.DISCOURSE_SENTENCE_MODEL:
+                # Check for drop-OOD node candidates
+                processed_oodnodes = processed_candidates[:] if opertype == "drop-ood" else []
+                filtered_mod_pos = extra_data[:]
+                oodnode_candidates = self.get_candidates("drop-ood", nodeset, processed_oodnodes, main_sent_dict, boxer_graph)
+                if len(oodnode_candidates) != 0:
+                    # Adding the major node for drop-ood
+                    majornode_data = ("drop-ood", nodeset[:], simple_sentences, oodnode_candidates, processed_oodnodes, filtered_mod_pos)
+                    majornode_name, isNew = graph.create_majornode(majornode_data)
+                    return majornode_name, isNew
+
+        # None of them matched, create "fin" node
+        filtered_mod_pos = extra_data[:]
+        majornode_data = ("fin", nodeset[:], simple_sentences, filtered_mod_pos)
+        majornode_name, isNew = graph.create_majornode(majornode_data)
+        return majornode_name, isNew
+
+class Oracle_Decision_Policy:
+    # Training graph: the operations accepted by the training graph method, given the simple sentences
+    def __init__(self, METHOD_TRAINING_GRAPH, BEAM_WIDTH=0):
+        self.method_training_graph = function_select_methods.select_training_graph_method(METHOD_TRAINING_GRAPH)
+
+        # BEAM_WIDTH: 0 (all split operations allowed by the method) or the number of split operations kept
+        self.BEAM_WIDTH = BEAM_WIDTH
+
+        # Simple_Sentence_Reference of the training sentence being explored
+        self.simple_sentence_reference = None
+
+    def get_split_operations(self, explore_graph_core, nodeset, simple_sentences, split_candidate_tuples, main_sent_dict, boxer_graph):
+        split_operations = []
+        for split_candidate in split_candidate_tuples:
+            isValidSplit, split_results = self.method_training_graph.process_split_candidate_for_split(split_candidate, simple_sentences, main_sent_dict, boxer_graph,
+                                                                                                       self.simple_sentence_reference)
+            if isValidSplit:
+                # split_results: [(span, nodeset, node name, simple sentence)]
+                split_operations.append((split_candidate, [(item[1], item[2], [item[3]]) for item in split_results]))
+
+        if len(split_operations) == 0:
+            # None of the split candidate succeed
+            return [(None, [(nodeset, None, simple_sentences)])]
+        if self.BEAM_WIDTH > 0 and len(split_operations) > self.BEAM_WIDTH:
+            split_operations = self.prune_split_operations(explore_graph_core, split_operations, main_sent_dict, boxer_graph)
+        return split_operations
+
+    def prune_split_operations(self, explore_graph_core, split_operations, main_sent_dict, boxer_graph):
+        # Beam mode: the BEAM_WIDTH successful split candidates closest to the simple sentences. A candidate costs the sum
+        # of the edit distances of its parts to their simple sentences (ties: candidate order)
+        scored_operations = []
+        for index in range(len(split_operations)):
+            cost = 0
+            for child_nodeset, parent_child_nodeset, child_simple_sentences in split_operations[index][1]:
+                subsentence = explore_graph_core.get_main_sentence(child_nodeset, [], main_sent_dict, boxer_graph)
+                cost += self.simple_sentence_reference.get_edit_distance(subsentence, child_simple_sentences[0])
+            scored_operations.append((cost, index))
+        scored_operations.sort()
+        kept_indices = set([index for cost, index in scored_operations[:self.BEAM_WIDTH]])
+        return [split_operations[index] for index in range(len(split_operations)) if index in kept_indices]
+
+    def get_drop_decisions(self, explore_graph_core, opertype, candidate_to_process, nodeset, simple_sentences, filtered_mod_pos, main_sent_dict, boxer_graph):
+        if opertype == "drop-rel":
+            isDrop = self.method_training_graph.process_rel_candidate_for_drop(candidate_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph,
+                                                                               self.simple_sentence_reference)
+        elif opertype == "drop-mod":
+            isDrop = self.method_training_graph.process_mod_candidate_for_drop(candidate_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph,
+                                                                               self.simple_sentence_reference)
+        else:
+            isDrop = self.method_training_graph.process_ood_candidate_for_drop(candidate_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph,
+                                                                               self.simple_sentence_reference)
+        return [isDrop]
+
+class Greedy_Decision_Policy:
+    # Greedy decoder: the most probable operation of every major node
+    def __init__(self, probability_tables, METHOD_FEATURE_EXTRACT):
+        self.probability_tables = probability_tables
+        self.method_feature_extract = function_select_methods.select_feature_extract_method(METHOD_FEATURE_EXTRACT)
+
+    def get_probability(self, opertype, feature, value):
+        if feature in self.probability_tables[opertype]:
+            return self.probability_tables[opertype][feature][value]
+        return 0.5
+
+    def get_split_operations(self, explore_graph_core, nodeset, simple_sentences, split_candidate_tuples, main_sent_dict, boxer_graph):
+        # Calculating probabilities
+        probability_results = []
+
+        # Find the Parent main sentence
+        parent_sentence = Lazy_Value(explore_graph_core.get_main_sentence, nodeset, [], main_sent_dict, boxer_graph)
+        parent_sentence_list = Lazy_Value(lambda: [parent_sentence()])
+
+        # Explore no-split options
+        probability = 1
+        for split_candidate in split_candidate_tuples:
+            split_feature = self.method_feature_extract.get_split_feature(split_candidate, parent_sentence, parent_sentence_list, boxer_graph)
+            probability = probability * self.get_probability("split", split_feature, "false")
+        probability_results.append((probability, None))
+
+        # Explore all split options, the candidates are partitioned here only if their children sentences are features
+        split_results_dict = {}
+        for split_candidate in split_candidate_tuples:
+            children_sentences = None
+            if self.method_feature_extract.SPLIT_FEATURE_SENTENCES:
+                split_results = self.partition_split_candidate(explore_graph_core, split_candidate, boxer_graph)
+                split_results_dict[split_candidate] = split_results
+                children_sentences = Lazy_Value(lambda split_results=split_results: [explore_graph_core.get_main_sentence(item[1], [], main_sent_dict, boxer_graph) for item in split_results])
+
+            split_feature = self.method_feature_extract.get_split_feature(split_candidate, parent_sentence, children_sentences, boxer_graph)
+            probability_results.append((self.get_probability("split", split_feature, "true"), split_candidate))
+
+        # Sort probabilities
+        probability_results.sort(reverse=True)
+        split_candidate = probability_results[0][1]
+        if split_candidate == None:
+            return [(None, [(nodeset, None, simple_sentences)])]
+        if split_candidate not in split_results_dict:
+            split_results_dict[split_candidate] = self.partition_split_candidate(explore_graph_core, split_candidate, boxer_graph)
+        return [(split_candidate, [(item[1], item[2], simple_sentences) for item in split_results_dict[split_candidate]])]
+
+    def partition_split_candidate(self, explore_graph_core, split_candidate, boxer_graph):
+        # Prospective children major nodes
+        split_results = explore_graph_core.partition_split_candidate(split_candidate, boxer_graph)
+        for item in split_results:
+            item[1].sort()
+        return split_results
+
+    def get_drop_decisions(self, explore_graph_core, opertype, candidate_to_process, nodeset, simple_sentences, filtered_mod_pos, main_sent_dict, boxer_graph):
+        if opertype == "drop-rel":
+            drop_feature = self.method_feature_extract.get_drop_rel_feature(candidate_to_process, nodeset, main_sent_dict, boxer_graph)
+        elif opertype == "drop-mod":
+            drop_feature = self.method_feature_extract.get_drop_mod_feature(candidate_to_process, main_sent_dict, boxer_graph)
+        else:
+            drop_feature = self.method_feature_extract.get_drop_ood_feature(candidate_to_process, nodeset, main_sent_dict, boxer_graph)
+
+        if drop_feature in self.probability_tables[opertype]:
+            drop_prob = self.probability_tables[opertype][drop_feature]["true"]
+            not_drop_prob = self.probability_tables[opertype][drop_feature]["false"]
+            if drop_prob > not_drop_prob:
+                return [True]
+        return [False]
+
+class Enumeration_Decision_Policy:
+    # Explorative decoder: all operations, the decoder graph is scored afterwards
+    def get_split_operations(self, explore_graph_core, nodeset, simple_sentences, split_candidate_tuples, main_sent_dict, boxer_graph):
+        # No-split first, then every split candidate
+        split_operations = [(None, [(nodeset, None, simple_sentences)])]
+        for split_candidate in split_candidate_tuples:
+            split_results = explore_graph_core.partition_split_candidate(split_candidate, boxer_graph)
+            split_operations.append((split_candidate, [(item[1], item[2], simple_sentences) for item in split_results]))
+        return split_operations
+
+    def get_drop_decisions(self, explore_graph_core, opertype, candidate_to_process, nodeset, simple_sentences, filtered_mod_pos, main_sent_dict, boxer_graph):
+        # Not dropping first
+        return [False, True]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : feature_table_module.py                                         =
+#description     : Array backed probability and count tables                       =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+import array
+import numpy
+
+# Column of each value, row i of a table keeps feature i at positions 2*i ("true") and 2*i+1 ("false")
+VALUE_COLUMN = {"true":0, "false":1}
+VALUES = ["true", "false"]
+
+class Feature_Table:
+    # Features of one operation type (split, drop-ood, drop-rel, drop-mod). Probabilities and counts are
+    # flat arrays of floats: fast single element access in the inside-outside loops and numpy views
+    # (get_probability_array, get_count_array) for whole table operations. Views must not be kept
+    # across add_feature, the arrays may be reallocated.
+    def __init__(self):
+        self.feature_index = {}
+        self.features = []
+        self.probabilities = array.array('d')
+        self.counts = array.array('d')
+
+    def __getstate__(self):
+        return {"features":self.features, "probabilities":self.probabilities.tostring(), "counts":self.counts.tostring()}
+
+    def __setstate__(self, state):
+        self.features = state["features"]
+        self.feature_index = {}
+        for index in range(len(self.features)):
+            self.feature_index[self.features[index]] = index
+        self.probabilities = array.array('d')
+        self.probabilities.fromstring(state["probabilities"])
+        self.counts = array.array('d')
+        self.counts.fromstring(state["counts"])
+
+    def get_size(self):
+        return len(self.features)
+
+    def add_feature(self, feature, true_prob=0.5, false_prob=0.5):
+        # Returns the row of the feature, a new feature starts with the given probabilities and zero counts
+        if feature in self.feature_index:
+            return self.feature_index[feature]
+        index = len(self.features)
+        self.feature_index[feature] = index
+        self.features.append(feature)
+        self.probabilities.extend((true_prob, false_prob))
+        self.counts.extend((0.0, 0.0))
+        return index
+
+    def set_probabilities(self, index, true_prob, false_prob):
+        self.probabilities[2*index] = true_prob
+        self.probabilities[2*index+1] = false_prob
+
+    def get_probability_array(self):
+        return numpy.frombuffer(self.probabilities, dtype=numpy.float64).reshape(-1, 2)
+
+    def get_count_array(self):
+        return numpy.frombuffer(self.counts, dtype=numpy.float64).reshape(-1, 2)
+
+    def reset_counts(self):
+        if len(self.features) != 0:
+            self.get_count_array().fill(0)
+
+    def normalize(self, rows=None, prior_counts=None):
+        # M-step for the given rows (all if None): probabilities = (counts + prior_counts) / row totals,
+        # 0.5 for rows without counts. Returns the maximum absolute change of any probability
+        if len(self.features) == 0:
+            return 0
+        probabilities = self.get_probability_array()
+        counts = self.get_count_array()
+        if rows is None:
+            rows = slice(None)
+        row_counts = counts[rows]
+        if prior_counts is not None:
+            row_counts = row_counts + prior_counts[rows]
+        totals = row_counts.sum(axis=1)
+        new_probabilities = numpy.empty(row_counts.shape)
+        new_probabilities.fill(0.5)
+        nonzero = totals != 0
+        new_probabilities[nonzero] = row_counts[nonzero] / totals[nonzero][:, numpy.newaxis]
+        max_param_delta = 0
+        if len(new_probabilities) != 0:
+            max_param_delta = float(numpy.abs(new_probabilities - probabilities[rows]).max())
+        probabilities[rows] = new_probabilities
+        return max_param_delta
+
+    def to_probability_dict(self):
+        return self.to_dict(self.probabilities)
+
+    def to_count_dict(self, prior_counts=None):
+        if prior_counts is None:
+            return self.to_dict(self.counts)
+        return self.to_dict((self.get_count_array() + prior_counts).ravel().tolist())
+
+    def to_dict(self, values):
+        # feature -> {"true":value, "false":value}
+        values = list(values)
+        table = {}
+        for index in range(len(self.features)):
+            table[self.features[index]] = {"true":values[2*index], "false":values[2*index+1]}
+        return table
@@ -0,0 +1,156 @@
+#===================================================================================
+#title           : functions_compressed_io.py                                      =
+#description     : Open plain, gzip, bzip2 and xz files by their extension         =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+import os
+import io
+import gzip
+import bz2
+import zlib
+# xz needs the lzma module (backports.lzma for python 2.7), the other formats work without it
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+COMPRESSION_EXTENSIONS = [".gz", ".bz2", ".xz"]
+# Extensions of the files whose written data can be read back after a flush: bz2 and xz writers only hand
+# complete blocks to the file, a flushed prefix of them is not readable
+FLUSHABLE_EXTENSIONS = ["", ".gz"]
+BUFFER_SIZE = 1048576
+
+class Buffered_Writer:
+    # Collects small writes (model files are written line by line) and hands them to the compressor in large blocks
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        # Like a plain file: unicode is written as ascii
+        if isinstance(data, unicode):
+            data = data.encode("ascii")
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= BUFFER_SIZE:
+            self.write_parts()
+
+    def write_parts(self):
+        if len(self.parts) != 0:
+            self.fileobj.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+
+    def flush(self):
+        # Also flushes the compressor where it can (gzip), bz2 only writes its data block by block
+        self.write_parts()
+        if hasattr(self.fileobj, "flush"):
+            self.fileobj.flush()
+
+    def get_raw_file(self):
+        # The underlying compressed file object
+        return self.fileobj
+
+    def close(self):
+        self.write_parts()
+        self.fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def sync_file(fileobj):
+    # Flushes fileobj and hands its data to the disk (fsync) where the file descriptor is available
+    fileobj.flush()
+    if isinstance(fileobj, Buffered_Writer):
+        fileobj = fileobj.get_raw_file()
+    if hasattr(fileobj, "fileno"):
+        os.fsync(fileobj.fileno())
+
+def get_compression_extension(filename):
+    for extension in COMPRESSION_EXTENSIONS:
+        if filename.endswith(extension):
+            return extension
+    return ""
+
+def strip_compression_extension(filename):
+    return filename[:len(filename)-len(get_compression_extension(filename))]
+
+def find_file(filename):
+    # filename if it exists, otherwise its first existing compressed version, otherwise filename
+    if os.path.exists(filename):
+        return filename
+    for extension in COMPRESSION_EXTENSIONS:
+        if os.path.exists(filename+extension):
+            return filename+extension
+    return filename
+
+def remove_other_versions(filename):
+    # Removes the plain and compressed versions of filename other than filename itself
+    plain_filename = strip_compression_extension(filename)
+    for other_filename in [plain_filename]+[plain_filename+extension for extension in COMPRESSION_EXTENSIONS]:
+        if other_filename != filename and os.path.exists(other_filename):
+            os.remove(other_filename)
+
+def open_file(filename, mode="r", compress_level=6):
+    # mode: "r", "rb", "w" or "wb", the compression is given by the extension of filename.
+    # Writing a file removes its other versions, find_file never picks up a stale one
+    extension = get_compression_extension(filename)
+    writing = mode.startswith("w")
+    if writing:
+        remove_other_versions(filename)
+    if extension == "":
+        return open(filename, mode, BUFFER_SIZE)
+    if extension == ".gz":
+        if writing:
+            return Buffered_Writer(gzip.GzipFile(filename, "wb", compress_level))
+        return io.BufferedReader(gzip.GzipFile(filename, "rb"), BUFFER_SIZE)
+    if extension == ".bz2":
+        if writing:
+            return Buffered_Writer(bz2.BZ2File(filename, "w", BUFFER_SIZE, compress_level))
+        return bz2.BZ2File(filename, "r", BUFFER_SIZE)
+    if lzma == None:
+        raise IOError("Reading or writing "+filename+" needs the lzma module (pip install backports.lzma)")
+    if writing:
+        return Buffered_Writer(lzma.LZMAFile(filename, "wb", preset=compress_level))
+    return io.BufferedReader(lzma.LZMAFile(filename, "rb"), BUFFER_SIZE)
+
+def get_decompressor(extension):
+    if extension == ".gz":
+        return zlib.decompressobj(16+zlib.MAX_WBITS)
+    if extension == ".bz2":
+        return bz2.BZ2Decompressor()
+    if lzma == None:
+        raise IOError("Reading .xz files needs the lzma module (pip install backports.lzma)")
+    return lzma.LZMADecompressor()
+
+def iterate_file_prefix(filename, length):
+    # Yields the first length (uncompressed) bytes of filename in blocks, also when the (compressed) file was cut
+    # after them by an interrupted writer: the file readers of gzip and lzma fail at the missing end of the stream
+    extension = get_compression_extension(filename)
+    finput = open(filename, "rb")
+    decompressor = None
+    if extension != "":
+        decompressor = get_decompressor(extension)
+    while length > 0:
+        data = finput.read(BUFFER_SIZE)
+        if not data:
+            break
+        if decompressor != None:
+            try:
+                data = decompressor.decompress(data)
+            except (IOError, EOFError):
+                break
+        data = data[:length]
+        length -= len(data)
+        yield data
+    finput.close()
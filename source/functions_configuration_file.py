@@ -32,12 +32,39 @@ def write_config_file(config_filename, config_data_dict):
     if "METHOD-TRAINING-GRAPH" in config_data_dict:
         config_file.write("[METHOD-TRAINING-GRAPH]\n"+config_data_dict["METHOD-TRAINING-GRAPH"]+"\n\n")
 
+    if "BEAM-WIDTH" in config_data_dict:
+        config_file.write("[BEAM-WIDTH]\n"+str(config_data_dict["BEAM-WIDTH"])+"\n\n")
+
     if "METHOD-FEATURE-EXTRACT" in config_data_dict:
         config_file.write("[METHOD-FEATURE-EXTRACT]\n"+config_data_dict["METHOD-FEATURE-EXTRACT"]+"\n\n")
 
     if "NUM-EM-ITERATION" in config_data_dict:
         config_file.write("[NUM-EM-ITERATION]\n"+str(config_data_dict["NUM-EM-ITERATION"])+"\n\n")
 
+    if "EM-TOLERANCE" in config_data_dict:
+        config_file.write("[EM-TOLERANCE]\n"+str(config_data_dict["EM-TOLERANCE"])+"\n\n")
+
+    if "EM-STOP-CRITERION" in config_data_dict:
+        config_file.write("[EM-STOP-CRITERION]\n"+config_data_dict["EM-STOP-CRITERION"]+"\n\n")
+
+    if "EM-MODE" in config_data_dict:
+        config_file.write("[EM-MODE]\n"+config_data_dict["EM-MODE"]+"\n\n")
+
+    if "EM-BATCH-SIZE" in config_data_dict:
+        config_file.write("[EM-BATCH-SIZE]\n"+str(config_data_dict["EM-BATCH-SIZE"])+"\n\n")
+
+    if "EM-STEPSIZE-ALPHA" in config_data_dict:
+        config_file.write("[EM-STEPSIZE-ALPHA]\n"+str(config_data_dict["EM-STEPSIZE-ALPHA"])+"\n\n")
+
+    if "EM-STEPSIZE-OFFSET" in config_data_dict:
+        config_file.write("[EM-STEPSIZE-OFFSET]\n"+str(config_data_dict["EM-STEPSIZE-OFFSET"])+"\n\n")
+
+    if "WARM-START-MODEL-DIR" in config_data_dict:
+        config_file.write("[WARM-START-MODEL-DIR]\n"+config_data_dict["WARM-START-MODEL-DIR"]+"\n\n")
+
+    if "WARM-START-TOUCHED-ONLY" in config_data_dict:
+        config_file.write("[WARM-START-TOUCHED-ONLY]\n"+str(config_data_dict["WARM-START-TOUCHED-ONLY"])+"\n\n")
+
     if "LANGUAGE-MODEL" in config_data_dict:
         config_file.write("[LANGUAGE-MODEL]\n"+config_data_dict["LANGUAGE-MODEL"]+"\n\n")
 
@@ -81,12 +108,39 @@ def parser_config_file(config_file):
             if config_data[count].strip()[1:-1] == "METHOD-TRAINING-GRAPH":
                 config_data_dict["METHOD-TRAINING-GRAPH"] = config_data[count+1].strip()
 
+            if config_data[count].strip()[1:-1] == "BEAM-WIDTH":
+                config_data_dict["BEAM-WIDTH"] = int(config_data[count+1].strip())
+
             if config_data[count].strip()[1:-1] == "METHOD-FEATURE-EXTRACT":
                 config_data_dict["METHOD-FEATURE-EXTRACT"] = config_data[count+1].strip()
                 
             if config_data[count].strip()[1:-1] == "NUM-EM-ITERATION":
                 config_data_dict["NUM-EM-ITERATION"] = int(config_data[count+1].strip())   
 
+            if config_data[count].strip()[1:-1] == "EM-TOLERANCE":
+                config_data_dict["EM-TOLERANCE"] = float(config_data[count+1].strip())
+
+            if config_data[count].strip()[1:-1] == "EM-STOP-CRITERION":
+                config_data_dict["EM-STOP-CRITERION"] = config_data[count+1].strip()
+
+            if config_data[count].strip()[1:-1] == "EM-MODE":
+                config_data_dict["EM-MODE"] = config_data[count+1].strip()
+
+            if config_data[count].strip()[1:-1] == "EM-BATCH-SIZE":
+                config_data_dict["EM-BATCH-SIZE"] = int(config_data[count+1].strip())
+
+            if config_data[count].strip()[1:-1] == "EM-STEPSIZE-ALPHA":
+                config_data_dict["EM-STEPSIZE-ALPHA"] = float(config_data[count+1].strip())
+
+            if config_data[count].strip()[1:-1] == "EM-STEPSIZE-OFFSET":
+                config_data_dict["EM-STEPSIZE-OFFSET"] = float(config_data[count+1].strip())
+
+            if config_data[count].strip()[1:-1] == "WARM-START-MODEL-DIR":
+                config_data_dict["WARM-START-MODEL-DIR"] = config_data[count+1].strip()
+
+            if config_data[count].strip()[1:-1] == "WARM-START-TOUCHED-ONLY":
+                config_data_dict["WARM-START-TOUCHED-ONLY"] = (config_data[count+1].strip() == "True")
+
             if config_data[count].strip()[1:-1] == "LANGUAGE-MODEL":
                 config_data_dict["LANGUAGE-MODEL"] = config_data[count+1].strip()
 
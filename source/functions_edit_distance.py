@@ -0,0 +1,124 @@
+#===================================================================================
+#title           : functions_edit_distance.py                                      =
+#description     : Bit-parallel token level edit distance                          =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+# Levenshtein distance between token sequences (insertion, deletion and substitution of cost 1, the same as
+# nltk's edit_distance without transpositions). The bit-parallel algorithm of Myers (1999) as formulated by
+# Hyyro (2001): a column of the dynamic programming table is kept as two bit vectors of vertical deltas
+# (python integers, so any sentence length), one column step per token of the other sentence.
+
+from symbol_table_module import CORPUS_SYMBOLS
+
+def encode_tokens(sentence):
+    # Word ids of the tokens of sentence
+    return [CORPUS_SYMBOLS.get_word_id(token) for token in sentence.split()]
+
+class Token_Pattern:
+    def __init__(self, token_ids):
+        self.length = len(token_ids)
+        # peq[word id]: bit i is set if token i of the pattern is that word
+        self.peq = {}
+        for index in range(self.length):
+            self.peq[token_ids[index]] = self.peq.get(token_ids[index], 0) | (1 << index)
+        self.all_ones = (1 << self.length) - 1
+        self.last_bit = (1 << self.length) >> 1
+
+    def get_initial_column(self):
+        # (pv, mv, score) of the empty prefix: all vertical deltas +1, last row m
+        return (self.all_ones, 0, self.length)
+
+    def edit_distance(self, token_ids, max_distance=None, start=0, start_column=None):
+        # Distance between the pattern and token_ids. With max_distance, max_distance+1 is returned as soon as the
+        # distance is known to be larger: the last row can only decrease by one per remaining token.
+        # start_column: the column of token_ids[:start] (see get_columns), the tokens before start are not read again
+        length = len(token_ids)
+        if max_distance != None and abs(self.length - length) > max_distance:
+            return max_distance + 1
+        if self.length == 0:
+            return length
+
+        peq = self.peq
+        all_ones = self.all_ones
+        last_bit = self.last_bit
+        if start_column == None:
+            start_column = self.get_initial_column()
+        pv, mv, score = start_column
+        remaining = length - start
+        for index in xrange(start, length):
+            eq = peq.get(token_ids[index], 0)
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) & all_ones) ^ pv) | eq
+            ph = (mv | ~(xh | pv)) & all_ones
+            mh = pv & xh
+            if ph & last_bit:
+                score += 1
+            elif mh & last_bit:
+                score -= 1
+            # Row 0 of the table grows by one per token
+            ph = ((ph << 1) | 1) & all_ones
+            mh = (mh << 1) & all_ones
+            pv = (mh | ~(xv | ph)) & all_ones
+            mv = ph & xv
+            remaining -= 1
+            if max_distance != None and score - remaining > max_distance:
+                return max_distance + 1
+        return score
+
+    def get_columns(self, token_ids):
+        # Columns (pv, mv, score) of every prefix of token_ids, columns[i] for token_ids[:i], columns[-1][2] is the distance
+        if self.length == 0:
+            return [(0, 0, index) for index in range(len(token_ids)+1)]
+        peq = self.peq
+        all_ones = self.all_ones
+        last_bit = self.last_bit
+        pv, mv, score = self.get_initial_column()
+        columns = [(pv, mv, score)]
+        for token_id in token_ids:
+            eq = peq.get(token_id, 0)
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) & all_ones) ^ pv) | eq
+            ph = (mv | ~(xh | pv)) & all_ones
+            mh = pv & xh
+            if ph & last_bit:
+                score += 1
+            elif mh & last_bit:
+                score -= 1
+            ph = ((ph << 1) | 1) & all_ones
+            mh = (mh << 1) & all_ones
+            pv = (mh | ~(xv | ph)) & all_ones
+            mv = ph & xv
+            columns.append((pv, mv, score))
+        return columns
+
+class Drop_Edit_Distance_Cache:
+    # Distances to a simple sentence (token ids) before and after drops. The sentence before a drop is the sentence
+    # of a major node: its columns are computed once and shared by the candidates of the major node and of its
+    # children keeping the same sentence. A sentence after a drop only differs by deleted tokens, its distance
+    # continues from the column of the longest common prefix with the sentence before the drop.
+    def __init__(self, simple_token_ids):
+        self.simple_pattern = Token_Pattern(simple_token_ids)
+        # sentence before a drop -> (token ids, columns)
+        self.before_drop = {}
+
+    def get_before_drop(self, sentence_before_drop):
+        if sentence_before_drop not in self.before_drop:
+            token_ids = encode_tokens(sentence_before_drop)
+            self.before_drop[sentence_before_drop] = (token_ids, self.simple_pattern.get_columns(token_ids))
+        return self.before_drop[sentence_before_drop]
+
+    def edit_distance_before_drop(self, sentence_before_drop):
+        token_ids, columns = self.get_before_drop(sentence_before_drop)
+        return columns[-1][2]
+
+    def edit_distance_after_drop(self, sentence_after_drop, sentence_before_drop, max_distance=None):
+        before_token_ids, columns = self.get_before_drop(sentence_before_drop)
+        token_ids = encode_tokens(sentence_after_drop)
+        start = 0
+        common_length = min(len(token_ids), len(before_token_ids))
+        while start < common_length and token_ids[start] == before_token_ids[start]:
+            start += 1
+        return self.simple_pattern.edit_distance(token_ids, max_distance, start, columns[start])
@@ -0,0 +1,18 @@
+#===================================================================================
+#title           : functions_graph_worklist.py                                     =
+#description     : Worklist expansion of training and decoder graphs               =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+import collections
+
+def expand_graph_worklist(start_nodes, expand_majornode, *args):
+    # Expands the major nodes in the order they are created (first in, first out), so that the major and operation
+    # nodes get the same names as with the old recursive expansion. expand_majornode(node_name, nodes_2_process, *args)
+    # expands one major node and appends its new children major nodes to nodes_2_process (a deque).
+    nodes_2_process = collections.deque(start_nodes)
+    while len(nodes_2_process) != 0:
+        node_name = nodes_2_process.popleft()
+        expand_majornode(node_name, nodes_2_process, *args)
@@ -7,12 +7,17 @@
 #version         : 0.1                                                             =
 #===================================================================================
 
+import os
+import cPickle
+
+import functions_compressed_io
+
 def read_model_files(model_dir, transformation_model):
     probability_tables = {}
     for trans_method in transformation_model:
-        modelfile = model_dir+"/D2S-"+trans_method.upper()+".model"
+        modelfile = functions_compressed_io.find_file(model_dir+"/D2S-"+trans_method.upper()+".model")
         probability_tables[trans_method] = {}            
-        with open(modelfile) as infile:
+        with functions_compressed_io.open_file(modelfile) as infile:
                 for line in infile:
                     data = line.split()
                     if data[0] not in probability_tables[trans_method]:
@@ -22,10 +27,56 @@ def read_model_files(model_dir, transformation_model):
         print modelfile + " done ..."
     return probability_tables 
 
-def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
+def read_feature_tables(model_dir, transformation_model, suffix):
+    # Reads D2S-*.model (suffix "model") or D2S-*.counts (suffix "counts") files with unicode feature keys, 
+    # transformations without a file are left out
+    feature_tables = {}
+    for trans_method in transformation_model:
+        tablefile = functions_compressed_io.find_file(model_dir+"/D2S-"+trans_method.upper()+"."+suffix)
+        if not os.path.exists(tablefile):
+            print tablefile + " not available ..."
+            continue
+        feature_tables[trans_method] = {}
+        with functions_compressed_io.open_file(tablefile) as infile:
+                for line in infile:
+                    data = line.decode('utf-8').split()
+                    if data[0] not in feature_tables[trans_method]:
+                        feature_tables[trans_method][data[0]] = {data[1]:float(data[2])}
+                    else:
+                        feature_tables[trans_method][data[0]][data[1]] = float(data[2])
+        print tablefile + " done ..."
+    return feature_tables
+
+def read_smt_files(model_dir):
+    # Returns the (source, target) lines of D2S-SMT.source and D2S-SMT.target
+    sourcefile = functions_compressed_io.find_file(model_dir+"/D2S-SMT.source")
+    targetfile = functions_compressed_io.find_file(model_dir+"/D2S-SMT.target")
+    fsource = functions_compressed_io.open_file(sourcefile)
+    ftarget = functions_compressed_io.open_file(targetfile)
+    smt_pairs = zip(fsource.read().splitlines(), ftarget.read().splitlines())
+    fsource.close()
+    ftarget.close()
+    print sourcefile+", "+targetfile+" done ..."
+    return smt_pairs
+
+def write_count_files(model_dir, count_tables, compress="", compress_level=6):
+    # Expected counts of the last EM iteration, needed to warm start a later training
+    for trans_method in count_tables:
+        countfile = model_dir+"/D2S-"+trans_method.upper()+".counts"+compress
+        print "Writing "+countfile+" ..."
+        foutput = functions_compressed_io.open_file(countfile, "w", compress_level)
+        feature_set = count_tables[trans_method].keys()
+        feature_set.sort()
+        for item in feature_set:
+            foutput.write(item.encode('utf-8')+"\t"+"true"+"\t"+repr(count_tables[trans_method][item]["true"])+"\n")
+            foutput.write(item.encode('utf-8')+"\t"+"false"+"\t"+repr(count_tables[trans_method][item]["false"])+"\n")
+        foutput.close()
+
+def write_model_files(model_dir, probability_tables, smt_sentence_pairs, previous_smt_pairs=[], compress="", compress_level=6):
+    # compress: "" or the extension (.gz, .bz2, .xz) of compressed model files
     if "split" in probability_tables:
-        print "Writing "+model_dir+"/D2S-SPLIT.model ..."
-        foutput = open(model_dir+"/D2S-SPLIT.model", "w")
+        print "Writing "+model_dir+"/D2S-SPLIT.model"+compress+" ..."
+        foutput = functions_compressed_io.open_file(model_dir+"/D2S-SPLIT.model"+compress, "w", compress_level)
         split_feature_set = probability_tables["split"].keys()
         split_feature_set.sort()
         for item in split_feature_set:
@@ -34,8 +85,8 @@ def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
         foutput.close()
         
     if "drop-ood" in probability_tables:
-        print "Writing "+model_dir+"/D2S-DROP-OOD.model ..."
-        foutput = open(model_dir+"/D2S-DROP-OOD.model", "w")
+        print "Writing "+model_dir+"/D2S-DROP-OOD.model"+compress+" ..."
+        foutput = functions_compressed_io.open_file(model_dir+"/D2S-DROP-OOD.model"+compress, "w", compress_level)
         drop_ood_feature_set = probability_tables["drop-ood"].keys()
         drop_ood_feature_set.sort()
         for item in drop_ood_feature_set:
@@ -44,8 +95,8 @@ def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
         foutput.close()
         
     if "drop-rel" in probability_tables:
-        print "Writing "+model_dir+"/D2S-DROP-REL.model ..."
-        foutput = open(model_dir+"/D2S-DROP-REL.model", "w")
+        print "Writing "+model_dir+"/D2S-DROP-REL.model"+compress+" ..."
+        foutput = functions_compressed_io.open_file(model_dir+"/D2S-DROP-REL.model"+compress, "w", compress_level)
         drop_rel_feature_set = probability_tables["drop-rel"].keys()
         drop_rel_feature_set.sort()
         for item in drop_rel_feature_set:
@@ -54,8 +105,8 @@ def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
         foutput.close()
 
     if "drop-mod" in probability_tables:
-        print "Writing "+model_dir+"/D2S-DROP-MOD.model ..."
-        foutput = open(model_dir+"/D2S-DROP-MOD.model", "w")
+        print "Writing "+model_dir+"/D2S-DROP-MOD.model"+compress+" ..."
+        foutput = functions_compressed_io.open_file(model_dir+"/D2S-DROP-MOD.model"+compress, "w", compress_level)
         drop_mod_feature_set = probability_tables["drop-mod"].keys()
         drop_mod_feature_set.sort()
         for item in drop_mod_feature_set:
@@ -64,10 +115,14 @@ def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
         foutput.close()       
 
     # Writing SMT training data
-    print "Writing "+model_dir+"/D2S-SMT.source ..."
-    print "Writing "+ model_dir+"/D2S-SMT.target ..."
-    fsource = open(model_dir+"/D2S-SMT.source", "w")
-    ftarget = open(model_dir+"/D2S-SMT.target", "w")
+    print "Writing "+model_dir+"/D2S-SMT.source"+compress+" ..."
+    print "Writing "+ model_dir+"/D2S-SMT.target"+compress+" ..."
+    fsource = functions_compressed_io.open_file(model_dir+"/D2S-SMT.source"+compress, "w", compress_level)
+    ftarget = functions_compressed_io.open_file(model_dir+"/D2S-SMT.target"+compress, "w", compress_level)
+    # Pairs of an earlier model (warm start) come first
+    for pair in previous_smt_pairs:
+        fsource.write(pair[0]+"\n")
+        ftarget.write(pair[1]+"\n")
     for sentid in smt_sentence_pairs:
         # print sentid
         # print smt_sentence_pairs[sentid]
@@ -76,3 +131,82 @@ def write_model_files(model_dir, probability_tables, smt_sentence_pairs):
             ftarget.write(pair[1].encode('utf-8')+"\n")
     fsource.close()
     ftarget.close()
+
+# @@@@@@@@@@@@@@@@@@@@@@@@@@ EM checkpoints @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+def get_em_checkpoint_file(checkpoint_dir, iteration):
+    # Iteration 0 is the state right after the initialization pass
+    if iteration == 0:
+        return checkpoint_dir+"/em-init.checkpoint"
+    return checkpoint_dir+"/em-iteration-"+str(iteration)+".checkpoint"
+
+def write_pickle_file(filename, data):
+    # Atomic write: a crash never leaves a half written file behind, readers see the old or the new file
+    temp_file = filename+".tmp"
+    foutput = open(temp_file, "wb")
+    cPickle.dump(data, foutput, cPickle.HIGHEST_PROTOCOL)
+    foutput.flush()
+    os.fsync(foutput.fileno())
+    foutput.close()
+    os.rename(temp_file, filename)
+    sync_directory(os.path.dirname(os.path.abspath(filename)))
+
+def sync_directory(directory):
+    # The rename of a file is only on the disk once its directory is synced
+    directory_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+def read_pickle_file(filename):
+    finput = open(filename, "rb")
+    data = cPickle.load(finput)
+    finput.close()
+    return data
+
+def write_em_checkpoint(checkpoint_dir, iteration, checkpoint_data, keep_checkpoints=0):
+    # keep_checkpoints: the number of iteration checkpoints kept, older ones are removed once this one is written
+    # (0: all are kept). The initialization checkpoint is always kept, every resume reads it
+    checkpoint_file = get_em_checkpoint_file(checkpoint_dir, iteration)
+    write_pickle_file(checkpoint_file, checkpoint_data)
+    if keep_checkpoints > 0 and iteration > 0:
+        remove_em_checkpoints(checkpoint_dir, iteration-keep_checkpoints)
+    return checkpoint_file
+
+def em_checkpoint_exists(checkpoint_dir, iteration):
+    return os.path.exists(get_em_checkpoint_file(checkpoint_dir, iteration))
+
+def read_em_checkpoint(checkpoint_dir, iteration):
+    checkpoint_file = get_em_checkpoint_file(checkpoint_dir, iteration)
+    checkpoint_data = read_pickle_file(checkpoint_file)
+    print checkpoint_file + " done ..."
+    return checkpoint_data
+
+def find_last_em_checkpoint(checkpoint_dir):
+    # Returns the last completed iteration, 0 if only the initialization is available and -1 if nothing is
+    last_iteration = -1
+    if not os.path.isdir(checkpoint_dir):
+        return last_iteration
+    for filename in os.listdir(checkpoint_dir):
+        if filename == "em-init.checkpoint":
+            last_iteration = max(last_iteration, 0)
+        elif filename.startswith("em-iteration-") and filename.endswith(".checkpoint"):
+            last_iteration = max(last_iteration, int(filename[len("em-iteration-"):-len(".checkpoint")]))
+    return last_iteration
+
+def clear_em_checkpoints(checkpoint_dir, after_iteration):
+    # Removes stale iteration checkpoints (left by an earlier run) beyond after_iteration
+    if not os.path.isdir(checkpoint_dir):
+        return
+    for filename in os.listdir(checkpoint_dir):
+        if filename.startswith("em-iteration-") and filename.endswith(".checkpoint"):
+            if int(filename[len("em-iteration-"):-len(".checkpoint")]) > after_iteration:
+                os.remove(checkpoint_dir+"/"+filename)
+
+def remove_em_checkpoints(checkpoint_dir, up_to_iteration):
+    # Removes the iteration checkpoints up to up_to_iteration (included)
+    for filename in os.listdir(checkpoint_dir):
+        if filename.startswith("em-iteration-") and filename.endswith(".checkpoint"):
+            if int(filename[len("em-iteration-"):-len(".checkpoint")]) <= up_to_iteration:
+                os.remove(checkpoint_dir+"/"+filename)
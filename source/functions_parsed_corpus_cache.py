@@ -0,0 +1,99 @@
+#===================================================================================
+#title           : functions_parsed_corpus_cache.py                                =
+#description     : Binary cache of parsed boxer-graph corpora                      =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+# A cache file CACHE_DIR/<corpus file name>.<sha1 of the corpus>.parsed holds a header record
+# {"parser_version", "sha1", "source"} followed by one pickled record per sentence (as given by the parser)
+# A cache file is only used if both the sha1 of the corpus content and the parser version match,
+# other cache files of the same corpus file name are stale and are removed once a new one is written.
+
+import os
+import hashlib
+import cPickle
+
+def get_file_sha1(filename):
+    sha1 = hashlib.sha1()
+    finput = open(filename, "rb")
+    data = finput.read(1048576)
+    while data:
+        sha1.update(data)
+        data = finput.read(1048576)
+    finput.close()
+    return sha1.hexdigest()
+
+def get_cache_file(cache_dir, xmlfile, sha1):
+    return cache_dir+"/"+os.path.basename(xmlfile)+"."+sha1+".parsed"
+
+def read_cache_header(cache_file):
+    try:
+        finput = open(cache_file, "rb")
+        header = cPickle.Unpickler(finput).load()
+        finput.close()
+        return header
+    except (IOError, EOFError, cPickle.UnpicklingError):
+        return None
+
+def remove_stale_cache_files(cache_dir, xmlfile, cache_file):
+    prefix = os.path.basename(xmlfile)+"."
+    for filename in os.listdir(cache_dir):
+        if filename.startswith(prefix) and filename.endswith(".parsed") and cache_dir+"/"+filename != cache_file:
+            # Only names of the form <corpus file name>.<sha1>.parsed
+            if len(filename) == len(prefix)+40+len(".parsed"):
+                print "Removing the stale parsed corpus cache: "+cache_dir+"/"+filename+" ..."
+                os.remove(cache_dir+"/"+filename)
+
+def iterate_parsed_corpus(xmlfile, cache_dir, parser_version, parse_function):
+    # Yields the same sentence records as parse_function(xmlfile), from the cache if it is valid,
+    # otherwise from parse_function while writing a new cache file
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    sha1 = get_file_sha1(xmlfile)
+    cache_file = get_cache_file(cache_dir, xmlfile, sha1)
+    header = {"parser_version":parser_version, "sha1":sha1, "source":os.path.abspath(xmlfile)}
+
+    cached_header = None
+    if os.path.exists(cache_file):
+        cached_header = read_cache_header(cache_file)
+    if cached_header != None and cached_header["parser_version"] == parser_version and cached_header["sha1"] == sha1:
+        print "Reading the parsed corpus cache: "+cache_file+" ..."
+        for sentence_record in read_parsed_corpus(cache_file):
+            yield sentence_record
+        return
+
+    print "Writing the parsed corpus cache: "+cache_file+" ..."
+    temp_file = cache_file+".tmp"
+    foutput = open(temp_file, "wb")
+    pickler = cPickle.Pickler(foutput, cPickle.HIGHEST_PROTOCOL)
+    pickler.dump(header)
+    completed = False
+    try:
+        for sentence_record in parse_function(xmlfile):
+            # Every record is independent, the memo would otherwise keep the whole corpus alive
+            pickler.clear_memo()
+            pickler.dump(sentence_record)
+            yield sentence_record
+        completed = True
+    finally:
+        foutput.close()
+        if completed:
+            os.rename(temp_file, cache_file)
+            remove_stale_cache_files(cache_dir, xmlfile, cache_file)
+        else:
+            os.remove(temp_file)
+
+def read_parsed_corpus(cache_file):
+    finput = open(cache_file, "rb")
+    unpickler = cPickle.Unpickler(finput)
+    # Header
+    unpickler.load()
+    while True:
+        try:
+            sentence_record = unpickler.load()
+        except EOFError:
+            break
+        yield sentence_record
+    finput.close()
@@ -0,0 +1,531 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : iterparser_xml_stanfordtokenized_boxergraph.py                  =
+#description     : Boxer-Graph-XML-Reader (C-accelerated iterparse)                =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+import os
+import re
+import random
+import collections
+import multiprocessing
+from cStringIO import StringIO
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+import functions_parsed_corpus_cache
+import functions_compressed_io
+from boxer_graph_module import Boxer_Graph
+from symbol_table_module import CORPUS_SYMBOLS
+from explore_training_graph import Explore_Training_Graph
+
+# Change this whenever the sentence records change, it invalidates the parsed corpus caches
+PARSER_VERSION = "iterparse-2"
+
+# id attribute inside a <sentence ...> start tag
+SENTENCE_ID_PATTERN = re.compile(r"""\sid\s*=\s*(["'])(.*?)\1""")
+
+class Sentence_Selection:
+    def __init__(self, sentids=None, sentid_range=None, sample=None, sample_seed=0):
+        # sentids: None or set of sentence ids (int), sentid_range: None or (first id, last id), both included,
+        # sample: None or number of sentences drawn (with sample_seed) from the sentences selected by the ids and the range
+        self.sentids = sentids
+        self.sentid_range = sentid_range
+        self.sample = sample
+        self.sample_seed = sample_seed
+
+    def select(self, sentence_ids):
+        # Sorted indices of the selected sentences, sentence_ids in file order
+        selected_indices = []
+        for index in range(len(sentence_ids)):
+            try:
+                sentid = int(sentence_ids[index])
+            except ValueError:
+                continue
+            if self.sentids != None and sentid not in self.sentids:
+                continue
+            if self.sentid_range != None and (sentid < self.sentid_range[0] or sentid > self.sentid_range[1]):
+                continue
+            selected_indices.append(index)
+        if self.sample != None and self.sample < len(selected_indices):
+            selected_indices = random.Random(self.sample_seed).sample(selected_indices, self.sample)
+            selected_indices.sort()
+        return selected_indices
+
+class ITERPARSER_XML_StanfordTokenized_BoxerGraph:
+    # Same interface and output as SAXPARSER_XML_StanfordTokenized_BoxerGraph
+    def __init__(self, process, xmlfile, output_stream, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH,
+                 parsed_corpus_cache_dir=None, parse_workers=1, sentence_selection=None, training_graph_workers=1, resume_after=None, beam_width=0):
+        # process: "training" or "testing"
+        self.process = process
+
+        self.xmlfile = xmlfile
+
+        # parsed_corpus_cache_dir: None (no cache) or the directory of the parsed corpus caches
+        self.parsed_corpus_cache_dir = parsed_corpus_cache_dir
+
+        # parse_workers: number of processes parsing ranges of sentences
+        self.parse_workers = parse_workers
+
+        # sentence_selection: None (all sentences) or Sentence_Selection
+        self.sentence_selection = sentence_selection
+
+        # training_graph_workers: number of processes building the training graphs (training only)
+        self.training_graph_workers = training_graph_workers
+
+        # resume_after: None or (number of sentences, last sentence id) already written, these sentences are skipped
+        self.resume_after = resume_after
+
+        # beam_width: 0 or the number of split operations kept per training graph (Explore_Training_Graph)
+        self.beam_width = beam_width
+
+        # output_stream: file stream for training and dictionary (or Streaming_Transformation_Writer) for testing
+        self.output_stream = output_stream
+
+        self.DISCOURSE_SENTENCE_MODEL = DISCOURSE_SENTENCE_MODEL
+        self.MAX_SPLIT_PAIR_SIZE = MAX_SPLIT_PAIR_SIZE
+        self.RESTRICTED_DROP_REL = RESTRICTED_DROP_REL
+        self.ALLOWED_DROP_MOD = ALLOWED_DROP_MOD
+        self.METHOD_TRAINING_GRAPH = METHOD_TRAINING_GRAPH
+
+    def parse_xmlfile_generating_training_graph(self):
+        training_graph_handler = None
+        training_graph_writer = None
+        if self.process == "training" and self.training_graph_workers > 1:
+            training_graph_writer = Parallel_Training_Graph_Writer(self.output_stream, self.DISCOURSE_SENTENCE_MODEL, self.MAX_SPLIT_PAIR_SIZE, self.RESTRICTED_DROP_REL,
+                                                                   self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH, self.beam_width, self.training_graph_workers)
+        elif self.process == "training":
+            training_graph_handler = Explore_Training_Graph(self.output_stream, self.DISCOURSE_SENTENCE_MODEL, self.MAX_SPLIT_PAIR_SIZE,
+                                                            self.RESTRICTED_DROP_REL, self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH, self.beam_width)
+
+        parse_function = iterparse_sentence_records
+        if self.parse_workers > 1:
+            parse_function = lambda xmlfile: parallel_iterparse_sentence_records(xmlfile, self.parse_workers)
+        if self.sentence_selection != None:
+            # Selected sentences are parsed from their byte ranges, the parsed corpus cache is not used
+            sentence_records = iterparse_selected_sentence_records(self.xmlfile, self.sentence_selection, self.parse_workers)
+        elif self.parsed_corpus_cache_dir == None:
+            sentence_records = parse_function(self.xmlfile)
+        else:
+            sentence_records = functions_parsed_corpus_cache.iterate_parsed_corpus(self.xmlfile, self.parsed_corpus_cache_dir, PARSER_VERSION, parse_function)
+
+        if self.resume_after != None:
+            sentence_records = skip_sentence_records(sentence_records, self.resume_after[0], self.resume_after[1])
+
+        print "Start parsing the document ..."
+        try:
+            for sentence_record in sentence_records:
+                if training_graph_writer != None:
+                    # The worker builds the sentence data from the record itself
+                    sentid = sentence_record[0]
+                    training_graph_writer.add_sentence_record(sentence_record)
+                else:
+                    sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph = build_sentence_data(sentence_record)
+                    if self.process == "training":
+                        training_graph_handler.explore_training_graph(sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph)
+
+                    if self.process == "testing":
+                        self.output_stream[sentid] = [main_sentence, main_sent_dict, boxer_graph]
+
+                if int(sentid)%10000 == 0:
+                    print sentid + " training data processed ..."
+            if training_graph_writer != None:
+                training_graph_writer.close()
+        finally:
+            if training_graph_writer != None:
+                training_graph_writer.terminate()
+        print "End parsing the document ..."
+
+class Output_Collector:
+    # File like output stream of a training graph worker, the written sentences go back to the main process
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def get_output(self):
+        output = "".join(self.parts)
+        self.parts = []
+        return output
+
+# Explore_Training_Graph of a training graph worker process, writing to an Output_Collector
+training_graph_worker = None
+
+def init_training_graph_worker(DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH, BEAM_WIDTH):
+    global training_graph_worker
+    training_graph_worker = Explore_Training_Graph(Output_Collector(), DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH,
+                                                   BEAM_WIDTH)
+
+def explore_training_graph_records(sentence_records):
+    # Serialized training graph sentence elements of the records (in a worker process)
+    for sentence_record in sentence_records:
+        sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph = build_sentence_data(sentence_record)
+        training_graph_worker.explore_training_graph(sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph)
+    return training_graph_worker.output_stream.get_output()
+
+class Parallel_Training_Graph_Writer:
+    # Builds the training graphs of batches of sentence records in a pool of processes. The serialized batches are
+    # written in the order they were added (the pending results are a reorder buffer), the output is byte identical
+    # to the one of Explore_Training_Graph. At most 2*workers batches are in flight.
+    def __init__(self, output_stream, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH,
+                 BEAM_WIDTH, workers, sentences_per_batch=50):
+        self.output_stream = output_stream
+        self.workers = workers
+        self.sentences_per_batch = sentences_per_batch
+        self.pool = multiprocessing.Pool(workers, init_training_graph_worker, (DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL,
+                                                                               ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH, BEAM_WIDTH))
+        self.batch = []
+        self.pending = collections.deque()
+
+    def add_sentence_record(self, sentence_record):
+        self.batch.append(sentence_record)
+        if len(self.batch) >= self.sentences_per_batch:
+            self.submit_batch()
+        while len(self.pending) > 2*self.workers:
+            self.output_stream.write(self.pending.popleft().get())
+
+    def submit_batch(self):
+        if len(self.batch) != 0:
+            self.pending.append(self.pool.apply_async(explore_training_graph_records, (self.batch,)))
+            self.batch = []
+
+    def close(self):
+        self.submit_batch()
+        while len(self.pending) != 0:
+            self.output_stream.write(self.pending.popleft().get())
+        self.pool.close()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+def get_sentence_selection(sentids, sentid_range, sample, sample_seed):
+    # From the command line values: sentids "ID:ID:..." (or ",") or a file of ids, sentid_range "FIRST:LAST", sample "N".
+    # Returns None if nothing is selected
+    if sentids == None and sentid_range == None and sample == None:
+        return None
+    sentid_set = None
+    if sentids != None:
+        if os.path.isfile(sentids):
+            sentid_set = set([int(sentid) for sentid in open(sentids).read().split()])
+        else:
+            sentid_set = set([int(sentid) for sentid in sentids.replace(",", ":").split(":") if sentid != ""])
+    sentid_interval = None
+    if sentid_range != None:
+        first, last = sentid_range.split(":")
+        sentid_interval = (int(first), int(last))
+    sample_size = None
+    if sample != None:
+        sample_size = int(sample)
+    return Sentence_Selection(sentid_set, sentid_interval, sample_size, int(sample_seed))
+
+def skip_sentence_records(sentence_records, skip_sentences, last_sentid):
+    # The records after the first skip_sentences ones, the last skipped record has to be the sentence last_sentid
+    if skip_sentences > 0:
+        print "Skipping the "+str(skip_sentences)+" sentences already written ..."
+    index = 0
+    for sentence_record in sentence_records:
+        index += 1
+        if index < skip_sentences:
+            continue
+        if index == skip_sentences:
+            if sentence_record[0] != last_sentid:
+                raise IOError("Sentence "+str(skip_sentences)+" of the corpus has the id "+sentence_record[0]+", the commit log expects "+last_sentid)
+            continue
+        yield sentence_record
+    if index < skip_sentences:
+        raise IOError("The corpus has only "+str(index)+" sentences, the commit log expects "+str(skip_sentences))
+
+def iterparse_xmlfile_stanfordtokenized_boxergraph(xmlfile):
+    # Yields (sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph) for every <sentence>
+    for sentence_record in iterparse_sentence_records(xmlfile):
+        yield build_sentence_data(sentence_record)
+
+def iterparse_sentence_records(xmlfile):
+    # Yields the record of every <sentence>, each element is cleared once it is consumed so that memory stays bounded by one sentence.
+    # xmlfile: file name (possibly compressed) or file object
+    xmlinput = xmlfile
+    if isinstance(xmlfile, basestring):
+        xmlinput = functions_compressed_io.open_file(xmlfile, "rb")
+    root = None
+    for event, element in ElementTree.iterparse(xmlinput, events=("start", "end")):
+        if event == "start":
+            if root == None:
+                root = element
+            continue
+        if element.tag == "sentence":
+            sentence_record = read_sentence_element(element)
+            element.clear()
+            root.clear()
+            yield sentence_record
+    if xmlinput is not xmlfile:
+        xmlinput.close()
+
+def scan_sentence_offsets(xmlfile):
+    # Fast pre-scan of the raw bytes: offsets and ids of all <sentence start tags and the offset right after the last </sentence>.
+    # For a compressed file the offsets are those of the uncompressed data
+    sentence_offsets = []
+    sentence_ids = []
+    last_sentence_end = -1
+    finput = functions_compressed_io.open_file(xmlfile, "rb")
+    chunk_offset = 0
+    # Bytes of the previous chunk scanned again, a tag can be split between two chunks
+    carry = ""
+    while True:
+        chunk = finput.read(4194304)
+        if not chunk:
+            break
+        data = carry+chunk
+        data_offset = chunk_offset-len(carry)
+        carry_start = len(data)-10
+        position = data.find("<sentence")
+        while position != -1:
+            tag_end = data.find(">", position)
+            if tag_end == -1:
+                # Start tag not complete yet
+                carry_start = min(carry_start, position)
+                break
+            if data[position+9] in " \t\r\n>" and (len(sentence_offsets) == 0 or data_offset+position > sentence_offsets[-1]):
+                sentence_offsets.append(data_offset+position)
+                sentid = SENTENCE_ID_PATTERN.search(data, position, tag_end)
+                sentence_ids.append(sentid.group(2) if sentid != None else "")
+            position = data.find("<sentence", position+1)
+        position = data.rfind("</sentence>")
+        if position != -1:
+            last_sentence_end = max(last_sentence_end, data_offset+position+11)
+        chunk_offset += len(chunk)
+        carry = data[max(carry_start, 0):]
+    finput.close()
+    return sentence_offsets, sentence_ids, last_sentence_end
+
+def get_sentence_ranges(sentence_offsets, last_sentence_end, indices, sentences_per_range):
+    # Byte ranges [start, end) of the sentences with the given (sorted) indices, consecutive sentences share a range
+    # of at most sentences_per_range sentences
+    ranges = []
+    range_size = 0
+    for index in indices:
+        start = sentence_offsets[index]
+        if index+1 < len(sentence_offsets):
+            end = sentence_offsets[index+1]
+        else:
+            end = last_sentence_end
+        if len(ranges) != 0 and ranges[-1][1] == start and range_size < sentences_per_range:
+            ranges[-1] = (ranges[-1][0], end)
+            range_size += 1
+        else:
+            ranges.append((start, end))
+            range_size = 1
+    return ranges
+
+def parse_sentence_range(xmlfile, start, end, sentence_offsets_start, last_sentence_end):
+    # Parses the sentences in the byte range [start, end), wrapped in the header (xml declaration, root start tag)
+    # and the footer (root end tag) of the file. Runs in a worker process
+    finput = open(xmlfile, "rb")
+    header = finput.read(sentence_offsets_start)
+    finput.seek(start)
+    data = finput.read(end-start)
+    finput.seek(last_sentence_end)
+    footer = finput.read()
+    finput.close()
+    return list(iterparse_sentence_records(StringIO(header+data+footer)))
+
+def iterparse_sentence_ranges(xmlfile, ranges, sentence_offsets_start, last_sentence_end, parse_workers):
+    # Records of the sentences in the byte ranges, in the order of the ranges. With parse_workers > 1 the ranges are
+    # parsed by a pool of processes, only a few ranges are in flight at a time to keep the memory bounded
+    if parse_workers <= 1:
+        for start, end in ranges:
+            for sentence_record in parse_sentence_range(xmlfile, start, end, sentence_offsets_start, last_sentence_end):
+                yield sentence_record
+        return
+
+    pool = multiprocessing.Pool(parse_workers)
+    try:
+        pending = collections.deque()
+        for start, end in ranges:
+            pending.append(pool.apply_async(parse_sentence_range, (xmlfile, start, end, sentence_offsets_start, last_sentence_end)))
+            if len(pending) >= 2*parse_workers:
+                for sentence_record in pending.popleft().get():
+                    yield sentence_record
+        while len(pending) != 0:
+            for sentence_record in pending.popleft().get():
+                yield sentence_record
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def parallel_iterparse_sentence_records(xmlfile, parse_workers, sentences_per_range=500):
+    # Same records in the same (file) order as iterparse_sentence_records, ranges of sentences are parsed by parse_workers processes
+    if functions_compressed_io.get_compression_extension(xmlfile) != "":
+        # Byte offsets are not available in a compressed file
+        print "Compressed file, parsing "+xmlfile+" in this process ..."
+        for sentence_record in iterparse_sentence_records(xmlfile):
+            yield sentence_record
+        return
+    sentence_offsets, sentence_ids, last_sentence_end = scan_sentence_offsets(xmlfile)
+    if len(sentence_offsets) == 0:
+        return
+    ranges = get_sentence_ranges(sentence_offsets, last_sentence_end, range(len(sentence_offsets)), sentences_per_range)
+    for sentence_record in iterparse_sentence_ranges(xmlfile, ranges, sentence_offsets[0], last_sentence_end, parse_workers):
+        yield sentence_record
+
+def iterparse_selected_sentence_records(xmlfile, sentence_selection, parse_workers=1, sentences_per_range=500):
+    # Records of the sentences chosen by sentence_selection, in file order. Only their byte ranges are parsed,
+    # a compressed file is parsed completely and the other sentences are dropped
+    sentence_offsets, sentence_ids, last_sentence_end = scan_sentence_offsets(xmlfile)
+    selected_indices = sentence_selection.select(sentence_ids)
+    print str(len(selected_indices))+" of "+str(len(sentence_ids))+" sentences selected ..."
+    if len(selected_indices) == 0:
+        return
+    if functions_compressed_io.get_compression_extension(xmlfile) != "":
+        print "Compressed file, parsing all sentences of "+xmlfile+" ..."
+        selected_indices = set(selected_indices)
+        index = 0
+        for sentence_record in iterparse_sentence_records(xmlfile):
+            if index in selected_indices:
+                yield sentence_record
+            index += 1
+        return
+    ranges = get_sentence_ranges(sentence_offsets, last_sentence_end, selected_indices, sentences_per_range)
+    for sentence_record in iterparse_sentence_ranges(xmlfile, ranges, sentence_offsets[0], last_sentence_end, parse_workers):
+        yield sentence_record
+
+def build_sentence_data(sentence_record):
+    # The dictionaries are filled in document order, like the SAX handler does. Their iteration order (and so
+    # the training graph file) is then the same whether the record was just parsed, cached or sent by a worker
+    # Strings go through CORPUS_SYMBOLS here, records coming from the cache or a worker are new objects
+    sentid, main_sentence, word_list, simple_sentences, node_list, relation_list, edges = sentence_record
+    get_symbol = CORPUS_SYMBOLS.get_symbol
+    main_sent_dict = {}
+    for wid, word, pos in word_list:
+        main_sent_dict[wid] = (CORPUS_SYMBOLS.get_word(word), get_symbol(pos))
+    boxer_graph = Boxer_Graph()
+    for symbol, positions, predicates in node_list:
+        boxer_graph.nodes[get_symbol(symbol)] = {"positions":positions, "predicates":[(get_symbol(predsym), locations) for predsym, locations in predicates]}
+    for symbol, positions, predicate in relation_list:
+        boxer_graph.relations[get_symbol(symbol)] = {"positions":positions, "predicates":get_symbol(predicate)}
+    boxer_graph.edges = [(get_symbol(par), get_symbol(dep), get_symbol(lab)) for par, dep, lab in edges]
+    return sentid, main_sentence, main_sent_dict, simple_sentences, boxer_graph
+
+def read_sentence_element(sentence_element):
+    # Record of a sentence: (sentid, main_sentence, [(wid, word, pos)], simple_sentences, [(node symbol, positions, predicates)],
+    # [(relation symbol, positions, predicate)], edges), words, nodes and relations in document order.
+    # Walks the direct children only (C level), Element.iter and itertext are slow python generators here
+    sentid = unicode(sentence_element.get("id"))
+    main_sentence = ""
+    word_list = []
+    # Word ids seen so far, locations are only kept for words of the sentence
+    word_ids = set()
+    simple_sentences = []
+    node_list = []
+    relation_list = []
+    edges = []
+
+    for child in sentence_element:
+        if child.tag == "main":
+            for s_element in child:
+                check_tag(s_element, "s", "main", sentid)
+                wordlist = read_words(s_element, word_list, word_ids, sentid)
+                if len(wordlist) == 0:
+                    main_sentence = read_text(s_element).lower()
+                else:
+                    main_sentence = (" ".join(wordlist)).lower()
+
+        elif child.tag == "simple":
+            for s_element in child:
+                check_tag(s_element, "s", "simple", sentid)
+                read_words(s_element, word_list, word_ids, sentid)
+                simple_sentences.append(read_text(s_element).lower())
+
+        elif child.tag == "box":
+            for box_element in child:
+                if box_element.tag == "nodes":
+                    for node_element in box_element:
+                        check_tag(node_element, "node", "nodes", sentid)
+                        node_list.append(read_node(node_element, word_ids, sentid))
+                elif box_element.tag == "rels":
+                    for rel_element in box_element:
+                        check_tag(rel_element, "rel", "rels", sentid)
+                        relation_list.append(read_relation(rel_element, word_ids, sentid))
+                elif box_element.tag == "edges":
+                    for edge_element in box_element:
+                        check_tag(edge_element, "edge", "edges", sentid)
+                        edges.append((unicode(edge_element.get("par")), unicode(edge_element.get("dep")), unicode(edge_element.get("lab"))))
+                else:
+                    raise_unexpected_element(box_element, "box", sentid)
+
+        else:
+            raise_unexpected_element(child, "sentence", sentid)
+
+    return sentid, main_sentence, word_list, simple_sentences, node_list, relation_list, edges
+
+def raise_unexpected_element(element, parent_tag, sentid):
+    # Elements are only read at their place in the layout of the corpus files, anything else would be lost silently
+    raise ValueError("Unexpected <"+element.tag+"> in <"+parent_tag+"> of sentence "+sentid+": the iterparse reader only reads the layout "+
+                     "sentence/{main,simple}/s/w and sentence/box/{nodes/node,rels/rel,edges/edge}, use --xml-reader sax for other layouts")
+
+def check_tag(element, tag, parent_tag, sentid):
+    if element.tag != tag:
+        raise_unexpected_element(element, parent_tag, sentid)
+
+def read_node(node_element, word_ids, sentid):
+    symbol = unicode(node_element.get("sym"))
+    positions = []
+    predicates = []
+    for element in node_element:
+        if element.tag == "span":
+            positions = read_locations(element, word_ids, sentid)
+        elif element.tag == "preds":
+            for pred_element in element:
+                check_tag(pred_element, "pred", "preds", sentid)
+                predicates.append((unicode(pred_element.get("sym")), read_locations(pred_element, word_ids, sentid)))
+        else:
+            raise_unexpected_element(element, "node", sentid)
+    predicates.sort()
+    return symbol, positions, predicates
+
+def read_relation(rel_element, word_ids, sentid):
+    symbol = unicode(rel_element.get("sym"))
+    positions = []
+    predicate = ""
+    for element in rel_element:
+        if element.tag == "span":
+            positions = read_locations(element, word_ids, sentid)
+        elif element.tag == "pred":
+            predicate = unicode(element.get("sym"))
+        else:
+            raise_unexpected_element(element, "rel", sentid)
+    return symbol, positions, predicate
+
+def read_text(s_element):
+    if len(s_element) == 0:
+        return unicode(s_element.text or "")
+    return unicode("".join(s_element.itertext()))
+
+def read_words(s_element, word_list, word_ids, sentid):
+    wordlist = []
+    for w_element in s_element:
+        check_tag(w_element, "w", "s", sentid)
+        wid = int(w_element.get("id")[1:])
+        word = unicode(w_element.text or "").lower()
+        word_list.append((wid, word, unicode(w_element.get("pos")).lower()))
+        word_ids.add(wid)
+        wordlist.append(word)
+    return wordlist
+
+def read_locations(element, word_ids, sentid):
+    # Only locations of words in the main sentence, sorted
+    locationlist = []
+    for loc_element in element:
+        check_tag(loc_element, "loc", element.tag, sentid)
+        position = int(loc_element.get("id")[1:])
+        if position in word_ids:
+            locationlist.append(position)
+    locationlist.sort()
+    return locationlist
@@ -6,8 +6,28 @@
 #version         : 0.1                                                             =
 #===================================================================================
 
+# The sentences of a split are realized from the boxer graph only if the feature method uses them:
+# SPLIT_FEATURE_SENTENCES declares it, and get_split_feature gets them as Lazy_Value thunks
+# (parent_sentence() is the sentence, children_sentence_list() the list of children sentences).
+
+class Lazy_Value:
+    # function(*args), computed by the first call and kept for the next ones
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.computed = False
+        self.value = None
+
+    def __call__(self):
+        if not self.computed:
+            self.value = self.function(*self.args)
+            self.computed = True
+            self.args = None
+        return self.value
 
 class Feature_Nov27:
+    # Split features only read the split candidate
+    SPLIT_FEATURE_SENTENCES = False
 
     def get_split_feature(self, split_tuple, parent_sentence, children_sentence_list, boxer_graph):
         # Calculating iLength
@@ -52,10 +72,12 @@ class Feature_Nov27:
         return drop_mod_feature 
 
 class Feature_Init:
+    # Split features use iLength of the parent and children sentences
+    SPLIT_FEATURE_SENTENCES = True
 
     def get_split_feature(self, split_tuple, parent_sentence, children_sentence_list, boxer_graph):
         # Calculating iLength
-        iLength = boxer_graph.calculate_iLength(parent_sentence, children_sentence_list)
+        iLength = boxer_graph.calculate_iLength(parent_sentence(), children_sentence_list())
         # Get split tuple pattern
         split_pattern = boxer_graph.get_pattern_4_split_candidate(split_tuple)
         split_feature = split_pattern+"_"+str(iLength)
@@ -6,7 +6,8 @@
 #version         : 0.1                                                             =
 #===================================================================================
 
-from nltk.metrics.distance import edit_distance
+# simple_sentence_reference: the Simple_Sentence_Reference of the training sentence (simple_sentence_reference_module),
+# token sets, token ids and edit distance columns of the simple sentences are computed once per training sentence
 
 # Compare edit distance
 def compare_edit_distance(operator,edit_dist_after_drop,  edit_dist_before_drop):
@@ -22,8 +23,22 @@ def compare_edit_distance(operator,edit_dist_after_drop,  edit_dist_before_drop)
         else:
             return False
 
+# Compare the edit distances to the simple sentence before and after a drop, the distance after the drop
+# is only computed as far as needed to decide the comparison
+def compare_edit_distance_drop(operator, sentence_after_drop, sentence_before_drop, drop_edit_distance_cache):
+    edit_dist_before_drop = drop_edit_distance_cache.edit_distance_before_drop(sentence_before_drop)
+    max_distance = None
+    if operator == "lt":
+        max_distance = edit_dist_before_drop - 1
+    if operator == "lteq":
+        max_distance = edit_dist_before_drop
+    if max_distance != None and max_distance < 0:
+        return False
+    edit_dist_after_drop = drop_edit_distance_cache.edit_distance_after_drop(sentence_after_drop, sentence_before_drop, max_distance)
+    return compare_edit_distance(operator, edit_dist_after_drop, edit_dist_before_drop)
+
 # Split Candidate: Common for all clsses
-def process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph):
+def process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
     if len(split_candidate) != len(simple_sentences):
         # Number of events is less than number of simple sentences
         return False, []
@@ -41,7 +56,7 @@ def process_split_candidate_for_split_common(split_candidate, simple_sentences,
             
             overlap_data = []
             for index in range(len(simple_sentences)):
-                simple_sent_words_set = set(simple_sentences[index].split())
+                simple_sent_words_set = simple_sentence_reference.get_token_set(simple_sentences[index])
                 overlap_words_set = subsentence_words_set & simple_sent_words_set
                 overlap_data.append((len(overlap_words_set), index))
             overlap_data.sort(reverse=True)
@@ -72,9 +87,8 @@ def process_split_candidate_for_split_common(split_candidate, simple_sentences,
                 return False, []
 
 # functions : Drop-REL Candidate
-def process_rel_candidate_for_drop_overlap(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, overlap_percentage):
-    simple_sentence = " ".join(simple_sentences)
-    simple_words = simple_sentence.split()
+def process_rel_candidate_for_drop_overlap(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, overlap_percentage):
+    simple_words = simple_sentence_reference.get_joined_token_set(simple_sentences)
 
     rel_phrase = boxer_graph.extract_relation_phrase(relnode_candidate, nodeset, main_sent_dict, filtered_mod_pos)
 
@@ -95,47 +109,41 @@ def process_rel_candidate_for_drop_overlap(relnode_candidate, filtered_mod_pos,
         else:
             return False
 
-def process_rel_candidate_for_drop_led(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, opr_drop_rel):
-    simple_sentence = " ".join(simple_sentences)
+def process_rel_candidate_for_drop_led(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, opr_drop_rel):
+    drop_edit_distance_cache = simple_sentence_reference.get_drop_edit_distance_cache(simple_sentences)
     
     sentence_before_drop = boxer_graph.extract_main_sentence(nodeset, main_sent_dict, filtered_mod_pos)
-    edit_dist_before_drop = edit_distance(sentence_before_drop.split(), simple_sentence.split())        
     
     temp_nodeset, temp_filtered_mod_pos = boxer_graph.drop_relation(nodeset, relnode_candidate, filtered_mod_pos)
     sentence_after_drop = boxer_graph.extract_main_sentence(temp_nodeset, main_sent_dict, temp_filtered_mod_pos)
-    edit_dist_after_drop = edit_distance(sentence_after_drop.split(), simple_sentence.split())
     
-    isDrop = compare_edit_distance(opr_drop_rel, edit_dist_after_drop, edit_dist_before_drop)
+    isDrop = compare_edit_distance_drop(opr_drop_rel, sentence_after_drop, sentence_before_drop, drop_edit_distance_cache)
     return isDrop
 
 # functions : Drop-MOD Candidate
-def process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, opr_drop_mod):
-    simple_sentence = " ".join(simple_sentences)
+def process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, opr_drop_mod):
+    drop_edit_distance_cache = simple_sentence_reference.get_drop_edit_distance_cache(simple_sentences)
     
     sentence_before_drop = boxer_graph.extract_main_sentence(nodeset, main_sent_dict, filtered_mod_pos)
-    edit_dist_before_drop = edit_distance(sentence_before_drop.split(), simple_sentence.split())
     
     modcand_position_to_process = modcand_to_process[0]
     temp_filtered_mod_pos = filtered_mod_pos[:]+[modcand_position_to_process]
     sentence_after_drop = boxer_graph.extract_main_sentence(nodeset, main_sent_dict, temp_filtered_mod_pos)
-    edit_dist_after_drop = edit_distance(sentence_after_drop.split(), simple_sentence.split())
     
-    isDrop = compare_edit_distance(opr_drop_mod, edit_dist_after_drop, edit_dist_before_drop)
+    isDrop = compare_edit_distance_drop(opr_drop_mod, sentence_after_drop, sentence_before_drop, drop_edit_distance_cache)
     return isDrop
 
 # functions : Drop-OOD Candidate
-def process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, opr_drop_ood):
-    simple_sentence = " ".join(simple_sentences)
+def process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, opr_drop_ood):
+    drop_edit_distance_cache = simple_sentence_reference.get_drop_edit_distance_cache(simple_sentences)
     
     sentence_before_drop = boxer_graph.extract_main_sentence(nodeset, main_sent_dict, filtered_mod_pos)
-    edit_dist_before_drop = edit_distance(sentence_before_drop.split(), simple_sentence.split())
     
     temp_nodeset = nodeset[:]
     temp_nodeset.remove(oodnode_candidate)
     sentence_after_drop = boxer_graph.extract_main_sentence(temp_nodeset, main_sent_dict, filtered_mod_pos)
-    edit_dist_after_drop = edit_distance(sentence_after_drop.split(), simple_sentence.split())
 
-    isDrop = compare_edit_distance(opr_drop_ood, edit_dist_after_drop, edit_dist_before_drop)
+    isDrop = compare_edit_distance_drop(opr_drop_ood, sentence_after_drop, sentence_before_drop, drop_edit_distance_cache)
     return isDrop
 
 class Method_OVERLAP_LED:
@@ -145,23 +153,23 @@ class Method_OVERLAP_LED:
         self.opr_drop_ood = opr_drop_ood
 
     # Split candidate
-    def process_split_candidate_for_split(self, split_candidate, simple_sentences, main_sent_dict, boxer_graph):
-        isSplit, results = process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph)
+    def process_split_candidate_for_split(self, split_candidate, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isSplit, results = process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference)
         return isSplit, results    
 
     # Drop-REL Candidate
-    def process_rel_candidate_for_drop(self, relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_rel_candidate_for_drop_overlap(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.overlap_percentage)
+    def process_rel_candidate_for_drop(self, relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_rel_candidate_for_drop_overlap(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.overlap_percentage)
         return isDrop
 
     # Drop-MOD Candidate
-    def process_mod_candidate_for_drop(self, modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.opr_drop_mod)
+    def process_mod_candidate_for_drop(self, modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.opr_drop_mod)
         return isDrop
 
     # Drop-OOD Candidate
-    def process_ood_candidate_for_drop(self, oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.opr_drop_ood)
+    def process_ood_candidate_for_drop(self, oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.opr_drop_ood)
         return isDrop
 
 class Method_LED:
@@ -171,21 +179,21 @@ class Method_LED:
         self.opr_drop_ood = opr_drop_ood
 
     # Split candidate
-    def process_split_candidate_for_split(self, split_candidate, simple_sentences, main_sent_dict, boxer_graph):
-        isSplit, results = process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph)
+    def process_split_candidate_for_split(self, split_candidate, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isSplit, results = process_split_candidate_for_split_common(split_candidate, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference)
         return isSplit, results
 
     # Drop-REL Candidate
-    def process_rel_candidate_for_drop(self, relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_rel_candidate_for_drop_led(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.opr_drop_rel)
+    def process_rel_candidate_for_drop(self, relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_rel_candidate_for_drop_led(relnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.opr_drop_rel)
         return isDrop
 
     # Drop-MOD Candidate
-    def process_mod_candidate_for_drop(self, modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.opr_drop_mod)
+    def process_mod_candidate_for_drop(self, modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_mod_candidate_for_drop_led(modcand_to_process, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.opr_drop_mod)
         return isDrop
 
     # Drop-OOD Candidate
-    def process_ood_candidate_for_drop(self, oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph):
-        isDrop = process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, self.opr_drop_ood)
+    def process_ood_candidate_for_drop(self, oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference):
+        isDrop = process_ood_candidate_for_drop_led(oodnode_candidate, filtered_mod_pos, nodeset, simple_sentences, main_sent_dict, boxer_graph, simple_sentence_reference, self.opr_drop_ood)
         return isDrop
@@ -9,17 +9,20 @@
 
 from xml.sax import handler, make_parser
 
+import functions_compressed_io
+
 from boxer_graph_module import Boxer_Graph
+from symbol_table_module import CORPUS_SYMBOLS
 from explore_training_graph import Explore_Training_Graph
 
 class SAXPARSER_XML_StanfordTokenized_BoxerGraph:
-    def __init__(self, process, xmlfile, output_stream, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH):
+    def __init__(self, process, xmlfile, output_stream, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH, BEAM_WIDTH=0):
         # process: "training" or "testing" 
         self.process = process
 
         self.xmlfile = xmlfile
 
-        # output_stream: file stream for training and dictionary for testing 
+        # output_stream: file stream for training and dictionary (or Streaming_Transformation_Writer) for testing
         self.output_stream = output_stream
 
         self.DISCOURSE_SENTENCE_MODEL = DISCOURSE_SENTENCE_MODEL
@@ -27,18 +30,21 @@ class SAXPARSER_XML_StanfordTokenized_BoxerGraph:
         self.RESTRICTED_DROP_REL = RESTRICTED_DROP_REL
         self.ALLOWED_DROP_MOD = ALLOWED_DROP_MOD
         self.METHOD_TRAINING_GRAPH = METHOD_TRAINING_GRAPH
+        self.BEAM_WIDTH = BEAM_WIDTH
     
     def parse_xmlfile_generating_training_graph(self):
         handler = SAX_Handler(self.process, self.output_stream, self.DISCOURSE_SENTENCE_MODEL, self.MAX_SPLIT_PAIR_SIZE, 
-                              self.RESTRICTED_DROP_REL, self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH)
+                              self.RESTRICTED_DROP_REL, self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH, self.BEAM_WIDTH)
 
         parser = make_parser()
         parser.setContentHandler(handler)
-        parser.parse(self.xmlfile)
+        xmlinput = functions_compressed_io.open_file(self.xmlfile, "rb")
+        parser.parse(xmlinput)
+        xmlinput.close()
 
 class SAX_Handler(handler.ContentHandler):
     def __init__(self, process, output_stream, DISCOURSE_SENTENCE_MODEL, MAX_SPLIT_PAIR_SIZE, 
-                 RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH):
+                 RESTRICTED_DROP_REL, ALLOWED_DROP_MOD, METHOD_TRAINING_GRAPH, BEAM_WIDTH):
         self.process = process
         self.output_stream = output_stream
 
@@ -47,10 +53,11 @@ class SAX_Handler(handler.ContentHandler):
         self.RESTRICTED_DROP_REL = RESTRICTED_DROP_REL
         self.ALLOWED_DROP_MOD = ALLOWED_DROP_MOD
         self.METHOD_TRAINING_GRAPH = METHOD_TRAINING_GRAPH
+        self.BEAM_WIDTH = BEAM_WIDTH
 
         # Training Graph Creator
         self.training_graph_handler = Explore_Training_Graph(self.output_stream, self.DISCOURSE_SENTENCE_MODEL, self.MAX_SPLIT_PAIR_SIZE, 
-                                                             self.RESTRICTED_DROP_REL, self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH)
+                                                             self.RESTRICTED_DROP_REL, self.ALLOWED_DROP_MOD, self.METHOD_TRAINING_GRAPH, self.BEAM_WIDTH)
 
         # Sentence Data
         self.sentid = ""
@@ -110,17 +117,17 @@ class SAX_Handler(handler.ContentHandler):
         if nameElt == "w":
             self.isW = True
             self.wid = int(attrOfElt["id"][1:])
-            self.wpos = attrOfElt["pos"]
+            self.wpos = CORPUS_SYMBOLS.get_symbol(attrOfElt["pos"].lower())
             self.word = ""
             
         if nameElt == "node":
             self.isNode = True
-            self.symbol = attrOfElt["sym"]
+            self.symbol = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
             self.boxer_graph.nodes[self.symbol] = {"positions":[], "predicates":[]}
 
         if nameElt == "rel":
             self.isRel = True
-            self.symbol = attrOfElt["sym"]
+            self.symbol = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
             self.boxer_graph.relations[self.symbol] = {"positions":[], "predicates":""} 
 
         if nameElt == "span":
@@ -128,14 +135,14 @@ class SAX_Handler(handler.ContentHandler):
 
         if nameElt == "pred":
             self.locationlist = []
-            self.predsymbol = attrOfElt["sym"]
+            self.predsymbol = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
             
         if nameElt == "loc":
             if int(attrOfElt["id"][1:]) in self.main_sent_dict:
                 self.locationlist.append(int(attrOfElt["id"][1:]))
             
         if nameElt == "edge":
-            self.boxer_graph.edges.append((attrOfElt["par"], attrOfElt["dep"], attrOfElt["lab"]))
+            self.boxer_graph.edges.append((CORPUS_SYMBOLS.get_symbol(attrOfElt["par"]), CORPUS_SYMBOLS.get_symbol(attrOfElt["dep"]), CORPUS_SYMBOLS.get_symbol(attrOfElt["lab"])))
             
     def endElement(self, nameElt):
         if nameElt == "sentence":
@@ -175,8 +182,9 @@ class SAX_Handler(handler.ContentHandler):
             
         if nameElt == "w":
             self.isW = False
-            self.main_sent_dict[self.wid] = (self.word.lower(), self.wpos.lower())
-            self.wordlist.append(self.word.lower())
+            word = CORPUS_SYMBOLS.get_word(self.word.lower())
+            self.main_sent_dict[self.wid] = (word, self.wpos)
+            self.wordlist.append(word)
         
         if nameElt == "node":
             self.isNode = False
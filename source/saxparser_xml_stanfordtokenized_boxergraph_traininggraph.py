@@ -10,13 +10,36 @@
 from xml.sax import handler, make_parser
 from boxer_graph_module import Boxer_Graph
 from training_graph_module import Training_Graph
+from symbol_table_module import CORPUS_SYMBOLS
 from em_inside_outside_algorithm import EM_InsideOutside_Optimiser
-import copy
+import functions_model_files
+import functions_compressed_io
+import math
 
 class SAXPARSER_XML_StanfordTokenized_BoxerGraph_TrainingGraph:
-    def __init__(self, training_xmlfile, NUM_TRAINING_ITERATION, smt_sentence_pairs, probability_tables, count_tables, METHOD_FEATURE_EXTRACT):
+    def __init__(self, training_xmlfile, NUM_TRAINING_ITERATION, EM_TOLERANCE, EM_STOP_CRITERION, EM_MODE, EM_BATCH_SIZE, EM_STEPSIZE_ALPHA, EM_STEPSIZE_OFFSET,
+                 EM_DEDUP, em_trajectory_file, em_checkpoint_dir, smt_sentence_pairs, probability_tables, count_tables, METHOD_FEATURE_EXTRACT,
+                 EM_KEEP_CHECKPOINTS=0):
         self.training_xmlfile = training_xmlfile
         self.NUM_TRAINING_ITERATION = NUM_TRAINING_ITERATION
+        # EM_TOLERANCE: 0 disables early stopping, EM_STOP_CRITERION: "likelihood" or "parameter"
+        self.EM_TOLERANCE = EM_TOLERANCE
+        self.EM_STOP_CRITERION = EM_STOP_CRITERION
+        # EM_MODE: "batch" or "stepwise", stepwise updates after every EM_BATCH_SIZE sentences
+        # with the step size (k + EM_STEPSIZE_OFFSET)^(-EM_STEPSIZE_ALPHA) for the k-th update
+        self.EM_MODE = EM_MODE
+        self.EM_BATCH_SIZE = EM_BATCH_SIZE
+        self.EM_STEPSIZE_ALPHA = EM_STEPSIZE_ALPHA
+        self.EM_STEPSIZE_OFFSET = EM_STEPSIZE_OFFSET
+        # EM_DEDUP: iterate in memory over distinct compiled training graphs (batch EM only)
+        self.EM_DEDUP = EM_DEDUP
+        if self.EM_DEDUP == True and self.EM_MODE == "stepwise":
+            print "Training graph deduplication is not used with stepwise EM, mini-batches follow the training file."
+            self.EM_DEDUP = False
+        self.em_trajectory_file = em_trajectory_file
+        self.em_checkpoint_dir = em_checkpoint_dir
+        # EM_KEEP_CHECKPOINTS: number of iteration checkpoints kept (0: all)
+        self.EM_KEEP_CHECKPOINTS = EM_KEEP_CHECKPOINTS
         self.smt_sentence_pairs = smt_sentence_pairs
         self.probability_tables = probability_tables
         self.count_tables = count_tables
@@ -24,59 +47,257 @@ class SAXPARSER_XML_StanfordTokenized_BoxerGraph_TrainingGraph:
 
         self.em_io_handler = EM_InsideOutside_Optimiser(self.smt_sentence_pairs, self.probability_tables, self.count_tables, self.METHOD_FEATURE_EXTRACT)
 
+        # EM state, restored from a checkpoint when resuming
+        self.start_iteration = 0
+        self.previous_log_likelihood = None
+        self.trajectory = []
+        self.converged = False
+        # Maximum parameter change over the stepwise updates of the current pass
+        self.pass_max_param_delta = 0
+
+        # Warm start from an earlier model (see set_warm_start_model)
+        self.warm_start_probability_tables = None
+        self.WARM_START_TOUCHED_ONLY = False
+
+        # Distributed E-step (see set_distributed_coordinator)
+        self.em_distributed = None
+
+    def set_warm_start_model(self, old_probability_tables, old_count_tables, WARM_START_TOUCHED_ONLY):
+        # The initialization seeds the probabilities with the old model, batch updates add its expected counts
+        # WARM_START_TOUCHED_ONLY: batch updates leave the features not seen in this training data unchanged (always
+        # the case for the operation types without counts in the old model, e.g. a model of stepwise EM)
+        self.warm_start_probability_tables = old_probability_tables
+        self.em_io_handler.prior_count_tables = old_count_tables
+        self.em_io_handler.warm_start_oper_types = set(old_probability_tables.keys())
+        for oper_type in old_probability_tables:
+            if oper_type not in old_count_tables and not WARM_START_TOUCHED_ONLY:
+                print "No expected counts for "+oper_type+" in the warm start model, only the features seen in the new training data are updated ..."
+        self.WARM_START_TOUCHED_ONLY = WARM_START_TOUCHED_ONLY
+
+    def set_distributed_coordinator(self, em_distributed):
+        # The E-step of every iteration is shared with workers: this process only handles shard 0
+        self.em_distributed = em_distributed
+        if self.EM_DEDUP == True:
+            print "Training graph deduplication is not used with distributed EM."
+            self.EM_DEDUP = False
+
     def parse_to_initialize_probabilitytable(self):
         # Initialize probability table and populate self.smt_sentence_pairs
+        if self.EM_DEDUP == True:
+            self.em_io_handler.enable_graph_deduplication()
         handler = SAX_Handler("init", self.em_io_handler)
         parser = make_parser()
         parser.setContentHandler(handler)
         print "Start parsing "+self.training_xmlfile+" ..."
-        parser.parse(self.training_xmlfile)
+        xmlinput = functions_compressed_io.open_file(self.training_xmlfile, "rb")
+        parser.parse(xmlinput)
+        xmlinput.close()
+        if self.EM_DEDUP == True:
+            self.print_deduplication_rate()
+        if self.warm_start_probability_tables != None:
+            print "Seeding probability tables with the warm start model ..."
+            self.em_io_handler.seed_probability_table(self.warm_start_probability_tables)
+
+        print "Writing the initialization checkpoint ..."
+        checkpoint_data = {"iteration":0, "smt_sentence_pairs":self.smt_sentence_pairs, "feature_tables":self.em_io_handler.feature_tables}
+        if self.EM_DEDUP == True:
+            checkpoint_data["compiled_graphs"] = self.em_io_handler.compiled_graphs
+        functions_model_files.clear_em_checkpoints(self.em_checkpoint_dir, 0)
+        functions_model_files.write_em_checkpoint(self.em_checkpoint_dir, 0, checkpoint_data)
+
+    def parse_to_compile_traininggraphs(self):
+        # Only collects the distinct compiled training graphs (resuming from a checkpoint written without them)
+        self.em_io_handler.enable_graph_deduplication()
+        handler = SAX_Handler("compile", self.em_io_handler)
+        parser = make_parser()
+        parser.setContentHandler(handler)
+        print "Start parsing "+self.training_xmlfile+" ..."
+        xmlinput = functions_compressed_io.open_file(self.training_xmlfile, "rb")
+        parser.parse(xmlinput)
+        xmlinput.close()
+        self.print_deduplication_rate()
+
+    def print_deduplication_rate(self):
+        compiled_graphs = self.em_io_handler.compiled_graphs
+        print "Distinct training graphs: "+str(len(compiled_graphs))+" (for "+str(sum(compiled_graphs.values()))+" training sentences)"
+
+    def resume_from_checkpoint(self, resume_iteration):
+        # resume_iteration: "last" or the number of a completed iteration (0 resumes right after the initialization)
+        if resume_iteration == "last":
+            resume_iteration = functions_model_files.find_last_em_checkpoint(self.em_checkpoint_dir)
+        else:
+            resume_iteration = int(resume_iteration)
+        if resume_iteration < 0:
+            return False
+        if not functions_model_files.em_checkpoint_exists(self.em_checkpoint_dir, resume_iteration):
+            print "No checkpoint for iteration "+str(resume_iteration)+" in "+self.em_checkpoint_dir+" (see --em-keep-checkpoints) ..."
+            return False
+
+        print "Resuming EM after iteration: "+str(resume_iteration)+" ..."
+        init_checkpoint = functions_model_files.read_em_checkpoint(self.em_checkpoint_dir, 0)
+        self.em_io_handler.restore_smt_sentence_pairs(init_checkpoint["smt_sentence_pairs"])
+        if self.EM_DEDUP == True:
+            if "compiled_graphs" in init_checkpoint:
+                self.em_io_handler.compiled_graphs = init_checkpoint["compiled_graphs"]
+                self.print_deduplication_rate()
+            else:
+                self.parse_to_compile_traininggraphs()
+        if resume_iteration == 0:
+            self.em_io_handler.restore_feature_tables(init_checkpoint["feature_tables"])
+        else:
+            iter_checkpoint = functions_model_files.read_em_checkpoint(self.em_checkpoint_dir, resume_iteration)
+            self.em_io_handler.restore_feature_tables(iter_checkpoint["feature_tables"])
+            self.previous_log_likelihood = iter_checkpoint["previous_log_likelihood"]
+            self.trajectory = iter_checkpoint["trajectory"][:]
+            self.converged = iter_checkpoint["converged"]
+            if "stepwise_state" in iter_checkpoint:
+                self.em_io_handler.restore_stepwise_state(iter_checkpoint["stepwise_state"])
+        functions_model_files.clear_em_checkpoints(self.em_checkpoint_dir, resume_iteration)
+        self.start_iteration = resume_iteration
+        return True
         
     def parse_to_iterate_probabilitytable(self):
-        handler = SAX_Handler("iter", self.em_io_handler)
+        if self.EM_MODE == "stepwise":
+            handler = SAX_Handler("iter", self.em_io_handler, self.EM_BATCH_SIZE, self.stepwise_update)
+        elif self.em_distributed != None:
+            handler = SAX_Handler("iter", self.em_io_handler, shard_id=0, num_shards=self.em_distributed.num_shards)
+            self.em_distributed.start_job(self.training_xmlfile, self.METHOD_FEATURE_EXTRACT, self.start_iteration+1)
+        else:
+            handler = SAX_Handler("iter", self.em_io_handler)
         parser = make_parser()
         parser.setContentHandler(handler)
         
-        for count in range(self.NUM_TRAINING_ITERATION):
+        # The trajectory is rewritten from the checkpointed lines when resuming
+        ftrajectory = open(self.em_trajectory_file, "w")
+        ftrajectory.write("#iteration\tlog-likelihood\trelative-change\tmax-parameter-delta\n")
+        for line in self.trajectory:
+            ftrajectory.write(line)
+        ftrajectory.flush()
+
+        iterations = range(self.start_iteration, self.NUM_TRAINING_ITERATION)
+        if self.converged == True:
+            print "EM already converged after iteration: "+str(self.start_iteration)
+            iterations = []
+
+        for count in iterations:
             print "Starting iteration: "+str(count+1)+" ..."
 
             print "Resetting all counts to ZERO ..."
             self.em_io_handler.reset_count_table()
-
-            print "Start parsing "+self.training_xmlfile+" ..."
-            parser.parse(self.training_xmlfile)  
+            self.em_io_handler.reset_log_likelihood()
+            self.pass_max_param_delta = 0
+
+            if self.em_distributed != None:
+                self.em_distributed.publish_parameters(count+1, self.em_io_handler.feature_tables)
+                print "Start parsing "+self.training_xmlfile+" (shard 0) ..."
+                xmlinput = functions_compressed_io.open_file(self.training_xmlfile, "rb")
+                parser.parse(xmlinput)
+                xmlinput.close()
+                print "Merging the partial counts of the other shards ..."
+                self.em_distributed.merge_partial_counts(count+1, self.em_io_handler)
+            elif self.EM_DEDUP == True:
+                print "Iterating over the distinct training graphs ..."
+                self.em_io_handler.iterate_over_compiled_graphs()
+            else:
+                print "Start parsing "+self.training_xmlfile+" ..."
+                xmlinput = functions_compressed_io.open_file(self.training_xmlfile, "rb")
+                parser.parse(xmlinput)
+                xmlinput.close()
             print "Ending iteration: "+str(count+1)+" ..."
+
+            log_likelihood = self.em_io_handler.log_likelihood
+            print "Corpus log-likelihood: "+str(log_likelihood)
         
-            print "Updating probability table ..."
-            self.em_io_handler.update_probability_table()
+            if self.EM_MODE == "stepwise":
+                # Probability tables are already updated after every mini-batch
+                max_param_delta = self.pass_max_param_delta
+            else:
+                print "Updating probability table ..."
+                max_param_delta = self.em_io_handler.update_probability_table(self.WARM_START_TOUCHED_ONLY)
+            print "Maximum parameter change: "+str(max_param_delta)
+
+            # Relative likelihood change is undefined for the first iteration
+            relative_change = None
+            if self.previous_log_likelihood != None and self.previous_log_likelihood != 0:
+                relative_change = abs((log_likelihood - self.previous_log_likelihood) / self.previous_log_likelihood)
+            self.previous_log_likelihood = log_likelihood
+
+            line = str(count+1)+"\t"+repr(log_likelihood)+"\t"+(repr(relative_change) if relative_change != None else "-")+"\t"+repr(max_param_delta)+"\n"
+            self.trajectory.append(line)
+            ftrajectory.write(line)
+            ftrajectory.flush()
+
+            self.converged = self.has_converged(relative_change, max_param_delta)
+
+            print "Writing the checkpoint for iteration: "+str(count+1)+" ..."
+            checkpoint_data = {"iteration":count+1, "feature_tables":self.em_io_handler.feature_tables, "previous_log_likelihood":self.previous_log_likelihood,
+                               "trajectory":self.trajectory, "converged":self.converged}
+            if self.EM_MODE == "stepwise":
+                checkpoint_data["stepwise_state"] = self.em_io_handler.get_stepwise_state()
+            functions_model_files.write_em_checkpoint(self.em_checkpoint_dir, count+1, checkpoint_data, self.EM_KEEP_CHECKPOINTS)
+
+            if self.converged == True:
+                print "EM converged after iteration: "+str(count+1)+" ("+self.EM_STOP_CRITERION+" change below "+str(self.EM_TOLERANCE)+")"
+                break
+        ftrajectory.close()
+        if self.em_distributed != None:
+            self.em_distributed.finish()
+
+        # Probability and count tables for the model files
+        self.em_io_handler.export_tables()
+
+    def stepwise_update(self):
+        step_size = math.pow(self.em_io_handler.stepwise_updates + self.EM_STEPSIZE_OFFSET, -self.EM_STEPSIZE_ALPHA)
+        max_param_delta = self.em_io_handler.stepwise_update_probability_table(step_size)
+        self.pass_max_param_delta = max(self.pass_max_param_delta, max_param_delta)
+
+    def has_converged(self, relative_change, max_param_delta):
+        if self.EM_TOLERANCE <= 0:
+            return False
+        if self.EM_STOP_CRITERION == "likelihood":
+            return relative_change != None and relative_change < self.EM_TOLERANCE
+        if self.EM_STOP_CRITERION == "parameter":
+            return max_param_delta < self.EM_TOLERANCE
+        return False
  
 class SAX_Handler(handler.ContentHandler):
-    def __init__(self, stage, em_io_handler):
-        # "init" or "iter" stage
+    # Builds the Boxer_Graph and Training_Graph of every sentence directly while parsing: the tuples of the
+    # training graph nodes are made at </node> from per-node buffers, nothing is copied at </sentence>
+    def __init__(self, stage, em_io_handler, batch_size=0, batch_update=None, shard_id=0, num_shards=1):
+        # "init", "iter" or "compile" stage
         self.stage = stage
         
         # EM algorithm handler
         self.em_io_handler = em_io_handler
-        
+
+        # Stepwise EM: batch_update is called after every batch_size sentences (0: never)
+        self.batch_size = batch_size
+        self.batch_update = batch_update
+        self.batch_count = 0
+
+        # Distributed EM: only sentences with int(sentid) % num_shards == shard_id are processed
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.sentence_count = 0
+
         # Sentence Data
         self.sentid = ""
         self.main_sentence = ""
-        self.simple_sentencs = []
+        self.simple_sentences = []
         self.main_sent_dict = {}
         # Boxer Data
-        self.boxer_graph = {"nodes":{}, "relations":{}, "edges":[]}
+        self.boxer_graph = Boxer_Graph()
         # Training Graph Data 
-        self.training_graph = {"major-nodes":{}, "oper-nodes":{}, "edges":[]}
+        self.training_graph = Training_Graph()
         
-        # Common TAG variables
+        # Common TAG variables, the text of <s>, <w> and <type> is collected in a reused buffer
         self.isS = False
-        self.sentence = ""
+        self.chars = []
 
         # Main
         self.isMain = False
         self.isWinfo = False
         self.isW = False
-        self.word = ""
         self.wid = ""
         self.wpos = ""
 
@@ -92,17 +313,19 @@ class SAX_Handler(handler.ContentHandler):
         # Node
         self.isNode = False
         self.nodesym = ""
+        self.node_positions = None
+        self.node_predicates = None
 
         # Span
         self.isSpan = False
 
         # pred
         self.isPred = False
-        self.predsym = ""
 
         # relation
         self.isRel = False
         self.relsym = ""
+        self.rel_positions = None
         
         # major oper nodes
         self.isMajorNodes = False
@@ -115,6 +338,16 @@ class SAX_Handler(handler.ContentHandler):
         # Nodeset
         self.isNodeset = False
 
+        # Training graph node buffers, a node only has the candidates and processed elements of its type
+        self.nodeset = None
+        self.node_simple_sentences = None
+        self.candidates = None
+        self.processed = None
+        self.modpos_filtered = None
+        self.split_candidate = None
+        self.oper_candidate = ""
+        self.drop_result = ""
+
         # Split
         self.isSplitCandidate = False
         self.isSplitCandidateLeft = False
@@ -137,6 +370,10 @@ class SAX_Handler(handler.ContentHandler):
         print "Start parsing the document ..."
        
     def endDocument(self):
+        # Last (partial) mini-batch
+        if self.batch_count > 0:
+            self.batch_update()
+            self.batch_count = 0
         print "End parsing the document ..."
 
     def startElement(self, nameElt, attrOfElt):
@@ -148,25 +385,25 @@ class SAX_Handler(handler.ContentHandler):
             self.simple_sentences = []
             self.main_sent_dict = {}
             # Refreshing Boxer Data
-            self.boxer_graph = {"nodes":{}, "relations":{}, "edges":[]}
+            self.boxer_graph = Boxer_Graph()
             # Refreshing Training Graph Data 
-            self.training_graph = {"major-nodes":{}, "oper-nodes":{}, "edges":[]}
+            self.training_graph = Training_Graph()
         
         if nameElt == "main":
             self.isMain = True
             
         if nameElt == "s":
             self.isS = True
-            self.sentence = ""
+            del self.chars[:]
 
         if nameElt == "winfo":
             self.isWinfo = True
             
         if nameElt == "w":
             self.isW = True
-            self.word = ""
+            del self.chars[:]
             self.wid = int(attrOfElt["id"])
-            self.wpos = attrOfElt["pos"]
+            self.wpos = CORPUS_SYMBOLS.get_symbol(attrOfElt["pos"])
         
         if nameElt == "simple":
             self.isSimple = True
@@ -185,116 +422,103 @@ class SAX_Handler(handler.ContentHandler):
 
         if nameElt == "node":
             self.isNode = True
-            self.nodesym = attrOfElt["sym"]
+            self.nodesym = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
             
             if self.isBoxer == True:
-                self.boxer_graph["nodes"][self.nodesym] = {"positions": [], "predicates":[]}
+                self.node_positions = []
+                self.node_predicates = []
+                self.boxer_graph.nodes[self.nodesym] = {"positions": self.node_positions, "predicates": self.node_predicates}
         
             if self.isTrainingGraph == True:
+                self.type = ""
                 if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym] = {"type": "", "nodeset": [], "simple-sentences":[], 
-                                                                        "split-candidates":[],
-                                                                        "ood-candidates":[], "ood-processed":[],
-                                                                        "rel-candidates":[], "rel-processed":[],
-                                                                        "mod-candidates":[], "modpos-processed":[], "modpos-filtered":[]}
+                    self.nodeset = []
+                    self.node_simple_sentences = []
+                    self.candidates = []
+                    self.processed = []
+                    self.modpos_filtered = []
                     
                 if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym] = {"type": "", 
-                                                                       "split-candidate":[], "not-split-candidates":[],
-                                                                       "ood-candidate":"", "drop-result":"",
-                                                                       "rel-candidate":"","mod-candidate":""}
+                    self.split_candidate = None
+                    self.candidates = []
+                    self.oper_candidate = ""
+                    self.drop_result = ""
 
         if nameElt == "rel":
             self.isRel = True
-            self.relsym = attrOfElt["sym"]
+            self.relsym = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
             
             if self.isBoxer == True:
-                self.boxer_graph["relations"][self.relsym] = {"positions": [], "predicates":""}
+                self.rel_positions = []
+                self.boxer_graph.relations[self.relsym] = {"positions": self.rel_positions, "predicates":""}
 
         if nameElt == "span":
             self.isSpan = True
                
         if nameElt == "pred":
             self.isPred = True
-            self.predsym = attrOfElt["sym"]
+            predsym = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
 
             if self.isBoxer == True and self.isNode == True:
-                self.boxer_graph["nodes"][self.nodesym]["predicates"].append([self.predsym, []])
+                self.node_predicates.append([predsym, []])
 
             if self.isBoxer == True and self.isRel == True:
-                self.boxer_graph["relations"][self.relsym]["predicates"] = self.predsym
+                self.boxer_graph.relations[self.relsym]["predicates"] = predsym
                 
         if nameElt == "loc":
-            if self.isBoxer == True and self.isNode == True and self.isSpan == True:
-                self.boxer_graph["nodes"][self.nodesym]["positions"].append(int(attrOfElt["id"]))
-            
-            if self.isBoxer == True and self.isNode == True and self.isPred == True:
-                self.boxer_graph["nodes"][self.nodesym]["predicates"][-1][1].append(int(attrOfElt["id"]))
-
-            if self.isBoxer == True and self.isRel == True and self.isSpan == True:
-                self.boxer_graph["relations"][self.relsym]["positions"].append(int(attrOfElt["id"]))
-
-            if self.isModposProcessed == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["modpos-processed"].append(int(attrOfElt["id"]))
-                    
-            if self.isModposFiltered == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["modpos-filtered"].append(int(attrOfElt["id"]))
+            if self.isBoxer == True:
+                if self.isNode == True and self.isSpan == True:
+                    self.node_positions.append(int(attrOfElt["id"]))
+                if self.isNode == True and self.isPred == True:
+                    self.node_predicates[-1][1].append(int(attrOfElt["id"]))
+                if self.isRel == True and self.isSpan == True:
+                    self.rel_positions.append(int(attrOfElt["id"]))
+
+            elif self.isMajorNodes == True:
+                if self.isModposProcessed == True:
+                    self.processed.append(int(attrOfElt["id"]))
+                if self.isModposFiltered == True:
+                    self.modpos_filtered.append(int(attrOfElt["id"]))
                     
         if nameElt == "edge":
+            edge = (CORPUS_SYMBOLS.get_symbol(attrOfElt["par"]), CORPUS_SYMBOLS.get_symbol(attrOfElt["dep"]), CORPUS_SYMBOLS.get_symbol(attrOfElt["lab"]))
             if self.isBoxer == True:
-                self.boxer_graph["edges"].append((attrOfElt["par"], attrOfElt["dep"], attrOfElt["lab"]))
+                self.boxer_graph.edges.append(edge)
 
             if self.isTrainingGraph == True:
-                self.training_graph["edges"].append((attrOfElt["par"], attrOfElt["dep"], attrOfElt["lab"]))
+                self.training_graph.edges.append(edge)
                 
         if nameElt == "type":
             self.isType = True
-            self.type = ""
+            del self.chars[:]
             
         if nameElt == "nodeset":
             self.isNodeset = True
 
         if nameElt == "n":
-            if self.isNodeset == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["nodeset"].append(attrOfElt["sym"])
-            if self.isSC == True:
-                if self.isSplitCandidate == True:
-                    if self.isMajorNodes == True:
-                        self.training_graph["major-nodes"][self.nodesym]["split-candidates"][-1].append(attrOfElt["sym"])
-                    if self.isOperNodes == True:
-                        self.training_graph["oper-nodes"][self.nodesym]["split-candidate"].append(attrOfElt["sym"])
-                if self.isSplitCandidateLeft == True:
-                    if self.isOperNodes == True:
-                        self.training_graph["oper-nodes"][self.nodesym]["not-split-candidates"][-1].append(attrOfElt["sym"])
-            
-            if self.isOODCandidates == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["ood-candidates"].append(attrOfElt["sym"])
-                if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym]["ood-candidate"] = attrOfElt["sym"]
-                    
-            if self.isOODProcessed == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["ood-processed"].append(attrOfElt["sym"])
-
-            if self.isRelCandidates == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["rel-candidates"].append(attrOfElt["sym"])
-                if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym]["rel-candidate"] = attrOfElt["sym"]
-                
-            if self.isRelProcessed == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["rel-processed"].append(attrOfElt["sym"])
+            sym = CORPUS_SYMBOLS.get_symbol(attrOfElt["sym"])
+            if self.isMajorNodes == True:
+                if self.isNodeset == True:
+                    self.nodeset.append(sym)
+                if self.isSC == True and self.isSplitCandidate == True:
+                    self.candidates[-1].append(sym)
+                if self.isOODCandidates == True or self.isRelCandidates == True:
+                    self.candidates.append(sym)
+                if self.isOODProcessed == True or self.isRelProcessed == True:
+                    self.processed.append(sym)
+                if self.isModCandidates == True:
+                    self.candidates.append((CORPUS_SYMBOLS.get_symbol(attrOfElt["loc"]), sym))
 
-            if self.isModCandidates == True:
-                if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["mod-candidates"].append((attrOfElt["loc"], attrOfElt["sym"]))
-                if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym]["mod-candidate"] = (attrOfElt["loc"], attrOfElt["sym"])
+            if self.isOperNodes == True:
+                if self.isSC == True:
+                    if self.isSplitCandidate == True:
+                        self.split_candidate.append(sym)
+                    if self.isSplitCandidateLeft == True:
+                        self.candidates[-1].append(sym)
+                if self.isOODCandidates == True or self.isRelCandidates == True:
+                    self.oper_candidate = sym
+                if self.isModCandidates == True:
+                    self.oper_candidate = (CORPUS_SYMBOLS.get_symbol(attrOfElt["loc"]), sym)
                     
         if nameElt == "split-candidates" or nameElt == "split-candidate-applied":
             self.isSplitCandidate = True
@@ -306,12 +530,12 @@ class SAX_Handler(handler.ContentHandler):
             self.isSC = True
             if self.isSplitCandidate == True:
                 if self.isMajorNodes == True:
-                    self.training_graph["major-nodes"][self.nodesym]["split-candidates"].append([])
+                    self.candidates.append([])
                 if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym]["split-candidate"] = []
+                    self.split_candidate = []
             if self.isSplitCandidateLeft == True:
                 if self.isOperNodes == True:
-                    self.training_graph["oper-nodes"][self.nodesym]["not-split-candidates"].append([])
+                    self.candidates.append([])
     
         if nameElt == "ood-candidate" or nameElt == "ood-candidates":
             self.isOODCandidates = True
@@ -336,67 +560,26 @@ class SAX_Handler(handler.ContentHandler):
 
         if nameElt == "is-dropped":
             if self.isOperNodes == True:
-                self.training_graph["oper-nodes"][self.nodesym]["drop-result"] = attrOfElt["val"]
+                self.drop_result = CORPUS_SYMBOLS.get_symbol(attrOfElt["val"])
 
     def endElement(self, nameElt):
-        if nameElt == "sentence":
-            # print self.sentid
-            # print
-            # print self.main_sentence
-            # print 
-            # print self.main_sent_dict
-            # print
-            # print self.simple_sentences
-            # print
-            # print self.boxer_graph
-            # print
-            # print self.training_graph
-
-            # Creating the original format of Boxer and Training Graph
-            final_boxer_graph = Boxer_Graph()
-            for nodename in self.boxer_graph["nodes"]:
-                final_boxer_graph.nodes[nodename] = copy.copy(self.boxer_graph["nodes"][nodename])
-            for nodename in self.boxer_graph["relations"]:
-                final_boxer_graph.relations[nodename] = copy.copy(self.boxer_graph["relations"][nodename])
-            final_boxer_graph.edges = self.boxer_graph["edges"][:]
-            
-            final_training_graph = Training_Graph()
-            for nodename in self.training_graph["major-nodes"]:
-                nodedict = self.training_graph["major-nodes"][nodename]
-                if nodedict["type"] == "split":
-                    final_training_graph.major_nodes[nodename] = (nodedict["type"], nodedict["nodeset"][:], nodedict["simple-sentences"][:], nodedict["split-candidates"][:])
-                if nodedict["type"] == "drop-rel":
-                    final_training_graph.major_nodes[nodename] = (nodedict["type"], nodedict["nodeset"][:], nodedict["simple-sentences"][:], nodedict["rel-candidates"][:], 
-                                                                  nodedict["rel-processed"][:], nodedict["modpos-filtered"][:])
-                if nodedict["type"] == "drop-mod":
-                    final_training_graph.major_nodes[nodename] = (nodedict["type"], nodedict["nodeset"][:], nodedict["simple-sentences"][:], nodedict["mod-candidates"][:], 
-                                                                  nodedict["modpos-processed"][:], nodedict["modpos-filtered"][:])
-                if nodedict["type"] == "drop-ood":
-                    final_training_graph.major_nodes[nodename] = (nodedict["type"], nodedict["nodeset"][:], nodedict["simple-sentences"][:], nodedict["ood-candidates"][:], 
-                                                                  nodedict["ood-processed"][:], nodedict["modpos-filtered"][:])
-                if nodedict["type"] == "fin":
-                    final_training_graph.major_nodes[nodename] = (nodedict["type"], nodedict["nodeset"][:], nodedict["simple-sentences"][:], nodedict["modpos-filtered"][:])
-            for nodename in self.training_graph["oper-nodes"]:
-                nodedict = self.training_graph["oper-nodes"][nodename]
-                if nodedict["type"] == "split":
-                    if len(nodedict["split-candidate"]) == 0:
-                        final_training_graph.oper_nodes[nodename] = (nodedict["type"], None, nodedict["not-split-candidates"][:])
-                    else:
-                        final_training_graph.oper_nodes[nodename] = (nodedict["type"], nodedict["split-candidate"], nodedict["not-split-candidates"][:])
-                if nodedict["type"] == "drop-rel":
-                    final_training_graph.oper_nodes[nodename] = (nodedict["type"], nodedict["rel-candidate"], nodedict["drop-result"])
-                if nodedict["type"] == "drop-mod":
-                    final_training_graph.oper_nodes[nodename] = (nodedict["type"], nodedict["mod-candidate"], nodedict["drop-result"])
-                if nodedict["type"] == "drop-ood":
-                    final_training_graph.oper_nodes[nodename] = (nodedict["type"], nodedict["ood-candidate"], nodedict["drop-result"])
-            final_training_graph.edges = self.training_graph["edges"][:]
+        if nameElt == "sentence" and int(self.sentid) % self.num_shards == self.shard_id:
+            self.sentence_count += 1
 
             # Process various stage "init" or "iter"
             if self.stage == "init":
-                self.em_io_handler.initialize_probabilitytable_smt_input(self.sentid, self.main_sentence, self.main_sent_dict, self.simple_sentences, final_boxer_graph, final_training_graph)
+                self.em_io_handler.initialize_probabilitytable_smt_input(self.sentid, self.main_sentence, self.main_sent_dict, self.simple_sentences, self.boxer_graph, self.training_graph)
             
             if self.stage == "iter":
-                self.em_io_handler.iterate_over_probabilitytable(self.sentid, self.main_sentence, self.main_sent_dict, self.simple_sentences, final_boxer_graph, final_training_graph)
+                self.em_io_handler.iterate_over_probabilitytable(self.sentid, self.main_sentence, self.main_sent_dict, self.simple_sentences, self.boxer_graph, self.training_graph)
+                if self.batch_size > 0:
+                    self.batch_count += 1
+                    if self.batch_count == self.batch_size:
+                        self.batch_update()
+                        self.batch_count = 0
+
+            if self.stage == "compile":
+                self.em_io_handler.collect_compiled_graph(self.main_sentence, self.main_sent_dict, self.boxer_graph, self.training_graph)
 
             if int(self.sentid)%10000 == 0:
                 print self.sentid + " training data processed ..."            
@@ -406,16 +589,17 @@ class SAX_Handler(handler.ContentHandler):
             
         if nameElt == "s":
             self.isS = False
+            sentence = "".join(self.chars)
             
             if self.isMain == True:
-                self.main_sentence = self.sentence
+                self.main_sentence = sentence
 
             if self.isSimple == True:
                 if self.isNode == True:
                     if self.isMajorNodes == True:
-                        self.training_graph["major-nodes"][self.nodesym]["simple-sentences"].append(self.sentence)
+                        self.node_simple_sentences.append(sentence)
                 else:
-                    self.simple_sentences.append(self.sentence)
+                    self.simple_sentences.append(sentence)
 
         if nameElt == "winfo":
             self.isWinfo = False
@@ -424,7 +608,7 @@ class SAX_Handler(handler.ContentHandler):
             self.isW = False
             
             if self.isWinfo == True:
-                self.main_sent_dict[self.wid] = (self.word, self.wpos) 
+                self.main_sent_dict[self.wid] = (CORPUS_SYMBOLS.get_word("".join(self.chars)), self.wpos)
 
         if nameElt == "simple":
             self.isSimple = False
@@ -444,6 +628,22 @@ class SAX_Handler(handler.ContentHandler):
         if nameElt == "node":
             self.isNode = False
 
+            # The final tuples of Training_Graph (see training_graph_module)
+            if self.isMajorNodes == True:
+                if self.type == "split":
+                    self.training_graph.major_nodes[self.nodesym] = (self.type, self.nodeset, self.node_simple_sentences, self.candidates)
+                if self.type == "drop-rel" or self.type == "drop-mod" or self.type == "drop-ood":
+                    self.training_graph.major_nodes[self.nodesym] = (self.type, self.nodeset, self.node_simple_sentences, self.candidates, self.processed, self.modpos_filtered)
+                if self.type == "fin":
+                    self.training_graph.major_nodes[self.nodesym] = (self.type, self.nodeset, self.node_simple_sentences, self.modpos_filtered)
+            if self.isOperNodes == True:
+                if self.type == "split":
+                    if self.split_candidate != None and len(self.split_candidate) == 0:
+                        self.split_candidate = None
+                    self.training_graph.oper_nodes[self.nodesym] = (self.type, self.split_candidate, self.candidates)
+                if self.type == "drop-rel" or self.type == "drop-mod" or self.type == "drop-ood":
+                    self.training_graph.oper_nodes[self.nodesym] = (self.type, self.oper_candidate, self.drop_result)
+
         if nameElt == "rel":
             self.isRel = False
 
@@ -455,10 +655,7 @@ class SAX_Handler(handler.ContentHandler):
 
         if nameElt == "type":
             self.isType = False
-            if self.isMajorNodes == True:
-                self.training_graph["major-nodes"][self.nodesym]["type"] = self.type
-            if self.isOperNodes == True:
-                self.training_graph["oper-nodes"][self.nodesym]["type"] = self.type
+            self.type = CORPUS_SYMBOLS.get_symbol("".join(self.chars))
 
         if nameElt == "nodeset":
             self.isNodeset = False
@@ -494,11 +691,5 @@ class SAX_Handler(handler.ContentHandler):
             self.isModposFiltered = False
 
     def characters(self, chrs):
-        if self.isS:
-            self.sentence += chrs
-
-        if self.isW:
-            self.word += chrs
-
-        if self.isType:
-            self.type += chrs
+        if self.isS or self.isW or self.isType:
+            self.chars.append(chrs)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : simple_sentence_reference_module.py                             =
+#description     : Token structures of the simple sentences of a training sentence =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+import array
+
+from functions_edit_distance import Drop_Edit_Distance_Cache, Token_Pattern, encode_tokens
+
+class Simple_Sentence_Reference:
+    # Created once per training sentence (Explore_Training_Graph.explore_training_graph) and handed to the
+    # training graph methods. The simple sentences of a major node are some of the simple sentences of the
+    # training sentence, everything is computed on first use and kept for the whole training sentence.
+    def __init__(self, simple_sentences):
+        self.simple_sentences = simple_sentences
+        # simple sentence -> (word ids, set of words)
+        self.tokens = {}
+        # tuple of simple sentences -> (joined word ids, set of words, Drop_Edit_Distance_Cache or None)
+        self.joined_tokens = {}
+        # simple sentence -> Token_Pattern
+        self.patterns = {}
+
+    def get_tokens(self, simple_sentence):
+        if simple_sentence not in self.tokens:
+            self.tokens[simple_sentence] = (encode_tokens(simple_sentence), set(simple_sentence.split()))
+        return self.tokens[simple_sentence]
+
+    def get_token_ids(self, simple_sentence):
+        return self.get_tokens(simple_sentence)[0]
+
+    def get_token_set(self, simple_sentence):
+        return self.get_tokens(simple_sentence)[1]
+
+    def get_edit_distance(self, sentence, simple_sentence):
+        # Token edit distance between sentence and simple_sentence
+        if simple_sentence not in self.patterns:
+            self.patterns[simple_sentence] = Token_Pattern(self.get_token_ids(simple_sentence))
+        return self.patterns[simple_sentence].edit_distance(encode_tokens(sentence))
+
+    def get_joined_tokens(self, simple_sentences):
+        # Tokens of " ".join(simple_sentences)
+        key = tuple(simple_sentences)
+        if key not in self.joined_tokens:
+            token_ids = array.array('l')
+            token_set = set()
+            for simple_sentence in simple_sentences:
+                token_ids.extend(self.get_token_ids(simple_sentence))
+                token_set.update(self.get_token_set(simple_sentence))
+            self.joined_tokens[key] = [token_ids, token_set, None]
+        return self.joined_tokens[key]
+
+    def get_joined_token_ids(self, simple_sentences):
+        return self.get_joined_tokens(simple_sentences)[0]
+
+    def get_joined_token_set(self, simple_sentences):
+        return self.get_joined_tokens(simple_sentences)[1]
+
+    def get_drop_edit_distance_cache(self, simple_sentences):
+        # Edit distances of drops to " ".join(simple_sentences)
+        joined_tokens = self.get_joined_tokens(simple_sentences)
+        if joined_tokens[2] == None:
+            joined_tokens[2] = Drop_Edit_Distance_Cache(joined_tokens[0])
+        return joined_tokens[2]
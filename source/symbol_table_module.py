@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : symbol_table_module.py                                          =
+#description     : Corpus wide interning of symbols and words                      =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#===================================================================================
+
+class Symbol_Table:
+    # One string object for every distinct node symbol, predicate, relation label, POS tag and word of the corpus.
+    # All loaders pass their strings through CORPUS_SYMBOLS: equal strings are then the same object (equality
+    # checks and dictionary lookups stop at the pointer comparison) and every occurrence shares the memory.
+    # Words also get ids: encode_main_sent_dict gives {position: (word id, pos)} with small integers for the words.
+    def __init__(self):
+        self.symbols = {}
+        self.word_ids = {}
+        self.words = []
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def get_symbol(self, symbol):
+        return self.symbols.setdefault(symbol, symbol)
+
+    def get_word(self, word):
+        word = self.symbols.setdefault(word, word)
+        if word not in self.word_ids:
+            self.word_ids[word] = len(self.words)
+            self.words.append(word)
+        return word
+
+    def get_word_id(self, word):
+        return self.word_ids[self.get_word(word)]
+
+    def get_word_from_id(self, word_id):
+        return self.words[word_id]
+
+    def encode_main_sent_dict(self, main_sent_dict):
+        encoded_sent_dict = {}
+        for position in main_sent_dict:
+            word, pos = main_sent_dict[position]
+            encoded_sent_dict[position] = (self.get_word_id(word), self.get_symbol(pos))
+        return encoded_sent_dict
+
+    def decode_main_sent_dict(self, encoded_sent_dict):
+        main_sent_dict = {}
+        for position in encoded_sent_dict:
+            word_id, pos = encoded_sent_dict[position]
+            main_sent_dict[position] = (self.words[word_id], pos)
+        return main_sent_dict
+
+# Shared by all loaders of a process
+CORPUS_SYMBOLS = Symbol_Table()
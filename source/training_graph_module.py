@@ -11,6 +11,14 @@
 import xml.etree.ElementTree as ET
 import copy
 
+def freeze_node_data(node_data):
+    # Hashable key of a node tuple, lists become tuples tagged with list (a list never equals a tuple)
+    if isinstance(node_data, list):
+        return (list,)+tuple([freeze_node_data(item) for item in node_data])
+    if isinstance(node_data, tuple):
+        return tuple([freeze_node_data(item) for item in node_data])
+    return node_data
+
 class Training_Graph:
     def __init__(self):
         '''
@@ -38,6 +46,14 @@ class Training_Graph:
         self.oper_nodes = {}
         self.edges = []
 
+        # Indexes, brought up to date on use (readers fill major_nodes and edges directly, edges are only appended)
+        # frozen major node data -> major node name
+        self.majornode_index = {}
+        # node -> children/parents in the edge order, for self.edges[:self.indexed_edges]
+        self.children_index = {}
+        self.parents_index = {}
+        self.indexed_edges = 0
+
     def get_majornode_type(self, majornode_name):
         majornode_tuple = self.major_nodes[majornode_name]
         return majornode_tuple[0]
@@ -73,6 +89,14 @@ class Training_Graph:
         else:
             return []
 
+    def get_majornode_sentence(self, majornode_name, main_sent_dict, boxer_graph):
+        nodeset = self.get_majornode_nodeset(majornode_name)
+        filtered_mod_pos = self.get_majornode_filtered_postions(majornode_name)
+        return boxer_graph.extract_main_sentence(nodeset, main_sent_dict, filtered_mod_pos)
+
+    def get_majornode_sentences(self, majornode_names, main_sent_dict, boxer_graph):
+        return [self.get_majornode_sentence(majornode_name, main_sent_dict, boxer_graph) for majornode_name in majornode_names]
+
     def get_opernode_type(self, opernode_name):
         opernode_tuple = self.oper_nodes[opernode_name]
         return opernode_tuple[0]
@@ -97,18 +121,32 @@ class Training_Graph:
 
     # @@@@@@@@@@@@@@@@@@@@@ Create nodes @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
+    def update_majornode_index(self):
+        if len(self.majornode_index) != len(self.major_nodes):
+            self.majornode_index = {}
+            for node_name in self.major_nodes:
+                self.majornode_index.setdefault(freeze_node_data(self.major_nodes[node_name]), node_name)
+
     def create_majornode(self, majornode_data):
         copy_data = copy.copy(majornode_data)
 
         # Check if node exists
-        for node_name in self.major_nodes:
-            node_data = self.major_nodes[node_name]
-            if node_data == copy_data:
+        self.update_majornode_index()
+        key = freeze_node_data(copy_data)
+        if key in self.majornode_index:
+            node_name = self.majornode_index[key]
+            if self.major_nodes[node_name] == copy_data:
                 return node_name, False
+            # The node data was changed after its creation, search all nodes
+            for node_name in self.major_nodes:
+                node_data = self.major_nodes[node_name]
+                if node_data == copy_data:
+                    return node_name, False
 
         # Otherwise create new node
         majornode_name = "MN-"+str(len(self.major_nodes)+1)
         self.major_nodes[majornode_name] = copy_data 
+        self.majornode_index.setdefault(key, majornode_name)
         return majornode_name, True
 
     def create_opernode(self, opernode_data):
@@ -162,34 +200,33 @@ class Training_Graph:
                 fin_nodes.append(major_node)
         return fin_nodes 
 
+    def update_edge_index(self):
+        for index in xrange(self.indexed_edges, len(self.edges)):
+            edge = self.edges[index]
+            self.children_index.setdefault(edge[0], []).append(edge[1])
+            self.parents_index.setdefault(edge[1], []).append(edge[0])
+        self.indexed_edges = len(self.edges)
+
     def find_children_of_majornode(self, major_node):
-        children_oper_nodes = []
-        for edge in self.edges:
-            if edge[0] == major_node:
-                children_oper_nodes.append(edge[1])
+        self.update_edge_index()
+        children_oper_nodes = self.children_index.get(major_node, [])[:]
         return children_oper_nodes
         
     def find_children_of_opernode(self, oper_node):
-        children_major_nodes = []
-        for edge in self.edges:
-            if edge[0] == oper_node:
-                children_major_nodes.append(edge[1])
+        self.update_edge_index()
+        children_major_nodes = self.children_index.get(oper_node, [])[:]
         return children_major_nodes        
 
     def find_parents_of_majornode(self, major_node):
-        parents_oper_nodes = []
-        for edge in self.edges:
-            if edge[1] == major_node:
-                parent_oper_node = edge[0]
-                parents_oper_nodes.append(parent_oper_node)
+        self.update_edge_index()
+        parents_oper_nodes = self.parents_index.get(major_node, [])[:]
         return parents_oper_nodes
 
     def find_parent_of_opernode(self, oper_node):
+        self.update_edge_index()
         parent_major_node = ""
-        for edge in self.edges:
-            if edge[1] == oper_node:
-                parent_major_node = edge[0]
-                break
+        if oper_node in self.parents_index:
+            parent_major_node = self.parents_index[oper_node][0]
         return parent_major_node
 
     # @@@@@@@@@@@@ Training Graph -> Elementary Tree @@@@@@@@@@@@@@@@@@@@
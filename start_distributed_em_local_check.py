@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : start_distributed_em_local_check.py                             =
+#description     : Runs a distributed EM with local workers against single process.=
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#usage           : python2.7 start_distributed_em_local_check.py -help             =
+#notes           : Coordinator and workers are subprocesses in a temp directory.   =
+#===================================================================================
+
+# The training is run once in a single process and twice as a distributed EM in the same shared directory: the
+# workers are started before the first coordinator and stay for the second one (the second coordinator finds
+# the job of the first one in the directory). The probabilities of all three models have to be the same.
+
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import datetime
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def read_model_dir(model_dir):
+    # (model file, feature, value) -> probability
+    probabilities = {}
+    for model_file in glob.glob(model_dir+"/D2S-*.model"):
+        for line in open(model_file):
+            data = line.split()
+            probabilities[(os.path.basename(model_file), data[0], data[1])] = float(data[2])
+    return probabilities
+
+def compare_models(reference_dir, model_dir, tolerance):
+    # Returns the differences between the two models (the shards add the counts in another order: tolerance)
+    reference = read_model_dir(reference_dir)
+    model = read_model_dir(model_dir)
+    differences = []
+    for key in sorted(set(reference.keys()) | set(model.keys())):
+        if key not in reference or key not in model:
+            differences.append(" ".join(key)+": only in one model")
+        elif abs(reference[key] - model[key]) > tolerance:
+            differences.append(" ".join(key)+": "+str(reference[key])+" != "+str(model[key]))
+    if len(reference) == 0:
+        differences.append("No model files in "+reference_dir)
+    return differences
+
+def run_training(train_boxer_graph, output_dir, num_em, extra_args, log_file):
+    os.mkdir(output_dir)
+    command = [sys.executable, "start_learning_training_models.py", "--train-boxer-graph", train_boxer_graph, "--output-dir", output_dir,
+               "--end-state", "2", "--num-em", num_em, "--no-parsed-corpus-cache"]+extra_args
+    flog = open(log_file, "w")
+    returncode = subprocess.call(command, cwd=SCRIPT_DIR, stdout=flog, stderr=subprocess.STDOUT)
+    flog.close()
+    return returncode
+
+if __name__=="__main__":
+    # Command line arguments ##############
+    argparser = argparse.ArgumentParser(prog='python start_distributed_em_local_check.py', description=('Check distributed EM against a single process EM.'))
+
+    # Optional [default value: 3] (the coordinator handles shard 0, one worker process for every other shard)
+    argparser.add_argument('--em-num-shards', help='The number of sentence shards of the distributed E-step', metavar=('EM_NUM_SHARDS'), default='3')
+
+    # Optional [default value: 3]
+    argparser.add_argument('--num-em', help='The number of EM Algorithm iterations', metavar=('NUM_EM_ITERATION'), default='3')
+
+    # Optional [default value: 300] (a worker that never reports makes the check fail instead of hang)
+    argparser.add_argument('--em-shard-timeout', help='Seconds after which the distributed E-step fails if no shard reported', metavar=('EM_SHARD_TIMEOUT'), default='300')
+
+    # Optional [default value: 1e-9]
+    argparser.add_argument('--tolerance', help='Maximum difference of a probability between the models', metavar=('TOLERANCE'), default='1e-9')
+
+    # Optional [default value: False]
+    argparser.add_argument('--keep-dir', help='Keep the temporary directory with the models and the logs', action='store_true')
+
+    # Compulsary (a small corpus, the training runs three times)
+    argparser.add_argument('--train-boxer-graph', help='The training corpus file (xml, stanford-tokenized, boxer-graph)', required=True, metavar=('Train_Boxer_Graph'))
+    # #####################################
+    args_dict = vars(argparser.parse_args(sys.argv[1:]))
+    # #####################################
+
+    train_boxer_graph = os.path.abspath(args_dict['train_boxer_graph'])
+    num_shards = int(args_dict['em_num_shards'])
+    temp_dir = tempfile.mkdtemp(prefix="distributed-em-check-")
+    shared_dir = temp_dir+"/shared"
+    timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
+    print timestamp+", Checking distributed EM ("+str(num_shards)+" shards) in "+temp_dir+" ..."
+
+    failures = []
+    workers = []
+    try:
+        print "Single process training ..."
+        if run_training(train_boxer_graph, temp_dir+"/single", args_dict['num_em'], [], temp_dir+"/single.log") != 0:
+            failures.append("Single process training failed, see "+temp_dir+"/single.log")
+
+        # Workers first: they wait for the job of the coordinator, then for the job of the second one
+        for shard_id in range(1, num_shards):
+            flog = open(temp_dir+"/worker-"+str(shard_id)+".log", "w")
+            workers.append(subprocess.Popen([sys.executable, "start_distributed_em_worker.py", "--em-distributed-dir", shared_dir, "--em-shard-id", str(shard_id),
+                                             "--em-poll-interval", "0.2", "--em-max-jobs", "2"], cwd=SCRIPT_DIR, stdout=flog, stderr=subprocess.STDOUT))
+            flog.close()
+
+        distributed_args = ["--em-distributed-dir", shared_dir, "--em-num-shards", str(num_shards), "--em-poll-interval", "0.2",
+                            "--em-shard-timeout", args_dict['em_shard_timeout']]
+        for run in ["distributed-1", "distributed-2"]:
+            print "Distributed training ("+run+") ..."
+            if run_training(train_boxer_graph, temp_dir+"/"+run, args_dict['num_em'], distributed_args, temp_dir+"/"+run+".log") != 0:
+                failures.append("Distributed training "+run+" failed, see "+temp_dir+"/"+run+".log")
+                continue
+            for difference in compare_models(temp_dir+"/single/TRANSFORMATION-MODEL-DIR", temp_dir+"/"+run+"/TRANSFORMATION-MODEL-DIR", float(args_dict['tolerance'])):
+                failures.append(run+": "+difference)
+
+        # Both jobs are done, the workers exit by themselves
+        deadline = time.time()+float(args_dict['em_shard_timeout'])
+        for shard_id in range(1, num_shards):
+            while workers[shard_id-1].poll() == None and time.time() < deadline:
+                time.sleep(0.2)
+            if workers[shard_id-1].poll() != 0:
+                failures.append("Worker of shard "+str(shard_id)+" did not finish both jobs, see "+temp_dir+"/worker-"+str(shard_id)+".log")
+    finally:
+        for worker in workers:
+            if worker.poll() == None:
+                worker.terminate()
+                worker.wait()
+
+    if len(failures) != 0:
+        print "Distributed EM check FAILED:"
+        for failure in failures:
+            print "    "+failure
+        print "The models and the logs are kept in "+temp_dir
+        sys.exit(1)
+
+    print "Distributed EM check passed: the models of both distributed runs have the probabilities of the single process run."
+    if args_dict['keep_dir']:
+        print "The models and the logs are kept in "+temp_dir
+    else:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+#===================================================================================
+#title           : start_distributed_em_worker.py                                  =
+#description     : This will run one shard of a distributed EM E-step.             =
+#author          : Shashi Narayan, shashi.narayan(at){ed.ac.uk,loria.fr,gmail.com})=                                    
+#date            : Created in 2014, Later revised in April 2016.                   =
+#version         : 0.1                                                             =
+#usage           : python2.7 start_distributed_em_worker.py -help                  =
+#notes           : Coordinator: start_learning_training_models.py                  =
+#===================================================================================
+
+import argparse
+import sys
+import datetime
+
+sys.path.append("./source")
+from em_distributed_shared_directory import EM_Distributed_Worker
+
+if __name__=="__main__":
+    # Command line arguments ##############
+    argparser = argparse.ArgumentParser(prog='python start_distributed_em_worker.py', description=('Start a distributed EM worker.'))
+
+    # Optional [default value: 1]
+    argparser.add_argument('--em-poll-interval', help='Seconds between checks of the shared directory', metavar=('EM_POLL_INTERVAL'), default='1')
+
+    # Optional [default value: 0] (0: the worker waits for the next job of the shared directory until it is stopped)
+    argparser.add_argument('--em-max-jobs', help='The number of distributed EM jobs after which the worker exits', metavar=('EM_MAX_JOBS'), default='0')
+
+    # Compulsary (1 ... EM_NUM_SHARDS-1 of the coordinator, shard 0 is processed by the coordinator)
+    argparser.add_argument('--em-shard-id', help='The shard processed by this worker', required=True, metavar=('EM_SHARD_ID'))
+
+    # Compulsary
+    argparser.add_argument('--em-distributed-dir', help='The directory shared with the coordinator', required=True, metavar=('EM_Distributed_Dir'))
+    # #####################################
+    args_dict = vars(argparser.parse_args(sys.argv[1:]))
+    # #####################################
+
+    timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
+    print timestamp+", Starting distributed EM worker (shard "+args_dict['em_shard_id']+") on "+args_dict['em_distributed_dir']+" ..."
+    em_worker = EM_Distributed_Worker(args_dict['em_distributed_dir'], int(args_dict['em_shard_id']), float(args_dict['em_poll_interval']))
+    em_worker.run(int(args_dict['em_max_jobs']))
+
+    timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
+    print timestamp+", Distributed EM worker done!!!"
@@ -18,8 +18,12 @@ sys.path.append("./source")
 MOSESTOOLDIR=""
 import functions_configuration_file
 import functions_model_files
+import functions_compressed_io
 from saxparser_xml_stanfordtokenized_boxergraph import SAXPARSER_XML_StanfordTokenized_BoxerGraph
+from iterparser_xml_stanfordtokenized_boxergraph import ITERPARSER_XML_StanfordTokenized_BoxerGraph, get_sentence_selection
 from saxparser_xml_stanfordtokenized_boxergraph_traininggraph import SAXPARSER_XML_StanfordTokenized_BoxerGraph_TrainingGraph
+from committed_writer_module import Committed_XML_Writer
+from em_distributed_shared_directory import EM_Distributed_Coordinator
 
 if __name__=="__main__":
     # Command line arguments ##############
@@ -47,6 +51,9 @@ if __name__=="__main__":
     argparser.add_argument('--method-training-graph', help='Operation set for training graph file', choices=['method-led-lt', 'method-led-lteq', 'method-0.5-lteq-lteq', 
                                                                                                              'method-0.75-lteq-lt', 'method-0.99-lteq-lt'], 
                            default='method-0.99-lteq-lt', metavar=('Method_Training_Graph'))
+
+    # Optional [default value: 0] (0 keeps every split allowed by --method-training-graph, K keeps the K splits closest to the simple sentences by edit distance)
+    argparser.add_argument('--beam-width', help='The number of split operations kept in a training graph', metavar=('BEAM_WIDTH'), default='0')
     
     # Optional [default value: update with most recent one]
     argparser.add_argument('--method-feature-extract', help='Operation set for extracting features', choices=['feature-init', 'feature-Nov27'], default='feature-Nov27', 
@@ -56,9 +63,99 @@ if __name__=="__main__":
     argparser.add_argument('--train-boxer-graph', help='The training corpus file (xml, stanford-tokenized, boxer-graph)', metavar=('Train_Boxer_Graph'),
                            default='/disk/scratch/Sentence-Simplification/Zhu-2010/TrainingData/PWKP_108016.tokenized.boxer-graph.xml')
 
+    # Optional [default value: iterparse] (both readers give the same training graph file, sax is the old pure Python reader)
+    argparser.add_argument('--xml-reader', help='Reader of the training corpus file', choices=['iterparse', 'sax'], default='iterparse', metavar=('XML_Reader'))
+
+    # Optional [default value: PARSED-CORPUS-CACHE next to the output directory] (only used with --xml-reader iterparse)
+    argparser.add_argument('--parsed-corpus-cache-dir', help='Directory of the binary caches of parsed corpus files, keyed on their content', 
+                           metavar=('Parsed_Corpus_Cache_Dir'))
+
+    # Optional [default value: False]
+    argparser.add_argument('--no-parsed-corpus-cache', help='Always parse the training corpus file, without reading or writing a cache', action='store_true')
+
+    # Optional [default value: 1] (only used with --xml-reader iterparse, sentences keep the order of the file)
+    argparser.add_argument('--parse-workers', help='The number of processes parsing ranges of sentences of the training corpus file', metavar=('PARSE_WORKERS'), default='1')
+
+    # Optional [default value: False] (Step 1 continues after the sentences committed to the training graph file by an interrupted run with the same options, --compress none or gz)
+    argparser.add_argument('--resume', help='Resume an interrupted Step 1, appending to its training graph file', action='store_true')
+
+    # Optional [default value: 1] (Step 1 with --xml-reader iterparse, the training graph file is the same as with one process)
+    argparser.add_argument('--workers', help='The number of processes building the training graphs (Step 1)', metavar=('WORKERS'), default='1')
+
+    # Optional [default value: all sentences] (ids separated by ":" or ",", or a file with one id per line)
+    argparser.add_argument('--sentids', help='Only use the sentences with these ids of the training corpus file', metavar=('Sentids'))
+
+    # Optional [default value: all sentences] (FIRST:LAST, both included)
+    argparser.add_argument('--sentid-range', help='Only use the sentences with ids in this range of the training corpus file', metavar=('Sentid_Range'))
+
+    # Optional [default value: all sentences] (drawn from the sentences selected by --sentids and --sentid-range)
+    argparser.add_argument('--sample', help='Only use a random sample of this many sentences of the training corpus file', metavar=('SAMPLE'))
+
+    # Optional [default value: 0]
+    argparser.add_argument('--sample-seed', help='Random seed of --sample', metavar=('SAMPLE_SEED'), default='0')
+
+    # Optional [default value: none] (input files are read according to their own extension)
+    argparser.add_argument('--compress', help='Compression of the training graph file and the model files written', choices=['none', 'gz', 'bz2', 'xz'], default='none', metavar=('Compress'))
+
+    # Optional [default value: 6] (1: fastest ... 9: smallest)
+    argparser.add_argument('--compress-level', help='Compression level of the written files', choices=[str(level) for level in range(1, 10)], default='6', 
+                           metavar=('Compress_Level'))
+
     # Optional [default value: 10]
     argparser.add_argument('--num-em', help='The number of EM Algorithm iterations', metavar=('NUM_EM_ITERATION'), default='10')
+
+    # Optional [default value: 0] (0 disables early stopping, --num-em is then the exact number of iterations)
+    argparser.add_argument('--em-tolerance', help='Stop EM early once the change selected by --em-stop-criterion falls below this value', metavar=('EM_TOLERANCE'), default='0')
+
+    # Optional [default value: likelihood]
+    argparser.add_argument('--em-stop-criterion', help='Change measured for early stopping: relative corpus log-likelihood change or maximum parameter change', 
+                           choices=['likelihood', 'parameter'], default='likelihood', metavar=('EM_Stop_Criterion'))
         
+    # Optional [default value: batch]
+    argparser.add_argument('--em-mode', help='Batch EM (update after every pass) or stepwise EM (update after every mini-batch)', choices=['batch', 'stepwise'], 
+                           default='batch', metavar=('EM_Mode'))
+
+    # Optional [default value: 1000] (at least 1, only used with --em-mode stepwise)
+    argparser.add_argument('--em-batch-size', help='The number of sentences in a stepwise EM mini-batch', metavar=('EM_BATCH_SIZE'), default='1000')
+
+    # Optional [default value: 0.7] (0.5 < alpha <= 1, step size for the k-th update is (k + offset)^(-alpha))
+    argparser.add_argument('--em-stepsize-alpha', help='Decay of the stepwise EM step size', metavar=('EM_STEPSIZE_ALPHA'), default='0.7')
+
+    # Optional [default value: 2] (> 0, values > 1 keep the first step size below 1)
+    argparser.add_argument('--em-stepsize-offset', help='Offset of the stepwise EM step size, larger values damp the first updates', metavar=('EM_STEPSIZE_OFFSET'), default='2')
+
+    # Optional [default value: False] (batch EM only, does not change the learned model)
+    argparser.add_argument('--em-dedup', help='Run inside-outside once per distinct training graph, kept in memory, with counts weighted by its multiplicity', 
+                           action='store_true')
+
+    # Optional [default value: not distributed] (directory shared with the workers, see start_distributed_em_worker.py)
+    argparser.add_argument('--em-distributed-dir', help='Share the EM E-step with workers on other hosts through this directory', metavar=('EM_Distributed_Dir'))
+
+    # Optional [default value: 2] (this process handles shard 0, workers the shards 1 ... EM_NUM_SHARDS-1)
+    argparser.add_argument('--em-num-shards', help='The number of sentence shards of a distributed E-step', metavar=('EM_NUM_SHARDS'), default='2')
+
+    # Optional [default value: 1]
+    argparser.add_argument('--em-poll-interval', help='Seconds between checks of the shared directory', metavar=('EM_POLL_INTERVAL'), default='1')
+
+    # Optional [default value: 3600] (0: wait for ever, the E-step of a shard has to report within this time after the last report)
+    argparser.add_argument('--em-shard-timeout', help='Seconds after which a distributed E-step fails if no shard reported its counts', metavar=('EM_SHARD_TIMEOUT'),
+                           default='3600')
+
+    # Optional [default value: no warm start] (Step 1 then only needs the new training data in --train-boxer-graph)
+    argparser.add_argument('--warm-start-model-dir', help='TRANSFORMATION-MODEL-DIR of an earlier training, its probabilities seed EM and its counts are merged', 
+                           metavar=('Warm_Start_Model_Dir'))
+
+    # Optional [default value: False]
+    argparser.add_argument('--warm-start-touched-only', help='With --warm-start-model-dir, update only the features seen in the new training data', 
+                           action='store_true')
+
+    # Optional [default value: 2] (0: all, the initialization checkpoint is always kept)
+    argparser.add_argument('--em-keep-checkpoints', help='The number of EM iteration checkpoints kept in EM-CHECKPOINT-DIR', metavar=('EM_KEEP_CHECKPOINTS'), default='2')
+
+    # Optional [default value: not resumed] (last or the number of a completed iteration, use with --start-state 2 and --d2s-config)
+    argparser.add_argument('--resume-em', help='Resume EM from the checkpoint written after the given iteration (without a value: the last one)', nargs='?', const='last',
+                           metavar=('EM_Resume_Iteration'))
+
     # Optional [default value: 0:3:/disk/scratch/Sentence-Simplification/Language-Model/simplewiki-20131030-data.srilm:0]
     argparser.add_argument('--lang-model', help='Language model information (in the moses format)', metavar=('Lang_Model'), 
                            default="0:3:/disk/scratch/Sentence-Simplification/Language-Model/simplewiki-20131030-data.srilm:0")
@@ -93,13 +190,54 @@ if __name__=="__main__":
         D2S_Config_data["RESTRICTED-DROP-RELATION"] = args_dict['restricted_drop_rel'].split(":")
         D2S_Config_data["ALLOWED-DROP-MODIFIER"] = args_dict['allowed_drop_mod'].split(":")
         D2S_Config_data["METHOD-TRAINING-GRAPH"] = args_dict['method_training_graph']
+        D2S_Config_data["BEAM-WIDTH"] = int(args_dict['beam_width'])
         D2S_Config_data["METHOD-FEATURE-EXTRACT"] = args_dict['method_feature_extract']
         D2S_Config_data["NUM-EM-ITERATION"] = int(args_dict['num_em'])
+        D2S_Config_data["EM-TOLERANCE"] = float(args_dict['em_tolerance'])
+        D2S_Config_data["EM-STOP-CRITERION"] = args_dict['em_stop_criterion']
+        D2S_Config_data["EM-MODE"] = args_dict['em_mode']
+        D2S_Config_data["EM-BATCH-SIZE"] = int(args_dict['em_batch_size'])
+        D2S_Config_data["EM-STEPSIZE-ALPHA"] = float(args_dict['em_stepsize_alpha'])
+        D2S_Config_data["EM-STEPSIZE-OFFSET"] = float(args_dict['em_stepsize_offset'])
         D2S_Config_data["LANGUAGE-MODEL"] = args_dict['lang_model']
+
+    if args_dict['warm_start_model_dir'] != None:
+        D2S_Config_data["WARM-START-MODEL-DIR"] = args_dict['warm_start_model_dir']
+        D2S_Config_data["WARM-START-TOUCHED-ONLY"] = args_dict['warm_start_touched_only']
+
+    # Configuration files written by older versions lack the newer options, use the command line values
+    if "BEAM-WIDTH" not in D2S_Config_data:
+        D2S_Config_data["BEAM-WIDTH"] = int(args_dict['beam_width'])
+    if "EM-TOLERANCE" not in D2S_Config_data:
+        D2S_Config_data["EM-TOLERANCE"] = float(args_dict['em_tolerance'])
+    if "EM-STOP-CRITERION" not in D2S_Config_data:
+        D2S_Config_data["EM-STOP-CRITERION"] = args_dict['em_stop_criterion']
+    if "EM-MODE" not in D2S_Config_data:
+        D2S_Config_data["EM-MODE"] = args_dict['em_mode']
+    if "EM-BATCH-SIZE" not in D2S_Config_data:
+        D2S_Config_data["EM-BATCH-SIZE"] = int(args_dict['em_batch_size'])
+    if "EM-STEPSIZE-ALPHA" not in D2S_Config_data:
+        D2S_Config_data["EM-STEPSIZE-ALPHA"] = float(args_dict['em_stepsize_alpha'])
+    if "EM-STEPSIZE-OFFSET" not in D2S_Config_data:
+        D2S_Config_data["EM-STEPSIZE-OFFSET"] = float(args_dict['em_stepsize_offset'])
+    # Stepwise EM values are checked here, before any training: the step size of the first update is offset^(-alpha)
+    if D2S_Config_data["EM-BATCH-SIZE"] < 1:
+        argparser.error("--em-batch-size has to be at least 1 (EM-BATCH-SIZE: "+str(D2S_Config_data["EM-BATCH-SIZE"])+")")
+    if not (0.5 < D2S_Config_data["EM-STEPSIZE-ALPHA"] <= 1):
+        argparser.error("--em-stepsize-alpha has to be in (0.5, 1] (EM-STEPSIZE-ALPHA: "+str(D2S_Config_data["EM-STEPSIZE-ALPHA"])+")")
+    if D2S_Config_data["EM-STEPSIZE-OFFSET"] <= 0:
+        argparser.error("--em-stepsize-offset has to be larger than 0 (EM-STEPSIZE-OFFSET: "+str(D2S_Config_data["EM-STEPSIZE-OFFSET"])+")")
         
     # Extracting arguments with their default values (default unless its specified)
     START_STATE = int(args_dict['start_state'])
     END_STATE = int(args_dict['end_state'])
+    # "" or the extension of the compressed files written
+    COMPRESS = ""
+    if args_dict['compress'] != "none":
+        COMPRESS = "."+args_dict['compress']
+    COMPRESS_LEVEL = int(args_dict['compress_level'])
+    if args_dict['resume'] and COMPRESS not in functions_compressed_io.FLUSHABLE_EXTENSIONS:
+        argparser.error("--resume needs a training graph file that is readable after every commit: --compress none or gz")
 
     # Start state: 1, Starting building training graph
     state = 1
@@ -108,29 +246,61 @@ if __name__=="__main__":
         print timestamp+", Starting building training graph (Step-"+str(state)+") ..."
         
         print "Input training file (xml, stanford tokenized and boxer graph): " + D2S_Config_data["TRAIN-BOXER-GRAPH"] + " ..."
-        TRAIN_TRAINING_GRAPH = args_dict['output_dir']+"/"+os.path.splitext(os.path.basename(D2S_Config_data["TRAIN-BOXER-GRAPH"]))[0]+".training-graph.xml"
+        train_boxer_graph_name = os.path.basename(functions_compressed_io.strip_compression_extension(D2S_Config_data["TRAIN-BOXER-GRAPH"]))
+        TRAIN_TRAINING_GRAPH = args_dict['output_dir']+"/"+os.path.splitext(train_boxer_graph_name)[0]+".training-graph.xml"+COMPRESS
         print "Generating training graph file (xml, stanford tokenized, boxer graph and training graph): "+TRAIN_TRAINING_GRAPH+" ..."
         
-        foutput = open(TRAIN_TRAINING_GRAPH, "w")
-        foutput.write("<?xml version=\'1.0\' encoding=\'UTF-8\'?>\n")
-        foutput.write("<Simplification-Data>\n")
+        # Sentences are committed in chunks, an interrupted Step 1 continues with --resume
+        foutput = Committed_XML_Writer(TRAIN_TRAINING_GRAPH, "<?xml version=\'1.0\' encoding=\'UTF-8\'?>\n<Simplification-Data>\n", "</Simplification-Data>\n",
+                                       COMPRESS_LEVEL, args_dict['resume'])
+        resume_after = None
+        if foutput.committed_sentences != 0:
+            resume_after = (foutput.committed_sentences, foutput.committed_sentid)
 
-        print "Creating the SAX file (xml, stanford tokenized and boxer graph) handler ..."
-        training_xml_handler = SAXPARSER_XML_StanfordTokenized_BoxerGraph("training", D2S_Config_data["TRAIN-BOXER-GRAPH"], foutput, D2S_Config_data["TRANSFORMATION-MODEL"],
-                                                                          D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
-                                                                          D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"])
+        sentence_selection = get_sentence_selection(args_dict['sentids'], args_dict['sentid_range'], args_dict['sample'], args_dict['sample_seed'])
+        training_graph_workers = int(args_dict['workers'])
+        if sentence_selection != None and args_dict['xml_reader'] == "sax":
+            print "Sentence selection needs the sentence offsets of the iterparse reader, using iterparse ..."
+        elif training_graph_workers > 1 and args_dict['xml_reader'] == "sax":
+            print "Building training graphs in worker processes needs the sentence records of the iterparse reader, using iterparse ..."
+        elif resume_after != None and args_dict['xml_reader'] == "sax":
+            print "Skipping the sentences already written needs the iterparse reader, using iterparse ..."
+        if args_dict['xml_reader'] == "sax" and sentence_selection == None and training_graph_workers <= 1 and resume_after == None:
+            print "Creating the SAX file (xml, stanford tokenized and boxer graph) handler ..."
+            training_xml_handler = SAXPARSER_XML_StanfordTokenized_BoxerGraph("training", D2S_Config_data["TRAIN-BOXER-GRAPH"], foutput, D2S_Config_data["TRANSFORMATION-MODEL"],
+                                                                              D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
+                                                                              D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"],
+                                                                              D2S_Config_data["BEAM-WIDTH"])
+        else:
+            print "Creating the iterparse file (xml, stanford tokenized and boxer graph) handler ..."
+            parsed_corpus_cache_dir = None
+            if not args_dict['no_parsed_corpus_cache']:
+                parsed_corpus_cache_dir = args_dict['parsed_corpus_cache_dir']
+                if parsed_corpus_cache_dir == None:
+                    parsed_corpus_cache_dir = os.path.dirname(os.path.abspath(args_dict['output_dir']))+"/PARSED-CORPUS-CACHE"
+            training_xml_handler = ITERPARSER_XML_StanfordTokenized_BoxerGraph("training", D2S_Config_data["TRAIN-BOXER-GRAPH"], foutput, D2S_Config_data["TRANSFORMATION-MODEL"],
+                                                                               D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
+                                                                               D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"],
+                                                                               parsed_corpus_cache_dir, int(args_dict['parse_workers']), sentence_selection,
+                                                                               training_graph_workers, resume_after, D2S_Config_data["BEAM-WIDTH"])
 
+        if D2S_Config_data["BEAM-WIDTH"] > 0:
+            print "Beam mode: keeping the "+str(D2S_Config_data["BEAM-WIDTH"])+" split operations closest to the simple sentences in every training graph ..."
         print "Start  generating training graph ..."
         print "Start parsing "+D2S_Config_data["TRAIN-BOXER-GRAPH"]+" ..."
         training_xml_handler.parse_xmlfile_generating_training_graph()
 
-        foutput.write("</Simplification-Data>\n")
         foutput.close()
 
         D2S_Config_data["TRAIN-TRAINING-GRAPH"] = TRAIN_TRAINING_GRAPH
         timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
         print timestamp+", Finished building training graph (Step-"+str(state)+")\n"
 
+        # Written already here so that an interrupted EM can be resumed with --start-state 2
+        config_file = args_dict['output_dir']+"/d2s.ini"
+        print "Writing the configuration file: "+config_file+" ...\n"
+        functions_configuration_file.write_config_file(config_file, D2S_Config_data)
+
     # Start state: 2
     state = 2
     if (int(args_dict['start_state']) <= state) and (state <= int(args_dict['end_state'])):
@@ -154,17 +324,50 @@ if __name__=="__main__":
         # @ @
         
         print "Creating the em-training XML file (stanford tokenized, boxer graph and training graph) handler ..."
+        em_trajectory_file = args_dict['output_dir']+"/em-trajectory.txt"
+        # Checkpoints of the EM state after the initialization and after every iteration
+        em_checkpoint_dir = args_dict['output_dir']+"/EM-CHECKPOINT-DIR"
+        try:
+            os.mkdir(em_checkpoint_dir)
+        except OSError:
+            print  em_checkpoint_dir + " directory already exists."
         em_training_xml_handler = SAXPARSER_XML_StanfordTokenized_BoxerGraph_TrainingGraph(D2S_Config_data["TRAIN-TRAINING-GRAPH"], D2S_Config_data["NUM-EM-ITERATION"], 
-                                                                                           smt_sentence_pairs, probability_tables, count_tables,  D2S_Config_data["METHOD-FEATURE-EXTRACT"])
+                                                                                           D2S_Config_data["EM-TOLERANCE"], D2S_Config_data["EM-STOP-CRITERION"], 
+                                                                                           D2S_Config_data["EM-MODE"], D2S_Config_data["EM-BATCH-SIZE"], 
+                                                                                           D2S_Config_data["EM-STEPSIZE-ALPHA"], D2S_Config_data["EM-STEPSIZE-OFFSET"], args_dict['em_dedup'],
+                                                                                           em_trajectory_file, em_checkpoint_dir, smt_sentence_pairs, probability_tables, count_tables,  
+                                                                                           D2S_Config_data["METHOD-FEATURE-EXTRACT"], int(args_dict['em_keep_checkpoints']))
+
+        previous_smt_pairs = []
+        if "WARM-START-MODEL-DIR" in D2S_Config_data:
+            print "Reading the warm start model: "+D2S_Config_data["WARM-START-MODEL-DIR"]+" ..."
+            old_probability_tables = functions_model_files.read_feature_tables(D2S_Config_data["WARM-START-MODEL-DIR"], D2S_Config_data["TRANSFORMATION-MODEL"], "model")
+            old_count_tables = functions_model_files.read_feature_tables(D2S_Config_data["WARM-START-MODEL-DIR"], D2S_Config_data["TRANSFORMATION-MODEL"], "counts")
+            previous_smt_pairs = functions_model_files.read_smt_files(D2S_Config_data["WARM-START-MODEL-DIR"])
+            em_training_xml_handler.set_warm_start_model(old_probability_tables, old_count_tables, D2S_Config_data["WARM-START-TOUCHED-ONLY"])
+
+        if args_dict['em_distributed_dir'] != None:
+            if D2S_Config_data["EM-MODE"] == "stepwise":
+                print "Distributed EM only supports batch EM, stepwise EM is run on this host only."
+            else:
+                em_training_xml_handler.set_distributed_coordinator(EM_Distributed_Coordinator(args_dict['em_distributed_dir'], int(args_dict['em_num_shards']), 
+                                                                                               float(args_dict['em_poll_interval']),
+                                                                                               float(args_dict['em_shard_timeout'])))
 
         print "Start Expectation Maximization (Inside-Outside) algorithm ..."
         timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
-        print timestamp+", Step "+str(state)+".1: Initialization of probability tables and populating smt_sentence_pairs ..."
-        em_training_xml_handler.parse_to_initialize_probabilitytable()
+        if args_dict['resume_em'] != None and em_training_xml_handler.resume_from_checkpoint(args_dict['resume_em']) == True:
+            print timestamp+", Step "+str(state)+".1: Probability tables and smt_sentence_pairs restored from "+em_checkpoint_dir+" ..."
+        else:
+            if args_dict['resume_em'] != None:
+                print "No EM checkpoint found in "+em_checkpoint_dir+", starting from the initialization."
+            print timestamp+", Step "+str(state)+".1: Initialization of probability tables and populating smt_sentence_pairs ..."
+            em_training_xml_handler.parse_to_initialize_probabilitytable()
         # print probability_tables
 
         timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
         print timestamp+", Step "+str(state)+".2: Start iterating for EM Inside-Outside probabilities ..."
+        print "Writing the EM trajectory (log-likelihood per iteration): "+em_trajectory_file+" ..."
         em_training_xml_handler.parse_to_iterate_probabilitytable()
         # print probability_tables
 
@@ -180,7 +383,11 @@ if __name__=="__main__":
         except OSError:
             print  model_dir + " directory already exists."
         # Wriing model files
-        functions_model_files.write_model_files(model_dir, probability_tables, smt_sentence_pairs)
+        functions_model_files.write_model_files(model_dir, probability_tables, smt_sentence_pairs, previous_smt_pairs, COMPRESS, COMPRESS_LEVEL)
+        if D2S_Config_data["EM-MODE"] == "batch":
+            functions_model_files.write_count_files(model_dir, em_training_xml_handler.em_io_handler.get_accumulated_count_tables(), COMPRESS, COMPRESS_LEVEL)
+        else:
+            print "Expected counts are only written by batch EM, a warm start from this model keeps its probabilities for the features not seen in the new training data."
 
         D2S_Config_data["TRANSFORMATION-MODEL-DIR"] = model_dir
         timestamp = datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
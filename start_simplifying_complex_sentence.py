@@ -13,6 +13,8 @@ import os
 import argparse
 import sys
 import datetime
+import itertools
+import multiprocessing
 from nltk.metrics.distance import edit_distance
 
 sys.path.append("./source")
@@ -20,35 +22,95 @@ MOSESTOOLDIR=""
 
 import functions_configuration_file
 import functions_model_files
+import functions_compressed_io
 import functions_prepare_elementtree_dot
 from saxparser_xml_stanfordtokenized_boxergraph import SAXPARSER_XML_StanfordTokenized_BoxerGraph
+from iterparser_xml_stanfordtokenized_boxergraph import ITERPARSER_XML_StanfordTokenized_BoxerGraph, get_sentence_selection
 from explore_decoder_graph_greedy import Explore_Decoder_Graph_Greedy
 from explore_decoder_graph_explorative import Explore_Decoder_Graph_Explorative
 
-def get_greedy_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT):
+def get_greedy_transformed_sentences(decoder_graph_explorer, sentid, sent_data):
+    main_sentence =  sent_data[0]
+    main_sent_dict = sent_data[1]
+    boxer_graph = sent_data[2]
+
+    # Explore decoder graph
+    decoder_graph = decoder_graph_explorer.explore_decoder_graph(str(sentid), main_sentence, main_sent_dict, boxer_graph)
+    
+    # # Generating boxer and decoder graph
+    # if sentid not in  [13, 28, 41]:
+    #     functions_prepare_elementtree_dot.run_visual_graph_creator(str(sentid), main_sentence, main_sent_dict, [], boxer_graph, decoder_graph) 
+
+    sentence_pairs = decoder_graph.get_final_sentences(main_sentence, main_sent_dict, boxer_graph)
+    transformed_sentences = [item[0] for item in sentence_pairs]
+    return transformed_sentences
+
+def get_explorative_transformed_sentences(decoder_graph_explorer, sentid, sent_data):
+    main_sentence =  sent_data[0]
+    main_sent_dict = sent_data[1]
+    boxer_graph = sent_data[2]
+
+    # Explore decoder graph
+    print "Building decoder graph ..."
+    decoder_graph = decoder_graph_explorer.explore_decoder_graph(str(sentid), main_sentence, main_sent_dict, boxer_graph)
+
+    # Start updating edges with the probabilities, for unseen : 0.5/0.5
+    print "Updating probability bottom-up ..."
+    node_probability_dict, potential_edges = decoder_graph_explorer.start_probability_update(main_sentence, main_sent_dict, boxer_graph, decoder_graph)
+
+    # Filtered decoder graph
+    print "Creating filtered decoder graph ..."
+    filtered_decoder_graph = decoder_graph_explorer.create_filtered_decoder_graph(potential_edges, main_sentence, main_sent_dict, boxer_graph, decoder_graph)
+
+    # Generating boxer and decoder graph
+    functions_prepare_elementtree_dot.run_visual_graph_creator(str(sentid), main_sentence, main_sent_dict, [], boxer_graph, filtered_decoder_graph)
+
+    sentence_pairs = filtered_decoder_graph.get_final_sentences(main_sentence, main_sent_dict, boxer_graph)
+    transformed_sentences = [item[0] for item in sentence_pairs]
+    return transformed_sentences
+
+# (get_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict) of the decoder worker processes. It is set
+# before the pool is forked: the workers share the probability tables and the parsed sentences of the main process
+# (copy-on-write) and only the sentence ids and the transformed sentences are sent between the processes
+decoder_worker_data = None
+
+def decode_sentence_batch(sentids):
+    get_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict = decoder_worker_data
+    return [get_transformed_sentences(decoder_graph_explorer, sentid, test_boxerdata_dict[str(sentid)]) for sentid in sentids]
+
+def decode_test_sentences(get_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict, test_sentids, workers=1, sentences_per_batch=20):
+    # Yields (sentid, transformed sentences) in the order of test_sentids, with workers > 1 batches of sentences are
+    # decoded by a pool of processes
+    global decoder_worker_data
+    if workers <= 1:
+        for sentid in test_sentids:
+            print sentid
+            yield sentid, get_transformed_sentences(decoder_graph_explorer, sentid, test_boxerdata_dict[str(sentid)])
+        return
+
+    decoder_worker_data = (get_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict)
+    batches = [test_sentids[index:index+sentences_per_batch] for index in range(0, len(test_sentids), sentences_per_batch)]
+    pool = multiprocessing.Pool(workers)
+    try:
+        for batch, batch_results in itertools.izip(batches, pool.imap(decode_sentence_batch, batches)):
+            for sentid, transformed_sentences in zip(batch, batch_results):
+                print sentid
+                yield sentid, transformed_sentences
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        decoder_worker_data = None
+
+def get_greedy_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT, workers=1):
     mapper_transformation = {}
     moses_input = {}
     transformation_complex_count = 0
 
     # Transformation decoder
     decoder_graph_explorer = Explore_Decoder_Graph_Greedy(TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT)
-    for sentid in test_sentids:
-        print sentid
-        sent_data = test_boxerdata_dict[str(sentid)]
-        main_sentence =  sent_data[0]
-        main_sent_dict = sent_data[1]
-        boxer_graph = sent_data[2]
-
-        # Explore decoder graph
-        decoder_graph = decoder_graph_explorer.explore_decoder_graph(str(sentid), main_sentence, main_sent_dict, boxer_graph)
-        
-        # # Generating boxer and decoder graph
-        # if sentid not in  [13, 28, 41]:
-        #     functions_prepare_elementtree_dot.run_visual_graph_creator(str(sentid), main_sentence, main_sent_dict, [], boxer_graph, decoder_graph) 
-
-        sentence_pairs = decoder_graph.get_final_sentences(main_sentence, main_sent_dict, boxer_graph)
-        transformed_sentences = [item[0] for item in sentence_pairs]
-
+    decoded_sentences = decode_test_sentences(get_greedy_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict, test_sentids, workers)
+    for sentid, transformed_sentences in decoded_sentences:
         # Writing transformation results
         mapper_transformation[sentid] = []
         for sent in transformed_sentences:
@@ -57,38 +119,15 @@ def get_greedy_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMATION_M
             transformation_complex_count += 1
     return mapper_transformation, moses_input
 
-def get_explorative_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT):
+def get_explorative_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT, workers=1):
     mapper_transformation = {}
     moses_input = {}
     transformation_complex_count = 0
     
     # Transformation decoder
     decoder_graph_explorer = Explore_Decoder_Graph_Explorative(TRANSFORMATION_MODEL, MAX_SPLIT_SIZE, RESTRICTED_DROP_RELATION, ALLOWED_DROP_MODIFIER, probability_tables, METHOD_FEATURE_EXTRACT)
-    for sentid in test_sentids:
-        print sentid
-        sent_data = test_boxerdata_dict[str(sentid)]
-        main_sentence =  sent_data[0]
-        main_sent_dict = sent_data[1]
-        boxer_graph = sent_data[2]
-
-        # Explore decoder graph
-        print "Building decoder graph ..."
-        decoder_graph = decoder_graph_explorer.explore_decoder_graph(str(sentid), main_sentence, main_sent_dict, boxer_graph)
-
-        # Start updating edges with the probabilities, for unseen : 0.5/0.5
-        print "Updating probability bottom-up ..."
-        node_probability_dict, potential_edges = decoder_graph_explorer.start_probability_update(main_sentence, main_sent_dict, boxer_graph, decoder_graph)
-
-        # Filtered decoder graph
-        print "Creating filtered decoder graph ..."
-        filtered_decoder_graph = decoder_graph_explorer.create_filtered_decoder_graph(potential_edges, main_sentence, main_sent_dict, boxer_graph, decoder_graph)
-
-        # Generating boxer and decoder graph
-        functions_prepare_elementtree_dot.run_visual_graph_creator(str(sentid), main_sentence, main_sent_dict, [], boxer_graph, filtered_decoder_graph)
-
-        sentence_pairs = filtered_decoder_graph.get_final_sentences(main_sentence, main_sent_dict, boxer_graph)
-        transformed_sentences = [item[0] for item in sentence_pairs]
-
+    decoded_sentences = decode_test_sentences(get_explorative_transformed_sentences, decoder_graph_explorer, test_boxerdata_dict, test_sentids, workers)
+    for sentid, transformed_sentences in decoded_sentences:
         # Writing transformation results
         mapper_transformation[sentid] = []
         for sent in transformed_sentences:
@@ -97,6 +136,48 @@ def get_explorative_decoder_graph(test_boxerdata_dict, test_sentids, TRANSFORMAT
             transformation_complex_count += 1
     return mapper_transformation, moses_input
 
+class Streaming_Transformation_Writer:
+    # Takes the place of test_boxerdata_dict for the xml handlers: every sentence is decoded as soon as it is
+    # parsed and its lines are written to the .moses-input, .map and .simple files, nothing is kept in memory.
+    # Sentences are written in the order of the test corpus file (the batch mode sorts them by id)
+    def __init__(self, explore_decoder, decoder_graph_explorer, test_output_directory, COMPRESS, COMPRESS_LEVEL):
+        self.decoder_graph_explorer = decoder_graph_explorer
+        if explore_decoder == "greedy":
+            self.get_transformed_sentences = get_greedy_transformed_sentences
+        else:
+            self.get_transformed_sentences = get_explorative_transformed_sentences
+        
+        print "Writing "+test_output_directory+"/transformation-output.{moses-input,map,simple}"+COMPRESS+" while decoding ..."
+        self.d2s_complex_file = functions_compressed_io.open_file(test_output_directory+"/transformation-output.moses-input"+COMPRESS, "w", COMPRESS_LEVEL)
+        self.d2s_complex_map = functions_compressed_io.open_file(test_output_directory+"/transformation-output.map"+COMPRESS, "w", COMPRESS_LEVEL)
+        self.d2s_simple_file = functions_compressed_io.open_file(test_output_directory+"/transformation-output.simple"+COMPRESS, "w", COMPRESS_LEVEL)
+        self.transformation_complex_count = 0
+        self.sentence_count = 0
+
+    def __setitem__(self, sentid, sent_data):
+        sentid = int(sentid)
+        print sentid
+        transformed_sentences = self.get_transformed_sentences(self.decoder_graph_explorer, sentid, sent_data)
+
+        self.d2s_complex_map.write(str(sentid)+" ")
+        for sent in transformed_sentences:
+            self.d2s_complex_file.write(sent.encode('utf-8')+"\n")
+            self.d2s_complex_map.write(str(self.transformation_complex_count)+" ")
+            self.transformation_complex_count += 1
+        self.d2s_complex_map.write("\n")
+        self.d2s_simple_file.write((" ".join(transformed_sentences)).encode('utf-8')+"\n")
+
+        # The output of every sentence is available as soon as it is decoded
+        self.d2s_complex_file.flush()
+        self.d2s_complex_map.flush()
+        self.d2s_simple_file.flush()
+        self.sentence_count += 1
+
+    def close(self):
+        self.d2s_complex_file.close()
+        self.d2s_complex_map.close()
+        self.d2s_simple_file.close()
+
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser(prog='python simplify_complex_sentence.py', description=('Start simplifying complex sentences.'))
 
@@ -104,6 +185,44 @@ if __name__ == "__main__":
     argparser.add_argument('--test-boxer-graph', help='The test corpus file (xml, stanford-tokenized, boxer-graph)', metavar=('Test_Boxer_Graph'),
                            default='/disk/scratch/Sentence-Simplification/Zhu-2010/TestData/complex.tokenized.boxer-graph.xml')
 
+    # Optional [default value: iterparse] (both readers give the same sentences, sax is the old pure Python reader)
+    argparser.add_argument('--xml-reader', help='Reader of the test corpus file', choices=['iterparse', 'sax'], default='iterparse', metavar=('XML_Reader'))
+
+    # Optional [default value: PARSED-CORPUS-CACHE next to the output directory] (only used with --xml-reader iterparse)
+    argparser.add_argument('--parsed-corpus-cache-dir', help='Directory of the binary caches of parsed corpus files, keyed on their content', 
+                           metavar=('Parsed_Corpus_Cache_Dir'))
+
+    # Optional [default value: False]
+    argparser.add_argument('--no-parsed-corpus-cache', help='Always parse the test corpus file, without reading or writing a cache', action='store_true')
+
+    # Optional [default value: 1] (only used with --xml-reader iterparse, sentences keep the order of the file)
+    argparser.add_argument('--parse-workers', help='The number of processes parsing ranges of sentences of the test corpus file', metavar=('PARSE_WORKERS'), default='1')
+
+    # Optional [default value: all sentences] (ids separated by ":" or ",", or a file with one id per line)
+    argparser.add_argument('--sentids', help='Only use the sentences with these ids of the test corpus file', metavar=('Sentids'))
+
+    # Optional [default value: all sentences] (FIRST:LAST, both included)
+    argparser.add_argument('--sentid-range', help='Only use the sentences with ids in this range of the test corpus file', metavar=('Sentid_Range'))
+
+    # Optional [default value: all sentences] (drawn from the sentences selected by --sentids and --sentid-range)
+    argparser.add_argument('--sample', help='Only use a random sample of this many sentences of the test corpus file', metavar=('SAMPLE'))
+
+    # Optional [default value: 0]
+    argparser.add_argument('--sample-seed', help='Random seed of --sample', metavar=('SAMPLE_SEED'), default='0')
+
+    # Optional [default value: none] (input files are read according to their own extension)
+    argparser.add_argument('--compress', help='Compression of the transformation output files', choices=['none', 'gz', 'bz2', 'xz'], default='none', metavar=('Compress'))
+
+    # Optional [default value: 6] (1: fastest ... 9: smallest)
+    argparser.add_argument('--compress-level', help='Compression level of the written files', choices=[str(level) for level in range(1, 10)], default='6', 
+                           metavar=('Compress_Level'))
+
+    # Optional [default value: False] (sentences are decoded while the test corpus file is parsed and written in its order, memory stays bounded by one sentence)
+    argparser.add_argument('--stream-output', help='Decode every sentence as soon as it is read and write the transformation output incrementally', action='store_true')
+
+    # Optional [default value: 1] (not used with --stream-output, the output files are the same as with one process)
+    argparser.add_argument('--workers', help='The number of processes decoding the test sentences', metavar=('WORKERS'), default='1')
+
     # Optional [default value: 10]
     argparser.add_argument('--nbest-distinct', help='N Best Distinct produced from Moses', metavar=('N_Best_Distinct'), default='10')
 
@@ -119,6 +238,12 @@ if __name__ == "__main__":
     args_dict = vars(argparser.parse_args(sys.argv[1:]))
     # #####################################
 
+    # "" or the extension of the compressed files written
+    COMPRESS = ""
+    if args_dict['compress'] != "none":
+        COMPRESS = "."+args_dict['compress']
+    COMPRESS_LEVEL = int(args_dict['compress_level'])
+
     # STEP:1 Creating test directory in the output directory
     timestamp =  datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
     test_output_directory = args_dict['output_dir']+"/Test-Results-"+args_dict["explore_decoder"].upper()
@@ -141,14 +266,48 @@ if __name__ == "__main__":
     # STEP:4 Reading the test corpus file (xml, stanford-tokenized, boxer-graph) ..."
     timestamp =  datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
     print "\n"+timestamp+", Start reading test corpus file (xml, stanford-tokenized, boxer-graph): "+args_dict['test_boxer_graph']+" ..." 
-    print "Creating the SAX file (xml, stanford tokenized and boxer graph) handler ..."
     test_boxerdata_dict = {}
     test_sentids = []
-    testing_xml_handler = SAXPARSER_XML_StanfordTokenized_BoxerGraph("testing", args_dict['test_boxer_graph'], test_boxerdata_dict, D2S_Config_data["TRANSFORMATION-MODEL"],
-                                                                     D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
-                                                                     D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"])
+    if args_dict['stream_output']:
+        if int(args_dict['workers']) > 1:
+            print "Sentences are decoded while parsing with --stream-output, using one process ..."
+        # The xml handlers hand every sentence to the writer instead of storing it (STEP:5 happens while parsing)
+        timestamp =  datetime.datetime.now().strftime("%A%d-%B%Y-%I%M%p")
+        print timestamp+", Applying the transformation models and writing complex sentences after transformation while parsing ..."
+        if args_dict["explore_decoder"] == "greedy":
+            decoder_graph_explorer = Explore_Decoder_Graph_Greedy(D2S_Config_data["TRANSFORMATION-MODEL"], D2S_Config_data["MAX-SPLIT-SIZE"], 
+                                                                  D2S_Config_data["RESTRICTED-DROP-RELATION"], D2S_Config_data["ALLOWED-DROP-MODIFIER"], 
+                                                                  probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"])
+        else:
+            decoder_graph_explorer = Explore_Decoder_Graph_Explorative(D2S_Config_data["TRANSFORMATION-MODEL"], D2S_Config_data["MAX-SPLIT-SIZE"], 
+                                                                       D2S_Config_data["RESTRICTED-DROP-RELATION"], D2S_Config_data["ALLOWED-DROP-MODIFIER"], 
+                                                                       probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"])
+        test_boxerdata_dict = Streaming_Transformation_Writer(args_dict["explore_decoder"], decoder_graph_explorer, test_output_directory, COMPRESS, COMPRESS_LEVEL)
+    sentence_selection = get_sentence_selection(args_dict['sentids'], args_dict['sentid_range'], args_dict['sample'], args_dict['sample_seed'])
+    if sentence_selection != None and args_dict['xml_reader'] == "sax":
+        print "Sentence selection needs the sentence offsets of the iterparse reader, using iterparse ..."
+    if args_dict['xml_reader'] == "sax" and sentence_selection == None:
+        print "Creating the SAX file (xml, stanford tokenized and boxer graph) handler ..."
+        testing_xml_handler = SAXPARSER_XML_StanfordTokenized_BoxerGraph("testing", args_dict['test_boxer_graph'], test_boxerdata_dict, D2S_Config_data["TRANSFORMATION-MODEL"],
+                                                                         D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
+                                                                         D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"])
+    else:
+        print "Creating the iterparse file (xml, stanford tokenized and boxer graph) handler ..."
+        parsed_corpus_cache_dir = None
+        if not args_dict['no_parsed_corpus_cache']:
+            parsed_corpus_cache_dir = args_dict['parsed_corpus_cache_dir']
+            if parsed_corpus_cache_dir == None:
+                parsed_corpus_cache_dir = os.path.dirname(os.path.abspath(args_dict['output_dir']))+"/PARSED-CORPUS-CACHE"
+        testing_xml_handler = ITERPARSER_XML_StanfordTokenized_BoxerGraph("testing", args_dict['test_boxer_graph'], test_boxerdata_dict, D2S_Config_data["TRANSFORMATION-MODEL"],
+                                                                          D2S_Config_data["MAX-SPLIT-SIZE"], D2S_Config_data["RESTRICTED-DROP-RELATION"],
+                                                                          D2S_Config_data["ALLOWED-DROP-MODIFIER"], D2S_Config_data["METHOD-TRAINING-GRAPH"],
+                                                                          parsed_corpus_cache_dir, int(args_dict['parse_workers']), sentence_selection)
     print "Start parsing "+args_dict['test_boxer_graph']+" ..."
     testing_xml_handler.parse_xmlfile_generating_training_graph()
+    if args_dict['stream_output']:
+        test_boxerdata_dict.close()
+        print str(test_boxerdata_dict.sentence_count)+" sentences decoded and written ..."
+        sys.exit(0)
     test_sentids = [int(item) for item in test_boxerdata_dict.keys()]
     test_sentids.sort()
 
@@ -157,25 +316,28 @@ if __name__ == "__main__":
     print "\n"+timestamp+", Applying the transformation models and writing complex sentences after transformation ..."
     mapper_transformation = {}
     moses_input = {}
+    decoder_workers = int(args_dict['workers'])
+    if decoder_workers > 1:
+        print "Decoding in "+str(decoder_workers)+" processes ..."
     if args_dict["explore_decoder"] == "greedy":
         mapper_transformation, moses_input = get_greedy_decoder_graph(test_boxerdata_dict, test_sentids, D2S_Config_data["TRANSFORMATION-MODEL"], D2S_Config_data["MAX-SPLIT-SIZE"], 
                                                                       D2S_Config_data["RESTRICTED-DROP-RELATION"], D2S_Config_data["ALLOWED-DROP-MODIFIER"], 
-                                                                      probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"])
+                                                                      probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"], decoder_workers)
     else:
         mapper_transformation, moses_input = get_explorative_decoder_graph(test_boxerdata_dict, test_sentids, D2S_Config_data["TRANSFORMATION-MODEL"], D2S_Config_data["MAX-SPLIT-SIZE"], 
                                                                            D2S_Config_data["RESTRICTED-DROP-RELATION"], D2S_Config_data["ALLOWED-DROP-MODIFIER"], 
-                                                                           probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"])
+                                                                           probability_tables, D2S_Config_data["METHOD-FEATURE-EXTRACT"], decoder_workers)
 
-    print "Writing "+test_output_directory+"/transformation-output.moses-input ..."
-    d2s_complex_file = open(test_output_directory+"/transformation-output.moses-input", "w")
+    print "Writing "+test_output_directory+"/transformation-output.moses-input"+COMPRESS+" ..."
+    d2s_complex_file = functions_compressed_io.open_file(test_output_directory+"/transformation-output.moses-input"+COMPRESS, "w", COMPRESS_LEVEL)
     for sentid in test_sentids:
         for moses_input_id in mapper_transformation[sentid]:
             transformed_sent = moses_input[moses_input_id]
             d2s_complex_file.write(transformed_sent.encode('utf-8')+"\n")
     d2s_complex_file.close()
 
-    print "Writing "+test_output_directory+"/transformation-output.map ..."
-    d2s_complex_map = open(test_output_directory+"/transformation-output.map", "w")
+    print "Writing "+test_output_directory+"/transformation-output.map"+COMPRESS+" ..."
+    d2s_complex_map = functions_compressed_io.open_file(test_output_directory+"/transformation-output.map"+COMPRESS, "w", COMPRESS_LEVEL)
     sentids =   mapper_transformation.keys()
     sentids.sort()
     for sentid in sentids:
@@ -185,8 +347,8 @@ if __name__ == "__main__":
          d2s_complex_map.write("\n")
     d2s_complex_map.close()
 
-    print "Writing "+test_output_directory+"/transformation-output.simple ..."
-    d2s_complex_file = open(test_output_directory+"/transformation-output.simple", "w")
+    print "Writing "+test_output_directory+"/transformation-output.simple"+COMPRESS+" ..."
+    d2s_complex_file = functions_compressed_io.open_file(test_output_directory+"/transformation-output.simple"+COMPRESS, "w", COMPRESS_LEVEL)
     for sentid in test_sentids:
         simple_sentence = []
         for moses_input_id in mapper_transformation[sentid]: